@@ -2,6 +2,20 @@
 """
 Main launcher for Kokoro TTS
 Works with the new organized directory structure
+
+Usage:
+    python run.py                 # Start the GUI
+    python run.py --lazy-load     # Start the GUI, load the model on first synthesis
+    python run.py --profile       # Start the GUI with generation profiling on
+    python run.py --profile-mode cprofile  # ... with cProfile instead of sampling
+    python run.py batch ...       # Batch render texts (see: python run.py batch --help)
+    python run.py serve ...       # Local HTTP synthesis server (see: python run.py serve --help)
+    python run.py longform ...    # Book-length text to WAV with resume (see: python run.py longform --help)
+    python run.py dialog ...      # Multi-voice dialog script (see: python run.py dialog --help)
+    python run.py blend ...       # Create/list/remove blended voices (see: python run.py blend --help)
+
+Only the GUI downloads missing models; the subcommands use --models-dir and
+report missing files themselves.
 """
 
 import os
@@ -9,18 +23,8 @@ import sys
 import subprocess
 from pathlib import Path
 
-def main():
-    """Main launcher function"""
-    print("🎙️ Kokoro TTS Launcher")
-    print("=" * 30)
-    
-    # Get the project root directory
-    project_root = Path(__file__).parent
-    
-    # Add src directory to Python path
-    src_path = project_root / "src"
-    sys.path.insert(0, str(src_path))
-    
+def ensure_models(project_root):
+    """Download the model files if they are missing"""
     # Check if models exist
     models_dir = project_root / "models"
     model_file = models_dir / "kokoro-v1.0.onnx"
@@ -42,6 +46,53 @@ def main():
             print("❌ Download script not found")
             return False
     
+    return True
+
+# Subcommands resolve their own model files (--models-dir, --model-variant),
+# so the default models are only downloaded for the GUI
+COMMANDS = {
+    "batch": "batch_cli",
+    "serve": "tts_server",
+    "longform": "long_form",
+    "dialog": "dialog_script",
+    "blend": "voice_blends",
+}
+
+def gui_profile_mode(args):
+    """Profiling mode from --profile / --profile-mode, or None (usage error on a bad mode)"""
+    import argparse
+    import profiling
+    parser = argparse.ArgumentParser(prog="run.py")
+    parser.add_argument("--lazy-load", action="store_true",
+                        help="Load the model on first synthesis")
+    profiling.add_profile_arguments(parser)
+    options, _ = parser.parse_known_args(args)
+    return profiling.mode_from_args(options)
+
+def main():
+    """Main launcher function"""
+    print("🎙️ Kokoro TTS Launcher")
+    print("=" * 30)
+    
+    # Get the project root directory
+    project_root = Path(__file__).parent
+    
+    # Add src directory to Python path
+    src_path = project_root / "src"
+    sys.path.insert(0, str(src_path))
+    
+    # Command-line modes
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        import importlib
+        command = importlib.import_module(COMMANDS[sys.argv[1]])
+        return command.main(sys.argv[2:])
+    
+    # A bad --profile-mode is a usage error before anything is downloaded
+    profile = gui_profile_mode(sys.argv[1:])
+    
+    if not ensure_models(project_root):
+        return False
+    
     # Check if output directories exist
     output_dir = project_root / "output"
     (output_dir / "audio_output").mkdir(parents=True, exist_ok=True)
@@ -52,7 +103,8 @@ def main():
     # Import and run the main application
     try:
         from kokoro_tts_gui import main as gui_main
-        gui_main()
+        gui_main(lazy_load=True if "--lazy-load" in sys.argv[1:] else None,
+                 profile=profile)
     except ImportError as e:
         print(f"❌ Failed to import GUI: {e}")
         print("Make sure all dependencies are installed: pip install -r requirements.txt")
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Reproducible Kokoro TTS benchmark
+
+    python scripts/benchmark.py                     # 1..cpu_count workers
+    python scripts/benchmark.py --max-workers 4
+    python scripts/benchmark.py --calibrate         # also update the GUI estimates
+
+Synthesizes a fixed multilingual corpus (one voice per language in the voice
+catalog) and measures:
+
+    load            model load time, split into its steps
+    latency         time to first audio and real-time factor per language
+    memory          peak RSS of a single engine process
+    throughput      audio seconds produced per wall second with 1..N workers
+    batching        short notification strings one by one vs. length-bucketed
+                    synthesize_batch() (batch_size / batch_length_spread settings;
+                    batch_size 4 when batching is off in the config)
+
+Results are written to output/benchmarks/bench_<timestamp>.json together with
+the git commit, machine, ONNX Runtime settings and model variant, so runs can
+be compared across commits and machines. --calibrate also stores the measured
+speech rate and real-time factor per language, which the GUI uses for its
+duration and generation time estimates.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from tts_engine import KokoroEngine, resolve_model_paths, get_output_dir
+from engine_config import SessionConfig, add_session_arguments, session_config_from_args
+from model_variants import VARIANT_POLICIES
+from calibration import save_calibration
+from optimize_model import peak_rss_mb
+
+BENCHMARK_VERSION = 2
+
+# Fixed corpus: changing it makes results incomparable, so bump
+# BENCHMARK_VERSION whenever a text is edited
+CORPUS = {
+    "en-us": {
+        "voice": "af_heart",
+        "texts": [
+            "The quick brown fox jumps over the lazy dog.",
+            "Please remember to submit your timesheet before five o'clock on Friday, "
+            "otherwise the payroll team will not be able to process it this month.",
+            "In 1969, humans walked on the Moon for the first time, and the whole world watched.",
+        ],
+    },
+    "en-gb": {
+        "voice": "bf_alice",
+        "texts": [
+            "Could you tell me where the nearest railway station is, please?",
+            "The weather in London has been rather unpredictable this autumn, "
+            "with sunshine in the morning and heavy rain by teatime.",
+        ],
+    },
+    "fr-fr": {
+        "voice": "ff_siwis",
+        "texts": [
+            "Bonjour, je voudrais réserver une table pour deux personnes ce soir.",
+            "La bibliothèque municipale sera fermée pendant les vacances d'été, "
+            "mais les livres peuvent être rendus à l'accueil de la mairie.",
+        ],
+    },
+    "it": {
+        "voice": "if_sara",
+        "texts": [
+            "Buongiorno, vorrei un caffè e un cornetto, per favore.",
+            "Il treno per Firenze partirà dal binario tre con circa dieci minuti di ritardo.",
+        ],
+    },
+    "ja": {
+        "voice": "jf_alpha",
+        "texts": [
+            "こんにちは、今日はとても良い天気ですね。",
+            "駅までの道を教えていただけますか。",
+        ],
+    },
+    "cmn": {
+        "voice": "zf_xiaobei",
+        "texts": [
+            "你好，今天天气很好。",
+            "请问最近的地铁站在哪里？",
+        ],
+    },
+}
+
+# Bucket size for the batching test when batching is off in the config
+BENCH_BATCH_SIZE = 4
+# Short strings for the batching test (notification workload)
+NOTIFICATIONS = [
+    (text, voice) for voice in ("af_heart", "bf_alice")
+    for text in (
+        "Your order has shipped.",
+        "Meeting starts in five minutes.",
+        "Battery low.",
+        "You have three new messages.",
+        "Payment received, thank you.",
+        "The build finished successfully.",
+        "Door unlocked.",
+        "Your package will arrive tomorrow between nine and noon.",
+        "Reminder: stand up and stretch.",
+        "Download complete.",
+        "Two factor code sent to your phone.",
+        "Low disk space on the system drive.",
+    )
+]
+
+_worker_engine = None
+
+
+def corpus_items(languages=None):
+    """(language, voice, text) for every corpus text"""
+    return [(language, entry["voice"], text)
+            for language, entry in CORPUS.items()
+            if languages is None or language in languages
+            for text in entry["texts"]]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure_engine(model_file, voices_file, session_settings, languages, runs):
+    """Load time, latency per language and peak RSS (runs in a fresh process)"""
+    load_start = time.perf_counter()
+    engine = KokoroEngine(model_file, voices_file,
+                          SessionConfig.from_dict(session_settings)).load()
+    load = dict(engine.load_timings, total=time.perf_counter() - load_start)
+    rss_after_load = peak_rss_mb()
+
+    engine.synthesize(CORPUS["en-us"]["texts"][0], CORPUS["en-us"]["voice"])  # warm-up
+
+    results = {}
+    for language, voice, text in corpus_items(languages):
+        row = results.setdefault(language, {"voice": voice, "chars": 0, "audio_seconds": 0.0,
+                                            "generation_seconds": 0.0, "phonemize_seconds": 0.0,
+                                            "ttfa": []})
+        best = None
+        for _ in range(runs):
+            # Every run pays for G2P, as a new text would
+            engine.phonemizer.clear()
+            phonemize_before = engine.phonemizer.seconds
+            start = time.perf_counter()
+            first_audio = None
+            frames = 0
+            for samples, sample_rate in engine.synthesize_stream(text, voice):
+                if first_audio is None:
+                    first_audio = time.perf_counter() - start
+                frames += len(samples)
+            elapsed = time.perf_counter() - start
+            phonemize = engine.phonemizer.seconds - phonemize_before
+            if best is None or elapsed < best[0]:
+                best = (elapsed, first_audio, frames / sample_rate, phonemize)
+        elapsed, first_audio, audio_seconds, phonemize = best
+        row["chars"] += len(text)
+        row["phonemize_seconds"] += phonemize
+        row["audio_seconds"] += audio_seconds
+        row["generation_seconds"] += elapsed
+        row["ttfa"].append(first_audio)
+
+    languages_report = {}
+    for language, row in results.items():
+        languages_report[language] = {
+            "voice": row["voice"],
+            "chars": row["chars"],
+            "audio_seconds": round(row["audio_seconds"], 3),
+            "rtf": round(row["generation_seconds"] / row["audio_seconds"], 4),
+            # G2P runs on the prefetch thread, overlapped with inference
+            "phonemize_seconds": round(row["phonemize_seconds"], 4),
+            "chars_per_second": round(row["chars"] / row["audio_seconds"], 2),
+            "ttfa_mean": round(sum(row["ttfa"]) / len(row["ttfa"]), 4),
+            "ttfa_max": round(max(row["ttfa"]), 4),
+        }
+    return {
+        "load_seconds": {step: round(seconds, 4) for step, seconds in load.items()},
+        "languages": languages_report,
+        "batching": measure_batching(engine, runs),
+        "peak_rss_mb": {"after_load": rss_after_load, "after_synthesis": peak_rss_mb()},
+    }
+
+
+def measure_batching(engine, runs):
+    """Requests per second for short strings, one by one and bucketed"""
+    requests = [(text, voice, 1.0) for text, voice in NOTIFICATIONS]
+
+    def best_time(function):
+        best = None
+        for _ in range(runs):
+            engine.phonemizer.clear()
+            start = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    sequential = best_time(lambda: [engine.synthesize(*request) for request in requests])
+    # Batching is opt-in; measure it with a typical size when it is off
+    config = engine.session_config
+    if config.batch_size <= 1:
+        engine.session_config = config.updated(batch_size=BENCH_BATCH_SIZE)
+    try:
+        batched = best_time(lambda: engine.synthesize_batch(requests))
+        batch_config = engine.session_config
+    finally:
+        engine.session_config = config
+    stats = engine.stage_stats()
+    return {
+        "requests": len(requests),
+        "batch_size": batch_config.batch_size,
+        "batch_length_spread": batch_config.batch_length_spread,
+        "sequential_requests_per_second": round(len(requests) / sequential, 2),
+        "batched_requests_per_second": round(len(requests) / batched, 2),
+        "speedup": round(sequential / batched, 3),
+        "mean_bucket_size": stats.get("mean_bucket_size"),
+        "length_spread": stats.get("length_spread"),
+    }
+
+
+def _init_worker(model_file, voices_file, session_settings):
+    """Load and warm up the model once per worker process"""
+    global _worker_engine
+    _worker_engine = KokoroEngine(model_file, voices_file,
+                                  SessionConfig.from_dict(session_settings)).load()
+    _worker_engine.synthesize(CORPUS["en-us"]["texts"][0], CORPUS["en-us"]["voice"])
+
+
+def _worker_pid(delay):
+    time.sleep(delay)
+    return os.getpid()
+
+
+def _synthesize_item(voice, text):
+    samples, sample_rate = _worker_engine.synthesize(text, voice)
+    return len(samples) / sample_rate, os.getpid(), peak_rss_mb()
+
+
+def measure_throughput(model_file, voices_file, session_config, workers, languages, repeat):
+    """Audio seconds per wall second with the corpus spread over worker processes"""
+    if not session_config.intra_op_threads:
+        session_config = session_config.updated(
+            intra_op_threads=max(1, (os.cpu_count() or 1) // workers))
+    items = corpus_items(languages) * repeat
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(model_file), str(voices_file),
+                                       session_config.to_dict())) as pool:
+        # Start every worker (and wait for the model loads) before timing
+        ready = set()
+        for _ in range(10):
+            ready.update(pool.map(_worker_pid, [0.2] * workers))
+            if len(ready) >= workers:
+                break
+
+        start = time.perf_counter()
+        futures = [pool.submit(_synthesize_item, voice, text) for _, voice, text in items]
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+
+    audio_seconds = sum(audio for audio, _, _ in results)
+    worker_rss = {}
+    for _, pid, rss in results:
+        worker_rss[pid] = max(worker_rss.get(pid, 0) or 0, rss or 0)
+    return {
+        "workers": workers,
+        "intra_op_threads": session_config.intra_op_threads,
+        "requests": len(items),
+        "wall_seconds": round(elapsed, 3),
+        "audio_seconds": round(audio_seconds, 3),
+        "audio_seconds_per_second": round(audio_seconds / elapsed, 3),
+        "chars_per_second": round(sum(len(text) for _, _, text in items) / elapsed, 1),
+        "total_peak_rss_mb": round(sum(worker_rss.values()), 1) if any(worker_rss.values()) else None,
+    }
+
+
+def worker_counts(max_workers):
+    """1, 2, 4, ... up to max_workers (always including max_workers)"""
+    counts = []
+    workers = 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Kokoro TTS on this machine")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1,
+                        help="Largest worker count for the throughput test")
+    parser.add_argument("--languages", nargs="+", choices=list(CORPUS),
+                        help="Only benchmark these languages")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Timed runs per text for latency (best run is kept)")
+    parser.add_argument("--repeat", type=int, default=2,
+                        help="Corpus repetitions for the throughput test")
+    parser.add_argument("--skip-throughput", action="store_true",
+                        help="Only measure load time, latency and memory")
+    parser.add_argument("--calibrate", action="store_true",
+                        help="Save per-language rates for the GUI time estimates")
+    parser.add_argument("--output", help="Result file (default: output/benchmarks/bench_<time>.json)")
+    parser.add_argument("--models-dir", help="Directory with kokoro-v1.0.onnx and voices-v1.0.bin")
+    parser.add_argument("--model-variant", choices=VARIANT_POLICIES,
+                        help="Model variant to benchmark (default: fp32)")
+    add_session_arguments(parser)
+    args = parser.parse_args()
+
+    model_file, voices_file = resolve_model_paths(args.models_dir, args.model_variant)
+    if not model_file.exists() or not voices_file.exists():
+        print(f"❌ Model files not found in {model_file.parent}. "
+              "Run: python scripts/download_model.py")
+        return False
+    session_config = session_config_from_args(args)
+    engine_info = KokoroEngine(model_file, voices_file, session_config)
+
+    print("📊 Kokoro TTS benchmark")
+    print("=" * 40)
+    print(f"Model: {model_file.name} ({engine_info.model_variant}), CPU cores: {os.cpu_count()}")
+    print(f"ONNX Runtime: {session_config.describe()}\n")
+
+    # A fresh process keeps load time and peak RSS free of this process' state
+    print("⏱️  Measuring load time, latency and memory...")
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        single = pool.submit(measure_engine, str(model_file), str(voices_file),
+                             session_config.to_dict(), args.languages, args.runs).result()
+
+    load = single["load_seconds"]
+    print(f"  load {load['total']:.2f}s (" +
+          ", ".join(f"{step} {seconds:.2f}s" for step, seconds in load.items() if step != "total") + ")")
+    print(f"\n  {'language':<8} {'voice':<12} {'RTF':>7} {'TTFA s':>7} {'chars/s':>8} {'G2P s':>7}")
+    for language, row in single["languages"].items():
+        print(f"  {language:<8} {row['voice']:<12} {row['rtf']:>7.3f} "
+              f"{row['ttfa_mean']:>7.3f} {row['chars_per_second']:>8.1f} "
+              f"{row['phonemize_seconds']:>7.3f}")
+    rss = single["peak_rss_mb"]["after_synthesis"]
+    print(f"\n  peak RSS: {rss:.0f} MB" if rss else "\n  peak RSS: n/a")
+    batching = single["batching"]
+    print(f"\n  short requests: {batching['sequential_requests_per_second']:.1f}/s one by one, "
+          f"{batching['batched_requests_per_second']:.1f}/s batched "
+          f"(x{batching['speedup']:.2f}, buckets of {batching['mean_bucket_size']}, "
+          f"{batching['length_spread']:.0%} length spread)")
+
+    throughput = []
+    if not args.skip_throughput:
+        print("\n🚀 Measuring throughput...")
+        for workers in worker_counts(max(1, args.max_workers)):
+            row = measure_throughput(model_file, voices_file, session_config, workers,
+                                     args.languages, args.repeat)
+            throughput.append(row)
+            print(f"  workers={workers:<3} {row['audio_seconds_per_second']:>7.2f} audio s/s "
+                  f"{row['chars_per_second']:>8.1f} chars/s")
+
+    report = {
+        "benchmark_version": BENCHMARK_VERSION,
+        "created": int(time.time()),
+        "git_commit": git_commit(),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+        },
+        "model": {"file": model_file.name, "variant": engine_info.model_variant},
+        "session_config": session_config.to_dict(),
+        "runs": args.runs,
+        **single,
+        "throughput": throughput,
+    }
+
+    output_file = (Path(args.output) if args.output else
+                   get_output_dir("benchmarks") / f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    output_file.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\n💾 Results saved to {output_file}")
+
+    if args.calibrate:
+        languages = {language: {"chars_per_second": row["chars_per_second"], "rtf": row["rtf"]}
+                     for language, row in single["languages"].items()}
+        calibration_file = save_calibration(languages, {
+            "git_commit": report["git_commit"],
+            "model_variant": engine_info.model_variant,
+        })
+        print(f"🎯 GUI estimates calibrated: {calibration_file}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
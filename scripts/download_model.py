@@ -1,95 +1,530 @@
 #!/usr/bin/env python3
 """
 Download script for Kokoro TTS model files
+
+Both files are fetched at the same time, each split into ranged segments
+downloaded in parallel into a FILE.part file. The segment progress is saved
+next to it (FILE.part.json), so an interrupted download continues where it
+stopped. A file is moved into models/ only after its SHA-256 digest checks
+out:
+
+    - a digest given with --expect, or the SHA-256 digest GitHub publishes
+      for the release asset, must match
+    - digests are also pinned in models/checksums.json, so later downloads,
+      mirror copies and cache copies are checked against them offline
+    - only when no digest can be obtained at all (offline, custom base URL)
+      is a file pinned on its first download (trust on first use)
+
+For provisioning many machines, --cache-dir keeps verified copies in a shared
+directory (files there are linked or copied instead of downloaded) and
+--mirror replaces the upstream URL with a local mirror (a directory or an
+http(s) base URL, e.g. a file server on the LAN).
+
+Usage:
+    python scripts/download_model.py
+    python scripts/download_model.py --cache-dir /srv/kokoro-cache
+    python scripts/download_model.py --mirror http://10.0.0.5:8000/kokoro --segments 8
+    python scripts/download_model.py --verify
 """
 
+import argparse
+import hashlib
+import json
 import os
-import requests
-from pathlib import Path
+import re
+import shutil
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+RELEASE_URL = "https://github.com/nazdridoy/kokoro-tts/releases/download/v1.0.0"
+CHECKSUMS_FILENAME = "checksums.json"
+# GitHub publishes a SHA-256 digest for every release asset
+GITHUB_RELEASE_RE = re.compile(r"^https://github\.com/([^/]+)/([^/]+)/releases/download/([^/]+)$")
+GITHUB_API_URL = "https://api.github.com/repos/{owner}/{repo}/releases/tags/{tag}"
 
-def download_file(url, filename):
-    """Download a file from URL with progress bar"""
-    print(f"Downloading {filename}...")
-    
+# Model files, with SHA-256 digests when they are known in advance
+# (otherwise the release's published digests are used)
+FILES = [
+    {"filename": "kokoro-v1.0.onnx", "description": "Kokoro TTS Model", "sha256": None},
+    {"filename": "voices-v1.0.bin", "description": "Voices configuration", "sha256": None},
+]
+
+DEFAULT_SEGMENTS = 4
+MIN_SEGMENT_BYTES = 8 * 1024 * 1024
+BUFFER_BYTES = 1024 * 1024
+# Segment progress is saved at most this often
+STATE_INTERVAL = 1.0
+TIMEOUT = 30
+RETRIES = 3
+
+
+class DownloadError(Exception):
+    """A file could not be fetched or failed verification"""
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BUFFER_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def published_digests(base_url, session):
+    """{filename: sha256} published for a GitHub release, {} if unavailable"""
+    match = GITHUB_RELEASE_RE.match(base_url.rstrip("/"))
+    if not match:
+        return {}
+    owner, repo, tag = match.groups()
     try:
-        response = requests.get(url, stream=True)
+        response = session.get(GITHUB_API_URL.format(owner=owner, repo=repo, tag=tag),
+                               headers={"Accept": "application/vnd.github+json"},
+                               timeout=TIMEOUT)
+        response.raise_for_status()
+        assets = response.json().get("assets", [])
+    except (requests.exceptions.RequestException, ValueError, AttributeError):
+        return {}
+    return {asset["name"]: asset["digest"].partition(":")[2].lower()
+            for asset in assets
+            if str(asset.get("digest") or "").startswith("sha256:")}
+
+
+class Checksums:
+    """Pinned digests in models/checksums.json (trust on first use)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            self.digests = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.digests = {}
+
+    def get(self, filename):
+        return self.digests.get(filename)
+
+    def pin(self, filename, digest):
+        with self._lock:
+            self.digests[filename] = digest
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self.digests, indent=2, sort_keys=True),
+                                encoding="utf-8")
+            os.replace(tmp_path, self.path)
+
+
+class Progress:
+    """One status line for all files being downloaded"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._files = {}
+        self._last_print = 0.0
+
+    def update(self, filename, done, total, force=False):
+        with self._lock:
+            self._files[filename] = (done, total)
+            now = time.monotonic()
+            if not force and now - self._last_print < 0.2:
+                return
+            self._last_print = now
+            parts = []
+            for name, (file_done, file_total) in self._files.items():
+                percent = f"{100 * file_done / file_total:5.1f}%" if file_total else "     ?"
+                parts.append(f"{name} {percent} ({file_done / 1e6:.1f} MB)")
+            sys.stdout.write("\r" + " | ".join(parts) + "  ")
+            sys.stdout.flush()
+
+
+class SegmentedDownload:
+    """Ranged, resumable download of one URL into a .part file"""
+
+    def __init__(self, url, target, segments=DEFAULT_SEGMENTS, session=None, progress=None):
+        self.url = url
+        self.target = Path(target)
+        self.part_path = self.target.with_name(self.target.name + ".part")
+        self.state_path = self.target.with_name(self.target.name + ".part.json")
+        self.segments = max(1, segments)
+        self.session = session or requests.Session()
+        self.progress = progress
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+
+    def _probe(self):
+        """(size, supports ranges, validator) of the remote file"""
+        response = self.session.head(self.url, allow_redirects=True, timeout=TIMEOUT)
         response.raise_for_status()
-        
-        total_size = int(response.headers.get('content-length', 0))
-        block_size = 8192
-        
-        with open(filename, 'wb') as file:
-            if total_size == 0:
-                file.write(response.content)
+        size = int(response.headers.get("content-length", 0)) or None
+        ranges = response.headers.get("accept-ranges", "").lower() == "bytes"
+        validator = response.headers.get("etag") or response.headers.get("last-modified")
+        return size, ranges, validator
+
+    def _load_state(self, size, validator):
+        """Saved segment progress, if it belongs to the same remote file"""
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if (state.get("size") != size or state.get("validator") != validator
+                or not self.part_path.exists() or self.part_path.stat().st_size != size):
+            return None
+        return state
+
+    def _save_state(self, state, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_save < STATE_INTERVAL:
+            return
+        self._last_save = now
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp_path, self.state_path)
+
+    def _report(self, state, force=False):
+        if self.progress is not None:
+            done = sum(segment["done"] for segment in state["segments"])
+            self.progress.update(self.target.name, done, state["size"], force)
+
+    def _fetch_segment(self, segment, state):
+        """Download the rest of one segment, retrying from where it stopped"""
+        for attempt in range(RETRIES):
+            start = segment["start"] + segment["done"]
+            if start > segment["end"]:
+                return
+            try:
+                headers = {"Range": f"bytes={start}-{segment['end']}"}
+                with self.session.get(self.url, headers=headers, stream=True,
+                                      timeout=TIMEOUT) as response:
+                    if response.status_code != 206:
+                        raise DownloadError(f"server ignored the range request "
+                                            f"(HTTP {response.status_code})")
+                    with open(self.part_path, "r+b") as f:
+                        f.seek(start)
+                        for block in response.iter_content(BUFFER_BYTES):
+                            block = block[:segment["end"] + 1 - segment["start"] - segment["done"]]
+                            f.write(block)
+                            # On disk before the saved progress counts it
+                            f.flush()
+                            with self._lock:
+                                segment["done"] += len(block)
+                                self._save_state(state)
+                                self._report(state)
+                if segment["start"] + segment["done"] > segment["end"]:
+                    return
+            except requests.exceptions.RequestException as e:
+                if attempt == RETRIES - 1:
+                    raise DownloadError(str(e)) from e
+            time.sleep(2 ** attempt)
+        raise DownloadError(f"segment at byte {segment['start']} did not complete")
+
+    def _fetch_ranged(self, size, validator):
+        state = self._load_state(size, validator)
+        if state is None:
+            count = max(1, min(self.segments, size // MIN_SEGMENT_BYTES))
+            bounds = [size * index // count for index in range(count + 1)]
+            state = {
+                "size": size,
+                "validator": validator,
+                "segments": [{"start": bounds[i], "end": bounds[i + 1] - 1, "done": 0}
+                             for i in range(count)],
+            }
+            # Preallocate so segments can be written at their offsets
+            with open(self.part_path, "wb") as f:
+                f.truncate(size)
+            self._save_state(state, force=True)
+        elif self.progress is not None:
+            print(f"↪️  Resuming {self.target.name}")
+
+        pending = [segment for segment in state["segments"]
+                   if segment["start"] + segment["done"] <= segment["end"]]
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, len(pending)),
+                                    thread_name_prefix=f"fetch-{self.target.name}") as pool:
+                for future in [pool.submit(self._fetch_segment, segment, state)
+                               for segment in pending]:
+                    future.result()
+        finally:
+            with self._lock:
+                self._save_state(state, force=True)
+        self._report(state, force=True)
+
+    def _fetch_stream(self, size):
+        """Single stream for servers without range support (restarts from zero)"""
+        with self.session.get(self.url, stream=True, timeout=TIMEOUT) as response:
+            response.raise_for_status()
+            done = 0
+            with open(self.part_path, "wb") as f:
+                for block in response.iter_content(BUFFER_BYTES):
+                    f.write(block)
+                    done += len(block)
+                    if self.progress is not None:
+                        self.progress.update(self.target.name, done, size)
+
+    def fetch(self):
+        """Download into the .part file, returns its path"""
+        try:
+            size, ranges, validator = self._probe()
+            if size and ranges:
+                self._fetch_ranged(size, validator)
             else:
-                downloaded = 0
-                for data in response.iter_content(block_size):
-                    downloaded += len(data)
-                    file.write(data)
-                    
-                    # Show progress
-                    done = int(50 * downloaded / total_size)
-                    sys.stdout.write(f"\r[{'=' * done}{' ' * (50-done)}] {downloaded}/{total_size} bytes")
-                    sys.stdout.flush()
-                    
-        print(f"\n✅ {filename} downloaded successfully!")
-        
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error downloading {filename}: {e}")
-        return False
-    except Exception as e:
-        print(f"❌ Unexpected error downloading {filename}: {e}")
-        return False
-        
-    return True
+                self._fetch_stream(size)
+        except requests.exceptions.RequestException as e:
+            raise DownloadError(str(e)) from e
+        return self.part_path
+
+    def discard(self):
+        self.part_path.unlink(missing_ok=True)
+        self.state_path.unlink(missing_ok=True)
+
+
+class ModelFetcher:
+    """Fetches the model files into a models directory"""
+
+    def __init__(self, models_dir, base_url=RELEASE_URL, mirror=None, cache_dir=None,
+                 segments=DEFAULT_SEGMENTS, expected=None, show_progress=True):
+        self.models_dir = Path(models_dir)
+        self.models_dir.mkdir(parents=True, exist_ok=True)
+        self.base_url = base_url.rstrip("/")
+        self.mirror = mirror
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.segments = segments
+        self.checksums = Checksums(self.models_dir / CHECKSUMS_FILENAME)
+        self.expected = dict(expected or {})
+        self._published = None
+        self._published_lock = threading.Lock()
+        self.progress = Progress() if show_progress else None
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(10, segments * len(FILES)))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def published(self):
+        """Digests published upstream for the release (looked up once)"""
+        with self._published_lock:
+            if self._published is None:
+                self._published = published_digests(self.base_url, self.session)
+            return self._published
+
+    def expected_digest(self, file_info):
+        filename = file_info["filename"]
+        return (self.expected.get(filename) or file_info.get("sha256")
+                or self.published().get(filename) or self.checksums.get(filename))
+
+    def _verify(self, path, file_info):
+        """Check a file against the known digest (pinning it if there is none)"""
+        filename = file_info["filename"]
+        digest = sha256_file(path)
+        expected = self.expected_digest(file_info)
+        if expected is None:
+            self.checksums.pin(filename, digest)
+            print(f"\n📌 No published digest for {filename}; "
+                  f"pinned sha256 {digest[:16]}... on first use")
+            return digest
+        if digest != expected.lower():
+            raise DownloadError(f"{filename}: sha256 {digest} does not match "
+                                f"the expected {expected}")
+        if self.checksums.get(filename) != digest:
+            # Verified offline next time (mirrors, caches, --verify)
+            self.checksums.pin(filename, digest)
+        return digest
+
+    def _install(self, source, target, move):
+        """Put a verified file in place atomically"""
+        tmp_path = target.with_name(target.name + ".tmp")
+        if move:
+            os.replace(source, tmp_path)
+        else:
+            try:
+                os.link(source, tmp_path)
+            except OSError:
+                shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+
+    def _store_in_cache(self, target):
+        if self.cache_dir is None:
+            return
+        cached = self.cache_dir / target.name
+        if cached.exists():
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._install(target, cached, move=False)
+        except OSError as e:
+            print(f"\n⚠️  Could not add {target.name} to the cache: {e}")
+
+    def _from_local(self, source, file_info, target):
+        """Install a cached or mirrored copy if it verifies"""
+        if not source.is_file():
+            return False
+        try:
+            self._verify(source, file_info)
+        except DownloadError as e:
+            print(f"⚠️  Ignoring {source}: {e}")
+            return False
+        self._install(source, target, move=False)
+        print(f"✅ {target.name} copied from {source.parent}")
+        return True
+
+    def _source_url(self, filename):
+        if self.mirror and "://" in self.mirror:
+            return f"{self.mirror.rstrip('/')}/{filename}"
+        return f"{self.base_url}/{filename}"
+
+    def fetch_file(self, file_info):
+        """Make one file present and verified, returns how it was obtained"""
+        filename = file_info["filename"]
+        target = self.models_dir / filename
+        if target.exists():
+            if self.expected_digest(file_info) is None:
+                # Older downloads left no record: trust the file if it is complete
+                if self._is_complete(target):
+                    return "present"
+            else:
+                try:
+                    self._verify(target, file_info)
+                    self._store_in_cache(target)
+                    return "present"
+                except DownloadError as e:
+                    print(f"⚠️  {e}, downloading it again")
+                    target.unlink()
+
+        if self.cache_dir is not None and self._from_local(self.cache_dir / filename, file_info, target):
+            return "cache"
+        if self.mirror and "://" not in self.mirror:
+            if self._from_local(Path(self.mirror) / filename, file_info, target):
+                self._store_in_cache(target)
+                return "mirror"
+        return self._download(file_info, target)
+
+    def _is_complete(self, target):
+        """Compare an unpinned existing file with the remote size, pinning it if they match"""
+        try:
+            response = self.session.head(self._source_url(target.name), allow_redirects=True,
+                                         timeout=TIMEOUT)
+            response.raise_for_status()
+            size = int(response.headers.get("content-length", 0))
+        except requests.exceptions.RequestException:
+            # Offline: keep using the file as before
+            return True
+        if size and target.stat().st_size != size:
+            print(f"⚠️  {target.name} is incomplete ({target.stat().st_size}/{size} bytes)")
+            target.unlink()
+            return False
+        self._verify(target, {"filename": target.name})
+        self._store_in_cache(target)
+        return True
+
+    def _download(self, file_info, target):
+        download = SegmentedDownload(self._source_url(file_info["filename"]), target,
+                                     self.segments, self.session, self.progress)
+        part_path = download.fetch()
+        try:
+            self._verify(part_path, file_info)
+        except DownloadError:
+            # A corrupt result must not be resumed
+            download.discard()
+            raise
+        self._install(part_path, target, move=True)
+        download.state_path.unlink(missing_ok=True)
+        self._store_in_cache(target)
+        return "downloaded"
+
+    def fetch_all(self, files=FILES):
+        """Fetch all files concurrently, returns {filename: outcome or error}"""
+        results = {}
+        with ThreadPoolExecutor(max_workers=len(files), thread_name_prefix="fetch") as pool:
+            futures = {file_info["filename"]: pool.submit(self.fetch_file, file_info)
+                       for file_info in files}
+            for filename, future in futures.items():
+                try:
+                    results[filename] = future.result()
+                except (DownloadError, OSError) as e:
+                    results[filename] = e
+        return results
+
+    def verify_all(self, files=FILES):
+        """Check the installed files against their pinned digests"""
+        ok = True
+        for file_info in files:
+            target = self.models_dir / file_info["filename"]
+            expected = self.expected_digest(file_info)
+            if not target.exists():
+                print(f"❌ {target.name} is missing")
+                ok = False
+            elif expected is None:
+                print(f"⚠️  {target.name} has no pinned digest")
+            elif sha256_file(target) != expected.lower():
+                print(f"❌ {target.name} does not match its pinned digest")
+                ok = False
+            else:
+                print(f"✅ {target.name} verified")
+        return ok
+
+
+def expected_digest_arg(value):
+    """argparse type for --expect FILE=SHA256, returns (FILE, SHA256)"""
+    filename, _, digest = value.partition("=")
+    if not filename or not re.fullmatch(r"[0-9a-fA-F]{64}", digest):
+        raise argparse.ArgumentTypeError(f"expected FILE=SHA256, got '{value}'")
+    return filename, digest.lower()
 
-def main():
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Download the Kokoro TTS model files")
+    parser.add_argument("--models-dir", help="Target directory (default: models/)")
+    parser.add_argument("--base-url", default=os.environ.get("KOKORO_MODEL_URL", RELEASE_URL),
+                        help="Where the files are published (env KOKORO_MODEL_URL)")
+    parser.add_argument("--mirror", default=os.environ.get("KOKORO_MODEL_MIRROR"),
+                        help="Local mirror: a directory or http(s) base URL (env KOKORO_MODEL_MIRROR)")
+    parser.add_argument("--cache-dir", default=os.environ.get("KOKORO_MODEL_CACHE"),
+                        help="Shared cache of verified files (env KOKORO_MODEL_CACHE)")
+    parser.add_argument("--segments", type=int, default=DEFAULT_SEGMENTS,
+                        help=f"Parallel ranged segments per file (default: {DEFAULT_SEGMENTS})")
+    parser.add_argument("--expect", action="append", type=expected_digest_arg, metavar="FILE=SHA256",
+                        help="Required digest of a file (repeatable)")
+    parser.add_argument("--verify", action="store_true",
+                        help="Only check the installed files against their digests")
+    return parser
+
+
+def main(argv=None):
     """Main function to download model files"""
+    args = build_parser().parse_args(argv)
     print("🔄 Kokoro TTS Model Downloader")
     print("=" * 40)
-    
-    # Get project root and models directory
-    script_dir = Path(__file__).parent
-    project_root = script_dir.parent
-    models_dir = project_root / "models"
-    
-    # Create models directory if it doesn't exist
-    models_dir.mkdir(exist_ok=True)
-    
-    # Change to models directory
-    os.chdir(models_dir)
-    
-    # Model files URLs
-    files_to_download = [
-        {
-            "url": "https://github.com/nazdridoy/kokoro-tts/releases/download/v1.0.0/kokoro-v1.0.onnx",
-            "filename": "kokoro-v1.0.onnx",
-            "description": "Kokoro TTS Model"
-        },
-        {
-            "url": "https://github.com/nazdridoy/kokoro-tts/releases/download/v1.0.0/voices-v1.0.bin",
-            "filename": "voices-v1.0.bin",
-            "description": "Voices configuration"
-        }
-    ]
-    
-    # Check if files already exist
-    for file_info in files_to_download:
-        filename = file_info["filename"]
-        if os.path.exists(filename):
+
+    models_dir = Path(args.models_dir) if args.models_dir else Path(__file__).parent.parent / "models"
+    fetcher = ModelFetcher(models_dir, args.base_url, args.mirror, args.cache_dir,
+                           args.segments, dict(args.expect or []))
+    if args.verify:
+        return fetcher.verify_all()
+
+    start_time = time.time()
+    results = fetcher.fetch_all()
+    print()
+    failed = False
+    for filename, outcome in results.items():
+        if isinstance(outcome, Exception):
+            print(f"❌ Failed to fetch {filename}: {outcome}")
+            failed = True
+        elif outcome == "present":
             print(f"⚠️  {filename} already exists. Skipping download.")
         else:
-            success = download_file(file_info["url"], filename)
-            if not success:
-                print(f"❌ Failed to download {filename}")
-                return False
-    
-    print(f"\n🎉 All model files are ready in {models_dir}!")
+            print(f"✅ {filename} ({outcome})")
+    if failed:
+        print("Run the script again to resume the download.")
+        return False
+
+    print(f"\n🎉 All model files are ready in {models_dir} ({time.time() - start_time:.1f}s)!")
     print("You can now run the TTS application:")
     print("   python run.py")
-    
+    print("Optional: build faster INT8/optimized model variants:")
+    print("   python scripts/optimize_model.py --compare")
     return True
 
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(0 if main() else 1)
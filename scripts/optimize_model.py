@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Build reduced-precision Kokoro model variants and compare them
+
+    python scripts/optimize_model.py                      # build int8 + optimized
+    python scripts/optimize_model.py --variants int8
+    python scripts/optimize_model.py --compare            # build, then write the report
+
+The comparison synthesizes a fixed corpus with every available variant, each
+in a fresh process so peak memory is measured in isolation, and reports the
+real-time factor, peak RSS, file size and the log-spectral distance to the
+fp32 output. The report is saved as models/variants_report.json and is what
+the "fastest" selection policy reads.
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from tts_engine import KokoroEngine, get_models_dir, VOICES_FILENAME
+from model_variants import (VARIANTS, REPORT_FILENAME, available_variants, variant_path,
+                            build_int8, build_optimized)
+
+COMPARISON_CORPUS = [
+    "The quick brown fox jumps over the lazy dog.",
+    "Please remember to submit your timesheet before five o'clock on Friday.",
+    "In 1969, humans walked on the Moon for the first time, and the world watched.",
+    "Could you tell me where the nearest train station is?",
+    "Quantization trades a little precision for a smaller, faster model.",
+]
+COMPARISON_VOICE = "af_bella"
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def measure_variant(model_file, voices_file, voice, runs):
+    """Synthesize the corpus with one model (runs in a separate process)"""
+    load_start = time.perf_counter()
+    engine = KokoroEngine(model_file, voices_file).load()
+    load_seconds = time.perf_counter() - load_start
+
+    engine.synthesize(COMPARISON_CORPUS[0], voice)  # warm-up
+    outputs = []
+    total_audio = 0.0
+    best_elapsed = None
+    for _ in range(runs):
+        outputs = []
+        start = time.perf_counter()
+        for text in COMPARISON_CORPUS:
+            samples, sample_rate = engine.synthesize(text, voice)
+            outputs.append(samples)
+        elapsed = time.perf_counter() - start
+        best_elapsed = elapsed if best_elapsed is None else min(best_elapsed, elapsed)
+        total_audio = sum(len(samples) for samples in outputs) / sample_rate
+
+    return {
+        "load_seconds": load_seconds,
+        "rtf": best_elapsed / total_audio,
+        "audio_seconds": total_audio,
+        "peak_rss_mb": peak_rss_mb(),
+        "outputs": outputs,
+    }
+
+
+def log_spectral_distance(reference, candidate, frame=1024, hop=256):
+    """Mean log-spectral distance in dB between two signals (truncated to equal length)"""
+    length = min(len(reference), len(candidate))
+    if length < frame:
+        return None
+    window = np.hanning(frame).astype(np.float32)
+
+    def spectrum(signal):
+        frames = np.lib.stride_tricks.sliding_window_view(signal[:length], frame)[::hop]
+        power = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2
+        return 10 * np.log10(power + 1e-10)
+
+    difference = spectrum(reference) - spectrum(candidate)
+    return float(np.mean(np.sqrt(np.mean(difference ** 2, axis=1))))
+
+
+def compare(models_dir, voice, runs):
+    voices_file = Path(models_dir) / VOICES_FILENAME
+    results = {}
+    for name in available_variants(models_dir):
+        model_file = variant_path(models_dir, name)
+        print(f"📏 Measuring {name} ({model_file.name})...")
+        # A fresh process per variant keeps the peak RSS numbers independent
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results[name] = pool.submit(measure_variant, str(model_file), str(voices_file),
+                                        voice, runs).result()
+        results[name]["size_mb"] = model_file.stat().st_size / (1024 * 1024)
+
+    reference = results.get("fp32")
+    report = {"created": int(time.time()), "voice": voice, "corpus_size": len(COMPARISON_CORPUS),
+              "variants": {}}
+    for name, result in results.items():
+        distance = None
+        if reference is not None and name != "fp32":
+            distances = [log_spectral_distance(ref, out)
+                         for ref, out in zip(reference["outputs"], result["outputs"])]
+            distances = [d for d in distances if d is not None]
+            distance = float(np.mean(distances)) if distances else None
+        elif name == "fp32":
+            distance = 0.0
+        report["variants"][name] = {
+            "rtf": round(result["rtf"], 4),
+            "load_seconds": round(result["load_seconds"], 3),
+            "peak_rss_mb": round(result["peak_rss_mb"], 1) if result["peak_rss_mb"] else None,
+            "size_mb": round(result["size_mb"], 1),
+            "spectral_distance_db": round(distance, 3) if distance is not None else None,
+        }
+
+    print(f"\n{'variant':<10} {'RTF':>7} {'load s':>7} {'RSS MB':>8} {'size MB':>8} {'LSD dB':>7}")
+    for name, row in report["variants"].items():
+        rss = f"{row['peak_rss_mb']:.0f}" if row["peak_rss_mb"] else "n/a"
+        lsd = f"{row['spectral_distance_db']:.2f}" if row["spectral_distance_db"] is not None else "n/a"
+        print(f"{name:<10} {row['rtf']:>7.3f} {row['load_seconds']:>7.2f} {rss:>8} "
+              f"{row['size_mb']:>8.1f} {lsd:>7}")
+
+    report_file = Path(models_dir) / REPORT_FILENAME
+    report_file.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\n💾 Report saved to {report_file}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and compare Kokoro model variants")
+    parser.add_argument("--variants", nargs="+", choices=[v for v in VARIANTS if v != "fp32"],
+                        default=["int8", "optimized"], help="Variants to build")
+    parser.add_argument("--skip-build", action="store_true", help="Only run the comparison")
+    parser.add_argument("--force", action="store_true", help="Rebuild variants that already exist")
+    parser.add_argument("--compare", action="store_true",
+                        help="Write the quality/speed comparison report")
+    parser.add_argument("--voice", default=COMPARISON_VOICE, help="Voice used for the comparison")
+    parser.add_argument("--runs", type=int, default=2, help="Timed runs per variant")
+    parser.add_argument("--models-dir", help="Directory with kokoro-v1.0.onnx and voices-v1.0.bin")
+    args = parser.parse_args()
+
+    models_dir = Path(args.models_dir) if args.models_dir else get_models_dir()
+    if not variant_path(models_dir, "fp32").exists():
+        print(f"❌ {VARIANTS['fp32']} not found in {models_dir}. Run: python scripts/download_model.py")
+        return False
+
+    if not args.skip_build:
+        builders = {"int8": build_int8, "optimized": build_optimized}
+        for name in args.variants:
+            target = variant_path(models_dir, name)
+            if target.exists() and not args.force:
+                print(f"⚠️  {target.name} already exists. Skipping (use --force to rebuild).")
+                continue
+            print(f"🔧 Building {name} variant...")
+            start = time.perf_counter()
+            builders[name](models_dir)
+            print(f"✅ {target.name} built in {time.perf_counter() - start:.1f}s "
+                  f"({target.stat().st_size / (1024 * 1024):.1f} MB)")
+
+    if args.compare:
+        compare(models_dir, args.voice, args.runs)
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Sweep ONNX Runtime session settings on this machine and recommend the fastest
+
+Every combination of intra-op threads, execution mode and graph optimization
+level is timed on a fixed text. Memory arena / memory pattern settings are
+then checked on the best combination. Use --workers to tune for several
+worker processes sharing the CPU, and --write to save the result into
+kokoro_config.json.
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from tts_engine import KokoroEngine, resolve_model_paths
+from engine_config import SessionConfig, GRAPH_OPTIMIZATION_LEVELS, positive_int
+from model_variants import VARIANT_POLICIES
+
+SWEEP_TEXT = ("The quick brown fox jumps over the lazy dog. "
+              "Performance tuning needs a text long enough to keep every core busy, "
+              "but short enough that the sweep finishes in a few minutes.")
+
+
+def thread_candidates(max_threads):
+    """1, 2, 4, ... up to max_threads (always including max_threads)"""
+    candidates = []
+    threads = 1
+    while threads < max_threads:
+        candidates.append(threads)
+        threads *= 2
+    candidates.append(max_threads)
+    return candidates
+
+
+def measure(config, model_file, voices_file, voice, runs):
+    """Return (best real-time factor, audio seconds) for one configuration"""
+    engine = KokoroEngine(model_file, voices_file, config).load()
+    engine.synthesize(SWEEP_TEXT, voice)  # warm-up
+    best_rtf = None
+    audio_seconds = 0.0
+    for _ in range(runs):
+        start = time.perf_counter()
+        samples, sample_rate = engine.synthesize(SWEEP_TEXT, voice)
+        elapsed = time.perf_counter() - start
+        audio_seconds = len(samples) / sample_rate
+        rtf = elapsed / audio_seconds
+        best_rtf = rtf if best_rtf is None else min(best_rtf, rtf)
+    return best_rtf, audio_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the fastest ONNX Runtime settings")
+    parser.add_argument("--workers", type=positive_int, default=1,
+                        help="Worker processes that will share the CPU (caps threads per worker)")
+    parser.add_argument("--runs", type=positive_int, default=3, help="Timed runs per configuration")
+    parser.add_argument("--voice", default="af_bella", help="Voice used for the sweep")
+    parser.add_argument("--models-dir", help="Directory with kokoro-v1.0.onnx and voices-v1.0.bin")
+    parser.add_argument("--model-variant", choices=VARIANT_POLICIES,
+                        help="Model variant to tune (default: fp32)")
+    parser.add_argument("--write", action="store_true",
+                        help="Save the recommended settings to kokoro_config.json")
+    args = parser.parse_args()
+
+    model_file, voices_file = resolve_model_paths(args.models_dir, args.model_variant)
+    if not model_file.exists() or not voices_file.exists():
+        print(f"❌ Model files not found in {model_file.parent}. "
+              "Run: python scripts/download_model.py")
+        return False
+    max_threads = max(1, (os.cpu_count() or 1) // args.workers)
+
+    print("🔧 ONNX Runtime tuning")
+    print("=" * 40)
+    print(f"CPU cores: {os.cpu_count()}, workers: {args.workers}, "
+          f"max threads per worker: {max_threads}\n")
+
+    results = []
+    levels = [level for level in GRAPH_OPTIMIZATION_LEVELS if level != "disabled"]
+    for threads, mode, level in itertools.product(thread_candidates(max_threads),
+                                                  ("sequential", "parallel"), levels):
+        config = SessionConfig(intra_op_threads=threads,
+                               inter_op_threads=1 if mode == "sequential" else 2,
+                               graph_optimization=level, execution_mode=mode)
+        rtf, audio_seconds = measure(config, model_file, voices_file, args.voice, args.runs)
+        results.append((rtf, config))
+        print(f"  threads={threads:<3} mode={mode:<10} opt={level:<8} RTF {rtf:.3f}")
+
+    results.sort(key=lambda result: result[0])
+    best_rtf, best = results[0]
+
+    print("\nMemory settings on the best configuration:")
+    for arena, pattern in itertools.product((True, False), (True, False)):
+        config = best.updated(enable_cpu_mem_arena=arena, enable_mem_pattern=pattern)
+        rtf, _ = measure(config, model_file, voices_file, args.voice, args.runs)
+        print(f"  arena={arena!s:<5} mem_pattern={pattern!s:<5} RTF {rtf:.3f}")
+        if rtf < best_rtf:
+            best_rtf, best = rtf, config
+
+    default_rtf, _ = measure(SessionConfig(), model_file, voices_file, args.voice, args.runs)
+    print(f"\n✅ Recommended: {best.describe()}")
+    print(f"   RTF {best_rtf:.3f} vs {default_rtf:.3f} with ONNX Runtime defaults "
+          f"({default_rtf / best_rtf:.2f}x)")
+
+    if args.write:
+        config_file = best.save()
+        print(f"💾 Saved to {config_file}")
+    else:
+        print("Run again with --write to save these settings to kokoro_config.json")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
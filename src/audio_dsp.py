@@ -0,0 +1,366 @@
+"""
+Audio signal processing helpers (NumPy only)
+
+Besides one-shot resampling, the classes here work on audio that arrives in
+chunks (process() per chunk, flush() at the end), so the encoder stage can
+post-process while synthesis is still running:
+
+    SilenceShaper        trim leading/trailing silence, shorten long pauses
+    LoudnessNormalizer   gated BS.1770 loudness towards a LUFS target
+    StreamResampler      resample() without seams between chunks
+"""
+
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+
+# Filter taps per polyphase branch; higher means a sharper anti-aliasing filter
+RESAMPLE_TAPS = 32
+# Output samples computed per block, bounds the temporary index matrix
+RESAMPLE_BLOCK = 1 << 16
+
+# Silence detection: frame length and level below which a frame is silent
+SILENCE_FRAME_SECONDS = 0.02
+SILENCE_THRESHOLD_DB = -50.0
+# Silence kept before the first and after the last word when trimming
+TRIM_PAD_SECONDS = 0.1
+
+# Loudness measurement (ITU-R BS.1770): gating blocks and gates
+LOUDNESS_BLOCK_SECONDS = 0.4
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = 10.0
+# Blocks transformed per FFT call, bounds the temporary spectrum
+LOUDNESS_FFT_BATCH = 64
+# Normalization: audio measured per window, gain limits and peak ceiling
+LOUDNESS_WINDOW_SECONDS = 3.0
+MAX_GAIN_DB = 20.0
+PEAK_CEILING = 0.98
+# Gain changes between windows are spread over this long
+GAIN_RAMP_SECONDS = 0.05
+
+
+def _lowpass_filter(up, down, taps_per_phase=RESAMPLE_TAPS):
+    """Kaiser-windowed sinc filter for a rational resampling ratio"""
+    cutoff = 1.0 / max(up, down)
+    half_length = taps_per_phase * max(up, down) // 2
+    n = np.arange(-half_length, half_length + 1)
+    taps = cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), 8.0)
+    # Unity gain after zero-stuffing by `up`
+    return (taps * up / taps.sum()).astype(np.float64)
+
+
+def _polyphase_bank(up, down):
+    """Filter bank[phase, k] = taps[phase + k * up], its delay and taps per phase"""
+    taps = _lowpass_filter(up, down)
+    delay = (len(taps) - 1) // 2
+    # Pad the filter so every phase has the same number of taps
+    phase_taps = -(-len(taps) // up)
+    taps = np.concatenate([taps, np.zeros(phase_taps * up - len(taps))])
+    return taps.reshape(phase_taps, up).T, delay, phase_taps
+
+
+def _ratio(source_rate, target_rate):
+    divisor = gcd(int(source_rate), int(target_rate))
+    return int(target_rate) // divisor, int(source_rate) // divisor
+
+
+def resample(samples, source_rate, target_rate):
+    """Resample with a polyphase windowed-sinc filter (like scipy's resample_poly).
+
+    Every output sample is computed directly from the input with the filter
+    phase it needs, so even awkward ratios such as 24000 -> 22050 never build
+    the zero-stuffed intermediate signal.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+    up, down = _ratio(source_rate, target_rate)
+    bank, delay, phase_taps = _polyphase_bank(up, down)
+
+    padded = np.concatenate([np.zeros(phase_taps, dtype=np.float32), samples,
+                             np.zeros(phase_taps, dtype=np.float32)])
+    output_length = int(np.ceil(len(samples) * up / down))
+    output = np.empty(output_length, dtype=np.float32)
+    k = np.arange(phase_taps)
+    for start in range(0, output_length, RESAMPLE_BLOCK):
+        n = np.arange(start, min(start + RESAMPLE_BLOCK, output_length))
+        # Position of each output sample on the zero-stuffed, delay-compensated grid
+        position = n * down + delay
+        phase = position % up
+        base = position // up + phase_taps
+        window = padded[base[:, None] - k[None, :]]
+        output[start:start + len(n)] = np.einsum("ij,ij->i", window, bank[phase])
+    return output
+
+
+class StreamResampler:
+    """resample() for audio that arrives in chunks.
+
+    Only the filter's history is kept between chunks, and the output is the
+    same as resampling the whole signal at once (no seams at chunk edges).
+    """
+
+    def __init__(self, source_rate, target_rate):
+        self.up, self.down = _ratio(source_rate, target_rate)
+        self._bank, self._delay, self._phase_taps = _polyphase_bank(self.up, self.down)
+        # _buffer[i] is input sample i + _offset; it starts with the zero padding
+        self._buffer = np.zeros(self._phase_taps, dtype=np.float32)
+        self._offset = -self._phase_taps
+        self._received = 0
+        self._produced = 0
+
+    def _produce(self, available, limit=None):
+        """Output samples whose filter window ends before input sample `available`"""
+        end = max(0, (available * self.up - 1 - self._delay) // self.down + 1)
+        if limit is not None:
+            end = min(end, limit)
+        k = np.arange(self._phase_taps)
+        blocks = []
+        for start in range(self._produced, end, RESAMPLE_BLOCK):
+            n = np.arange(start, min(start + RESAMPLE_BLOCK, end))
+            position = n * self.down + self._delay
+            phase = position % self.up
+            base = position // self.up - self._offset
+            window = self._buffer[base[:, None] - k[None, :]]
+            blocks.append(np.einsum("ij,ij->i", window, self._bank[phase]).astype(np.float32))
+        self._produced = max(self._produced, end)
+        # Drop the input no later output sample reaches back to
+        first_needed = (self._produced * self.down + self._delay) // self.up - self._phase_taps + 1
+        drop = first_needed - self._offset
+        if drop > 0:
+            self._buffer = self._buffer[drop:]
+            self._offset += drop
+        return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+
+    def process(self, samples):
+        samples = np.asarray(samples, dtype=np.float32)
+        self._buffer = np.concatenate([self._buffer, samples])
+        self._received += len(samples)
+        return self._produce(self._received)
+
+    def flush(self):
+        """The last output samples (the filter runs into trailing zeros)"""
+        total = int(np.ceil(self._received * self.up / self.down))
+        self._buffer = np.concatenate([self._buffer,
+                                       np.zeros(self._phase_taps, dtype=np.float32)])
+        return self._produce(self._received + self._phase_taps, limit=total)
+
+
+def frame_levels(samples, frame):
+    """RMS level in dBFS of consecutive frames (a trailing partial frame is ignored)"""
+    count = len(samples) // frame
+    frames = np.asarray(samples[:count * frame], dtype=np.float32).reshape(count, frame)
+    power = np.einsum("ij,ij->i", frames, frames) / frame
+    return 10 * np.log10(power + 1e-12)
+
+
+class SilenceShaper:
+    """Trims leading/trailing silence and shortens overlong pauses, chunk by chunk.
+
+    Audio is classified in SILENCE_FRAME_SECONDS frames against a fixed
+    dBFS threshold. Silence is held back until the next voiced frame shows
+    what it is (lead-in, pause or tail); a pause longer than max_pause keeps
+    its first and last max_pause / 2 seconds. Trimming keeps TRIM_PAD_SECONDS
+    before the first and after the last voiced frame.
+    """
+
+    def __init__(self, sample_rate, trim=True, max_pause=None,
+                 threshold_db=SILENCE_THRESHOLD_DB, pad=TRIM_PAD_SECONDS):
+        self.trim = trim
+        self.frame = max(1, int(round(SILENCE_FRAME_SECONDS * sample_rate)))
+        self.threshold_db = threshold_db
+        self.pad = int(round(pad * sample_rate))
+        self.max_pause = int(round(max_pause * sample_rate)) if max_pause else None
+        # Held silence only ever needs this much from either end
+        self._keep = max(self.pad, self.max_pause) if self.max_pause else None
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._gap = []
+        self._gap_length = 0
+        self._voiced = False
+        self.removed = 0
+
+    def _hold(self, samples):
+        self._gap.append(samples)
+        self._gap_length += len(samples)
+        if self._keep is not None and sum(len(part) for part in self._gap) > 4 * self._keep:
+            held = np.concatenate(self._gap)
+            self._gap = [held[:self._keep], held[-self._keep:]]
+
+    def _release(self, where):
+        """The held silence as it should appear: "lead", "pause" or "tail" """
+        held = np.concatenate(self._gap) if self._gap else np.zeros(0, dtype=np.float32)
+        length = self._gap_length
+        self._gap, self._gap_length = [], 0
+        if self.trim and where == "lead":
+            kept = held[len(held) - min(self.pad, len(held)):]
+        elif self.trim and where == "tail":
+            kept = held[:self.pad]
+        elif self.max_pause is not None and length > self.max_pause:
+            head = self.max_pause // 2
+            kept = np.concatenate([held[:head], held[len(held) - (self.max_pause - head):]])
+        else:
+            kept = held
+        self.removed += length - len(kept)
+        return kept
+
+    def _shape(self, samples, silent):
+        frames = len(silent)
+        edges = np.flatnonzero(np.diff(silent.astype(np.int8))) + 1
+        output = []
+        for start, end in zip(np.r_[0, edges], np.r_[edges, frames]):
+            run = samples[start * self.frame:end * self.frame]
+            if silent[start]:
+                self._hold(run)
+            else:
+                output.append(self._release("pause" if self._voiced else "lead"))
+                output.append(run)
+                self._voiced = True
+        return np.concatenate(output) if output else np.zeros(0, dtype=np.float32)
+
+    def process(self, samples):
+        samples = np.concatenate([self._carry, np.asarray(samples, dtype=np.float32)])
+        usable = len(samples) // self.frame * self.frame
+        self._carry = samples[usable:]
+        if not usable:
+            return np.zeros(0, dtype=np.float32)
+        silent = frame_levels(samples[:usable], self.frame) < self.threshold_db
+        return self._shape(samples[:usable], silent)
+
+    def flush(self):
+        output = []
+        if len(self._carry):
+            level = frame_levels(self._carry, len(self._carry))[0]
+            output.append(self._shape(self._carry, np.array([level < self.threshold_db])))
+        output.append(self._release("tail"))
+        self._carry = np.zeros(0, dtype=np.float32)
+        return np.concatenate(output)
+
+
+@lru_cache(maxsize=8)
+def _k_weighting(sample_rate, block):
+    """Power response of the BS.1770 K-weighting filter at the rfft bins of a block,
+    with the Parseval factors folded in (so power = |rfft|^2 @ weights)"""
+    w = 2 * np.pi * np.fft.rfftfreq(block)
+    z = np.exp(-1j * w)
+
+    def biquad(b, a):
+        return np.abs((b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)) ** 2
+
+    # Stage 1: +4 dB high shelf around 1.5 kHz (head acoustics)
+    gain = 10 ** (4.0 / 40)
+    w0 = 2 * np.pi * 1500.0 / sample_rate
+    alpha = np.sin(w0) / (2 * (1 / np.sqrt(2)))
+    cos, root = np.cos(w0), 2 * np.sqrt(gain) * alpha
+    shelf = biquad((gain * ((gain + 1) + (gain - 1) * cos + root),
+                    -2 * gain * ((gain - 1) + (gain + 1) * cos),
+                    gain * ((gain + 1) + (gain - 1) * cos - root)),
+                   ((gain + 1) - (gain - 1) * cos + root,
+                    2 * ((gain - 1) - (gain + 1) * cos),
+                    (gain + 1) - (gain - 1) * cos - root))
+    # Stage 2: high pass at 38 Hz (RLB weighting)
+    w0 = 2 * np.pi * 38.0 / sample_rate
+    alpha, cos = np.sin(w0) / (2 * 0.5), np.cos(w0)
+    highpass = biquad(((1 + cos) / 2, -(1 + cos), (1 + cos) / 2),
+                      (1 + alpha, -2 * cos, 1 - alpha))
+
+    weights = shelf * highpass
+    weights[1:(block + 1) // 2] *= 2
+    return weights / block ** 2
+
+
+def block_powers(samples, sample_rate):
+    """K-weighted mean square of the 400 ms gating blocks (75% overlap)"""
+    block = int(round(LOUDNESS_BLOCK_SECONDS * sample_rate))
+    samples = np.asarray(samples, dtype=np.float32)
+    if len(samples) < block:
+        return np.zeros(0)
+    weights = _k_weighting(int(sample_rate), block)
+    blocks = np.lib.stride_tricks.sliding_window_view(samples, block)[::block // 4]
+    powers = []
+    for start in range(0, len(blocks), LOUDNESS_FFT_BATCH):
+        spectrum = np.fft.rfft(blocks[start:start + LOUDNESS_FFT_BATCH], axis=1)
+        powers.append((spectrum.real ** 2 + spectrum.imag ** 2) @ weights)
+    return np.concatenate(powers)
+
+
+def _lufs(power):
+    return -0.691 + 10 * np.log10(np.maximum(power, 1e-12))
+
+
+def integrated_loudness(samples, sample_rate):
+    """Gated loudness in LUFS (BS.1770), None for audio that is too short or silent"""
+    powers = block_powers(samples, sample_rate)
+    powers = powers[_lufs(powers) > ABSOLUTE_GATE_LUFS]
+    if not len(powers):
+        return None
+    relative_gate = _lufs(powers.mean()) - RELATIVE_GATE_LU
+    powers = powers[_lufs(powers) > relative_gate]
+    return float(_lufs(powers.mean()))
+
+
+class LoudnessNormalizer:
+    """Brings the audio to a target loudness window by window.
+
+    Every LOUDNESS_WINDOW_SECONDS of audio is measured with the gated
+    BS.1770 loudness and given the gain that moves it to the target (at most
+    MAX_GAIN_DB either way, and never past PEAK_CEILING). The change from one
+    window's gain to the next is ramped over GAIN_RAMP_SECONDS, so segments
+    synthesized at different levels come out even without clicks. Windows
+    that are all silence keep the previous gain.
+    """
+
+    def __init__(self, sample_rate, target_lufs, window=LOUDNESS_WINDOW_SECONDS):
+        self.sample_rate = sample_rate
+        self.target = target_lufs
+        self.window = int(round(window * sample_rate))
+        self.ramp = int(round(GAIN_RAMP_SECONDS * sample_rate))
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._gain = None
+
+    def _apply(self, samples):
+        loudness = integrated_loudness(samples, self.sample_rate)
+        if loudness is None:
+            gain = 1.0 if self._gain is None else self._gain
+        else:
+            gain_db = np.clip(self.target - loudness, -MAX_GAIN_DB, MAX_GAIN_DB)
+            gain = float(10 ** (gain_db / 20))
+        peak = float(np.abs(samples).max()) if len(samples) else 0.0
+        if peak * gain > PEAK_CEILING:
+            gain = PEAK_CEILING / peak
+        start = gain if self._gain is None else self._gain
+        self._gain = gain
+        gains = np.full(len(samples), gain, dtype=np.float32)
+        ramp = min(len(samples), self.ramp)
+        gains[:ramp] = np.linspace(start, gain, ramp, dtype=np.float32)
+        return np.clip(samples * gains, -PEAK_CEILING, PEAK_CEILING)
+
+    def process(self, samples):
+        self._buffer = np.concatenate([self._buffer, np.asarray(samples, dtype=np.float32)])
+        output = []
+        while len(self._buffer) >= self.window:
+            output.append(self._apply(self._buffer[:self.window]))
+            self._buffer = self._buffer[self.window:]
+        return np.concatenate(output) if output else np.zeros(0, dtype=np.float32)
+
+    def flush(self):
+        samples, self._buffer = self._buffer, np.zeros(0, dtype=np.float32)
+        return self._apply(samples) if len(samples) else samples
+
+
+class ProcessingChain:
+    """Streaming stages (process/flush) applied in order"""
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+
+    def process(self, samples):
+        for stage in self.stages:
+            samples = stage.process(samples)
+        return samples
+
+    def flush(self):
+        samples = np.zeros(0, dtype=np.float32)
+        for stage in self.stages:
+            samples = np.concatenate([stage.process(samples), stage.flush()])
+        return samples
@@ -0,0 +1,333 @@
+"""
+Audio output formats and the background encoding stage
+
+Supported formats (all through libsndfile, no extra dependencies):
+
+    wav     16-bit PCM
+    flac    lossless, 16-bit
+    ogg     Ogg/Opus (8, 12, 16, 24 or 48 kHz)
+    mp3     MPEG layer III, constant bitrate
+
+Optional post-processing (audio_dsp) runs before encoding: silence trimming
+at the start and end, shortening of pauses longer than max_pause seconds and
+loudness normalization to a LUFS target.
+
+Output settings are resolved like the ONNX Runtime settings: built-in
+defaults < "output" section of kokoro_config.json < KOKORO_OUTPUT_* environment
+variables < command-line flags. Example:
+
+    {"output": {"format": "ogg", "sample_rate": 16000, "bitrate": 24,
+                "trim_silence": true, "max_pause": 0.8, "loudness": -16}}
+
+The encoder runs on its own thread and consumes chunks as the engine produces
+them, so post-processing and compression overlap synthesis instead of adding
+to wall time.
+"""
+
+import io
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+import pipeline_metrics
+from audio_dsp import (SilenceShaper, LoudnessNormalizer, StreamResampler, ProcessingChain,
+                       ABSOLUTE_GATE_LUFS)
+from engine_config import get_config_path
+
+CONFIG_SECTION = "output"
+ENV_PREFIX = "KOKORO_OUTPUT_"
+
+# name -> (libsndfile format, subtype, extension)
+OUTPUT_FORMATS = {
+    "wav": ("WAV", "PCM_16", ".wav"),
+    "flac": ("FLAC", "PCM_16", ".flac"),
+    "ogg": ("OGG", "OPUS", ".ogg"),
+    "mp3": ("MP3", "MPEG_LAYER_III", ".mp3"),
+}
+EXTENSION_FORMATS = {".wav": "wav", ".flac": "flac", ".ogg": "ogg", ".opus": "ogg", ".mp3": "mp3"}
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+CONTENT_TYPES = {"wav": "audio/wav", "flac": "audio/flac", "ogg": "audio/ogg", "mp3": "audio/mpeg"}
+
+# Voice-grade default bitrates in kbps
+DEFAULT_BITRATES = {"ogg": 32, "mp3": 64}
+# libsndfile takes a 0..1 compression level instead of a bitrate; these are
+# the bitrates (kbps, mono) it maps level 0 and level 1 to
+BITRATE_RANGES = {"ogg": (256, 6), "mp3": (160, 8), "mp3_mpeg1": (320, 32)}
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def format_for_path(path, default="wav"):
+    """Output format name from a file extension"""
+    return EXTENSION_FORMATS.get(Path(path).suffix.lower(), default)
+
+
+class OutputSettings:
+    """Output format, sample rate, bitrate and post-processing"""
+
+    FIELDS = {"format": str, "sample_rate": int, "bitrate": int,
+              "trim_silence": _flag, "max_pause": float, "loudness": float}
+
+    def __init__(self, format="wav", sample_rate=None, bitrate=None, trim_silence=False,
+                 max_pause=None, loudness=None):
+        self.format = format
+        self.sample_rate = sample_rate or None
+        self.bitrate = bitrate or None
+        self.trim_silence = bool(trim_silence)
+        self.max_pause = max_pause or None
+        self.loudness = loudness
+        self.validate()
+
+    def validate(self):
+        if self.format not in OUTPUT_FORMATS:
+            raise ValueError(f"format must be one of {tuple(OUTPUT_FORMATS)}")
+        if self.format == "ogg" and self.sample_rate and self.sample_rate not in OPUS_SAMPLE_RATES:
+            raise ValueError(f"Opus supports sample rates {OPUS_SAMPLE_RATES}")
+        if self.bitrate is not None and self.bitrate <= 0:
+            raise ValueError("bitrate must be positive")
+        if self.max_pause is not None and self.max_pause < 0:
+            raise ValueError("max_pause cannot be negative")
+        if self.loudness is not None and not ABSOLUTE_GATE_LUFS < self.loudness < 0:
+            raise ValueError(f"loudness must be between {ABSOLUTE_GATE_LUFS:g} and 0 LUFS")
+
+    @property
+    def processing(self):
+        """Whether the audio is changed before encoding (other than resampling)"""
+        return self.trim_silence or self.max_pause is not None or self.loudness is not None
+
+    def processor(self, source_rate):
+        """Streaming post-processing and resampling for these settings, or None"""
+        stages = []
+        if self.trim_silence or self.max_pause is not None:
+            stages.append(SilenceShaper(source_rate, self.trim_silence, self.max_pause))
+        if self.loudness is not None:
+            stages.append(LoudnessNormalizer(source_rate, self.loudness))
+        if self.target_rate(source_rate) != source_rate:
+            stages.append(StreamResampler(source_rate, self.target_rate(source_rate)))
+        return ProcessingChain(stages) if stages else None
+
+    @property
+    def extension(self):
+        return OUTPUT_FORMATS[self.format][2]
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, values):
+        parsed = {name: cls.FIELDS[name](value) for name, value in values.items()
+                  if name in cls.FIELDS and value is not None}
+        return cls(**parsed)
+
+    def updated(self, **overrides):
+        """Copy with the non-None overrides applied"""
+        values = self.to_dict()
+        values.update({name: value for name, value in overrides.items() if value is not None})
+        return OutputSettings.from_dict(values)
+
+    def for_path(self, path):
+        """These settings with the format implied by the file extension"""
+        return self.updated(format=format_for_path(path, self.format))
+
+    @classmethod
+    def load(cls, config_file=None, environ=None, overrides=None):
+        """Resolve defaults < config file < environment < overrides"""
+        values = cls().to_dict()
+
+        config_file = Path(config_file) if config_file else get_config_path()
+        if config_file.exists():
+            with open(config_file, encoding="utf-8") as f:
+                values.update(json.load(f).get(CONFIG_SECTION, {}))
+
+        environ = os.environ if environ is None else environ
+        for name in cls.FIELDS:
+            env_name = ENV_PREFIX + name.upper()
+            if environ.get(env_name):
+                values[name] = environ[env_name]
+
+        values.update({name: value for name, value in (overrides or {}).items()
+                       if value is not None})
+        return cls.from_dict(values)
+
+    def target_rate(self, source_rate):
+        return self.sample_rate or source_rate
+
+    def compression_level(self, sample_rate):
+        """libsndfile compression level for the requested bitrate (None for lossless)"""
+        if self.format not in BITRATE_RANGES:
+            return None
+        bitrate = self.bitrate or DEFAULT_BITRATES[self.format]
+        key = "mp3_mpeg1" if self.format == "mp3" and sample_rate >= 32000 else self.format
+        highest, lowest = BITRATE_RANGES[key]
+        level = (highest - bitrate) / (highest - lowest)
+        # Level 1.0 is rejected by the MP3 encoder
+        return min(0.99, max(0.0, level))
+
+    def open(self, file, source_rate):
+        """Open a SoundFile writer (path or file object) for these settings"""
+        sample_rate = self.target_rate(source_rate)
+        format_name, subtype, _ = OUTPUT_FORMATS[self.format]
+        if isinstance(file, Path):
+            file = str(file)
+        return sf.SoundFile(file, "w", samplerate=sample_rate, channels=1,
+                            format=format_name, subtype=subtype,
+                            compression_level=self.compression_level(sample_rate),
+                            bitrate_mode="CONSTANT" if self.format == "mp3" else None)
+
+    def describe(self):
+        parts = [self.format]
+        if self.sample_rate:
+            parts.append(f"{self.sample_rate} Hz")
+        if self.format in DEFAULT_BITRATES:
+            parts.append(f"{self.bitrate or DEFAULT_BITRATES[self.format]} kbps")
+        if self.trim_silence:
+            parts.append("trimmed")
+        if self.max_pause is not None:
+            parts.append(f"pauses <= {self.max_pause:g}s")
+        if self.loudness is not None:
+            parts.append(f"{self.loudness:g} LUFS")
+        return ", ".join(parts)
+
+
+class EncoderStage:
+    """Encodes audio chunks into a file on a background thread.
+
+    put() hands a chunk over and returns immediately (blocking only when
+    the queue is full); close() waits for the encoder and re-raises any
+    encoding error.
+    """
+
+    _DONE = object()
+
+    def __init__(self, path, settings, source_rate, queue_size=16):
+        self.path = Path(path) if isinstance(path, (str, os.PathLike)) else path
+        self.settings = settings
+        self.source_rate = source_rate
+        self.sample_rate = settings.target_rate(source_rate)
+        self.frames = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        # Encoding time and bytes count towards the job that opened the file
+        self._thread = threading.Thread(target=pipeline_metrics.bind(self._run),
+                                        name="audio-encoder", daemon=True)
+        self._thread.start()
+
+    def _write(self, writer, samples):
+        with pipeline_metrics.stage("encode"):
+            writer.write(samples)
+        self.frames += len(samples)
+
+    def _run(self):
+        # Post-processing and resampling keep state between chunks, so the
+        # result does not depend on how the audio was split
+        processor = self.settings.processor(self.source_rate)
+        done = False
+        try:
+            with self.settings.open(self.path, self.source_rate) as writer:
+                while True:
+                    samples = self._queue.get()
+                    if samples is self._DONE:
+                        done = True
+                        break
+                    if processor is not None:
+                        with pipeline_metrics.stage("postprocess"):
+                            if samples.dtype == np.int16:
+                                samples = samples.astype(np.float32) / 32768
+                            samples = processor.process(samples)
+                    self._write(writer, samples)
+                if processor is not None:
+                    with pipeline_metrics.stage("postprocess"):
+                        samples = processor.flush()
+                    self._write(writer, samples)
+            pipeline_metrics.add_bytes(self._output_bytes())
+        except Exception as e:
+            self._error = e
+            # Keep draining so producers never block on a dead encoder
+            # (unless close() already sent the end marker: nothing more comes)
+            while not done and self._queue.get() is not self._DONE:
+                pass
+
+    def _output_bytes(self):
+        if isinstance(self.path, Path):
+            return self.path.stat().st_size if self.path.exists() else 0
+        return self.path.tell() if hasattr(self.path, "tell") else 0
+
+    def put(self, samples):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(samples)
+
+    def close(self):
+        """Flush and finish the file, returns its duration in seconds"""
+        self._queue.put(self._DONE)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self.frames / self.sample_rate
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def encode_file(samples, sample_rate, path, settings=None):
+    """Encode a complete buffer (e.g. the GUI's in-memory audio) to path"""
+    settings = (settings or OutputSettings.load()).for_path(path)
+    stage = EncoderStage(path, settings, sample_rate)
+    stage.put(samples)
+    return stage.close()
+
+
+def encode_bytes(samples, sample_rate, settings):
+    """Encode a complete buffer in memory, returns the file contents"""
+    buffer = io.BytesIO()
+    stage = EncoderStage(buffer, settings, sample_rate)
+    stage.put(samples)
+    stage.close()
+    return buffer.getvalue()
+
+
+def transcode_file(source, path, settings=None, block_frames=1 << 18):
+    """Re-encode an audio file block by block (memory stays bounded)"""
+    settings = (settings or OutputSettings.load()).for_path(path)
+    with sf.SoundFile(str(source)) as reader:
+        stage = EncoderStage(path, settings, reader.samplerate)
+        for block in reader.blocks(blocksize=block_frames, dtype="float32"):
+            stage.put(block)
+    return stage.close()
+
+
+def add_output_arguments(parser):
+    """Add output format flags to an argparse parser"""
+    group = parser.add_argument_group("Output format")
+    group.add_argument("--format", choices=tuple(OUTPUT_FORMATS),
+                       help="Audio format (default: wav, or from kokoro_config.json)")
+    group.add_argument("--sample-rate", type=int,
+                       help="Output sample rate, e.g. 16000 for voice-grade files (default: 24000)")
+    group.add_argument("--bitrate", type=int,
+                       help=f"Bitrate in kbps for ogg/mp3 (default: {DEFAULT_BITRATES})")
+    group.add_argument("--trim-silence", action="store_true", default=None,
+                       help="Trim silence at the start and end")
+    group.add_argument("--max-pause", type=float,
+                       help="Shorten pauses longer than this many seconds")
+    group.add_argument("--loudness", type=float,
+                       help="Normalize loudness to this target in LUFS, e.g. -16 (speech) "
+                            "or -19 (mono podcast)")
+    return group
+
+
+def output_settings_from_args(args):
+    """Resolve the output settings including command-line overrides"""
+    overrides = {name: getattr(args, name, None) for name in OutputSettings.FIELDS}
+    return OutputSettings.load(getattr(args, "config", None), overrides=overrides)
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Batch command-line renderer for Kokoro TTS
+
+Renders many texts (a directory, a glob pattern or a JSONL manifest) across a
+pool of worker processes. Every worker loads the ONNX model once and then
+processes jobs until the queue is drained. Results are appended to a
+results manifest so an interrupted run can simply be restarted: jobs whose
+output already exists with a matching digest are skipped, and jobs that were
+cut off mid-way resume from their last checkpointed segment.
+
+Usage:
+    python run.py batch texts/ -o output/batch --voice af_bella --workers 4
+    python run.py batch "chapters/*.txt" -o output/book
+    python run.py batch jobs.jsonl -o output/notifications
+    python run.py batch texts/ -o output/voice --format ogg --sample-rate 16000 --bitrate 24
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from tts_engine import (KokoroEngine, EngineError, ModelNotFoundError, resolve_model_paths,
+                        get_output_dir)
+from synthesis_cache import DEFAULT_MAX_BYTES
+from long_form import LongFormRenderer
+from audio_encoder import OutputSettings, add_output_arguments, output_settings_from_args
+from model_variants import VARIANT_POLICIES
+from engine_config import (SessionConfig, add_session_arguments, session_config_from_args,
+                           positive_int)
+import pipeline_metrics
+import profiling
+
+RESULTS_MANIFEST = "results.jsonl"
+DEFAULT_VOICE = "af_bella"
+
+# Engine owned by each worker process (loaded once in the initializer)
+_worker_engine = None
+_worker_profile_mode = None
+
+
+class BatchJob:
+    """A single text-to-audio job"""
+
+    def __init__(self, job_id, text, output, voice, speed, output_settings=None):
+        self.job_id = job_id
+        self.text = text
+        self.output = Path(output)
+        self.voice = voice
+        self.speed = speed
+        self.output_settings = (output_settings or OutputSettings()).for_path(self.output)
+        # Model files and blend contents the job is rendered with (see model_identity)
+        self.model_version = None
+        self.voice_key = voice
+
+    @property
+    def digest(self):
+        """Digest of everything that affects the rendered audio"""
+        key = json.dumps([self.text, self.voice_key, self.speed, self.output_settings.to_dict(),
+                          self.model_version], ensure_ascii=False)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _job_from_file(path, root, output_dir, voice, speed, output_settings):
+    relative = Path(path).relative_to(root) if root else Path(Path(path).name)
+    text = Path(path).read_text(encoding="utf-8")
+    output = Path(output_dir) / relative.with_suffix(output_settings.extension)
+    return BatchJob(str(relative.with_suffix("")), text, output, voice, speed, output_settings)
+
+
+def discover_jobs(source, output_dir, voice=DEFAULT_VOICE, speed=1.0, output_settings=None):
+    """Build jobs from a directory, a glob pattern or a JSONL manifest.
+
+    Manifest lines are JSON objects with "text" or "text_file" and optional
+    "id", "voice", "speed" and "output" keys. The audio format follows the
+    output extension, which defaults to the one of output_settings.
+    """
+    source_path = Path(source)
+    output_settings = output_settings or OutputSettings()
+    jobs = []
+
+    if source_path.is_dir():
+        for path in sorted(source_path.rglob("*.txt")):
+            jobs.append(_job_from_file(path, source_path, output_dir, voice, speed,
+                                       output_settings))
+    elif source_path.suffix == ".jsonl" and source_path.is_file():
+        with open(source_path, encoding="utf-8") as manifest:
+            for line_number, line in enumerate(manifest, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                if "text" in entry:
+                    text = entry["text"]
+                else:
+                    text_file = source_path.parent / entry["text_file"]
+                    text = text_file.read_text(encoding="utf-8")
+                job_id = str(entry.get("id", line_number))
+                output = entry.get("output") or f"{job_id}{output_settings.extension}"
+                jobs.append(BatchJob(job_id, text, Path(output_dir) / output,
+                                     entry.get("voice", voice), float(entry.get("speed", speed)),
+                                     output_settings))
+    else:
+        matches = sorted(glob.glob(source, recursive=True))
+        root = Path(os.path.commonpath(matches)) if len(matches) > 1 else None
+        if root is not None and root.is_file():
+            root = root.parent
+        for path in matches:
+            if Path(path).is_file():
+                jobs.append(_job_from_file(path, root, output_dir, voice, speed,
+                                           output_settings))
+
+    return jobs
+
+
+def model_identity(model_file, voices_file):
+    """Model version and blend cache keys, without loading the model"""
+    from voice_blends import BlendIndex
+    try:
+        voice_keys = BlendIndex(Path(voices_file).parent).cache_keys()
+    except (OSError, ValueError):
+        voice_keys = {}
+    return KokoroEngine(model_file, voices_file).model_version(), voice_keys
+
+
+def load_completed(manifest_path):
+    """Map of job output path -> digest for jobs that finished successfully"""
+    completed = {}
+    if not manifest_path.exists():
+        return completed
+    with open(manifest_path, encoding="utf-8") as manifest:
+        for line in manifest:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a truncated last line
+                continue
+            if record.get("status") == "ok":
+                completed[record["output"]] = record["digest"]
+    return completed
+
+
+def is_done(job, completed):
+    return completed.get(str(job.output)) == job.digest and job.output.exists()
+
+
+def _init_worker(model_file, voices_file, cache_dir=None, cache_bytes=None, session_settings=None,
+                 trace_path=None, profile_mode=None):
+    """Load the model once per worker process"""
+    global _worker_engine, _worker_profile_mode
+    # Workers append their own job lines to the shared trace log
+    pipeline_metrics.METRICS.enable_trace(trace_path)
+    # and profile their own jobs (the parent only waits)
+    _worker_profile_mode = profile_mode
+    session_config = SessionConfig.from_dict(session_settings) if session_settings else None
+    _worker_engine = KokoroEngine(model_file, voices_file, session_config).load()
+    if cache_dir:
+        _worker_engine.enable_cache(cache_dir, cache_bytes)
+
+
+def _render_job(job_id, text, output, voice, speed, output_settings=None):
+    """Render one job inside a worker process"""
+    # Segments are appended to a .part file with a checkpoint and renamed when
+    # finished, so a crash never leaves a partial file that looks finished and
+    # a restarted batch resumes long jobs where they stopped
+    settings = OutputSettings.from_dict(output_settings) if output_settings else None
+    renderer = LongFormRenderer(_worker_engine, text, output, voice, speed,
+                                output_settings=settings)
+    if not _worker_profile_mode:
+        return renderer.render()
+    profiler = profiling.Profiler(_worker_profile_mode, "batch", renderer.chars, voice, speed)
+    with profiler:
+        info = renderer.render()
+    info["profile"] = profiler.summary["files"][-1]
+    return info
+
+
+def _append_record(manifest, record):
+    manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+    manifest.flush()
+    os.fsync(manifest.fileno())
+
+
+def run_batch(jobs, output_dir, workers, model_file=None, voices_file=None, force=False,
+              cache_dir=None, cache_bytes=DEFAULT_MAX_BYTES, session_config=None,
+              profile_mode=None):
+    """Render jobs across a process pool, returns (rendered, skipped, failed)
+
+    The stage timings measured in the workers are added to the pipeline
+    metrics of this process (and to every results manifest record).
+    With profile_mode every job is profiled in its worker (see profiling).
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / RESULTS_MANIFEST
+
+    default_model, default_voices = resolve_model_paths()
+    model_file = str(model_file or default_model)
+    voices_file = str(voices_file or default_voices)
+    # Fail fast instead of breaking every worker in the pool
+    if not Path(model_file).exists():
+        raise ModelNotFoundError("Model", model_file)
+    if not Path(voices_file).exists():
+        raise ModelNotFoundError("Voices", voices_file)
+
+    # A job is only done if it was rendered by the same model, voices and blends
+    model_version, voice_keys = model_identity(model_file, voices_file)
+    for job in jobs:
+        job.model_version = model_version
+        job.voice_key = voice_keys.get(job.voice, job.voice)
+
+    completed = {} if force else load_completed(manifest_path)
+    pending = [job for job in jobs if not is_done(job, completed)]
+    skipped = len(jobs) - len(pending)
+    print(f"📋 {len(jobs)} jobs, {skipped} already done, {len(pending)} to render "
+          f"on {workers} worker(s)")
+    if not pending:
+        return 0, skipped, 0
+
+    # Without an explicit thread count every worker would use all cores;
+    # split them between the workers instead of oversubscribing
+    session_config = session_config or SessionConfig.load()
+    if not session_config.intra_op_threads:
+        session_config = session_config.updated(
+            intra_op_threads=max(1, (os.cpu_count() or 1) // workers))
+    print(f"⚙️  ONNX Runtime: {session_config.describe()}")
+
+    rendered = failed = 0
+    start_time = time.time()
+    with open(manifest_path, "a", encoding="utf-8") as manifest, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(model_file, voices_file, cache_dir, cache_bytes,
+                                          session_config.to_dict(),
+                                          pipeline_metrics.METRICS.trace_path,
+                                          profile_mode)) as pool:
+        futures = {}
+        for job in pending:
+            job.output.parent.mkdir(parents=True, exist_ok=True)
+            future = pool.submit(_render_job, job.job_id, job.text, str(job.output),
+                                 job.voice, job.speed, job.output_settings.to_dict())
+            futures[future] = job
+
+        for future in as_completed(futures):
+            job = futures[future]
+            record = {
+                "id": job.job_id,
+                "output": str(job.output),
+                "digest": job.digest,
+                "voice": job.voice,
+                "speed": job.speed,
+                "chars": len(job.text),
+            }
+            try:
+                info = future.result()
+                record.update(status="ok",
+                              audio_seconds=round(info["audio_seconds"], 3),
+                              generation_seconds=round(info["generation_seconds"], 3),
+                              bytes_written=info["bytes_written"],
+                              stages=info["stages"])
+                if "profile" in info:
+                    record["profile"] = info["profile"]
+                pipeline_metrics.METRICS.absorb_stages(info["stages"])
+                pipeline_metrics.METRICS.record_job(
+                    {"kind": "long_form", "status": "ok", "wall_seconds": info["generation_seconds"],
+                     "audio_seconds": info["audio_seconds"],
+                     "bytes_written": info["bytes_written"]}, trace=False)
+                rendered += 1
+                print(f"✅ {job.job_id} ({info['audio_seconds']:.1f}s audio "
+                      f"in {info['generation_seconds']:.1f}s)")
+            except Exception as e:
+                record.update(status="error", error=str(e))
+                pipeline_metrics.METRICS.record_job({"kind": "long_form", "status": "failed"},
+                                                    trace=False)
+                failed += 1
+                print(f"❌ {job.job_id}: {e}")
+            _append_record(manifest, record)
+
+    elapsed = time.time() - start_time
+    print(f"\n🎉 Rendered {rendered}, skipped {skipped}, failed {failed} in {elapsed:.1f}s")
+    stages = pipeline_metrics.METRICS.snapshot()["stage_seconds"]
+    breakdown = pipeline_metrics.describe_stages(stages)
+    if breakdown:
+        print(f"⏱️  Worker time by stage: {breakdown}")
+    if profile_mode:
+        print(f"🔬 Job profiles ({profile_mode}): {get_output_dir('profiles')}")
+    print(f"Results manifest: {manifest_path}")
+    return rendered, skipped, failed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="run.py batch",
+                                     description="Render many texts to audio in parallel")
+    parser.add_argument("source", help="Directory of .txt files, glob pattern or .jsonl manifest")
+    parser.add_argument("-o", "--output-dir", default="output/batch",
+                        help="Directory for rendered audio and results.jsonl")
+    parser.add_argument("-w", "--workers", type=positive_int,
+                        default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Number of worker processes (each loads the model once)")
+    parser.add_argument("--voice", default=DEFAULT_VOICE, help="Default voice id")
+    parser.add_argument("--speed", type=float, default=1.0, help="Default speed (0.5-2.0)")
+    parser.add_argument("--models-dir", help="Directory with kokoro-v1.0.onnx and voices-v1.0.bin")
+    parser.add_argument("--cache-dir",
+                        help="Synthesis cache shared by the workers (repeated sentences are reused)")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Synthesis cache size limit in MB")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-render jobs even if they are already done")
+    parser.add_argument("--model-variant", choices=VARIANT_POLICIES,
+                        help="Model variant or selection policy (default: fp32)")
+    add_output_arguments(parser)
+    add_session_arguments(parser)
+    pipeline_metrics.add_metrics_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    pipeline_metrics.configure_from_args(args)
+
+    jobs = discover_jobs(args.source, args.output_dir, args.voice, args.speed,
+                         output_settings_from_args(args))
+    if not jobs:
+        print(f"❌ No jobs found in {args.source}")
+        return False
+
+    model_file, voices_file = resolve_model_paths(args.models_dir, args.model_variant)
+    try:
+        _, _, failed = run_batch(jobs, args.output_dir, args.workers,
+                                 model_file, voices_file, args.force,
+                                 args.cache_dir, args.cache_size_mb * 1024 * 1024,
+                                 session_config_from_args(args),
+                                 profiling.mode_from_args(args))
+    except EngineError as e:
+        print(f"❌ {e}")
+        return False
+    finally:
+        pipeline_metrics.write_metrics_file(args)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
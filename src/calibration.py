@@ -0,0 +1,153 @@
+"""
+Speech duration and generation time estimates
+
+The defaults come from an informal test (about 1200 characters per minute of
+audio, 0.2 seconds of generation per second of audio). Running
+scripts/benchmark.py --calibrate measures both per language on this machine
+and saves them to output/benchmarks/calibration.json, which replaces the
+defaults from then on.
+
+Finished generations refine the estimates further: each one is recorded in
+output/benchmarks/learned_rates.json as running averages per language and
+per voice (blends and faster voices drift away from the language average).
+The most specific rate wins: the voice's own once it has a few samples, then
+the language's, then the benchmark calibration, then the defaults.
+"""
+
+import json
+import time
+
+from tts_engine import get_output_dir
+
+CALIBRATION_FILENAME = "calibration.json"
+LEARNED_FILENAME = "learned_rates.json"
+
+DEFAULT_CHARS_PER_SECOND = 1200 / 60
+DEFAULT_RTF = 0.2
+
+# Weight of a new observation once an average has a few samples (the first
+# samples are averaged evenly so a single odd run does not stick)
+LEARNING_RATE = 0.2
+# Samples a voice needs before its own rates replace its language's
+MIN_VOICE_SAMPLES = 2
+# Shorter generations are dominated by fixed overhead and not recorded
+MIN_AUDIO_SECONDS = 1.0
+
+
+def get_calibration_path():
+    return get_output_dir("benchmarks") / CALIBRATION_FILENAME
+
+
+def get_learned_path():
+    return get_output_dir("benchmarks") / LEARNED_FILENAME
+
+
+def load_calibration(path=None):
+    """Calibration data saved by the benchmark, or None"""
+    path = path or get_calibration_path()
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(data, path):
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    tmp_path.replace(path)
+    return path
+
+
+def save_calibration(languages, metadata=None, path=None):
+    """Save per-language {"chars_per_second": ..., "rtf": ...} measurements"""
+    data = {"created": int(time.time()), "languages": languages}
+    data.update(metadata or {})
+    return _write_json(data, path or get_calibration_path())
+
+
+def _running_average(entry, field, value):
+    """Fold value into entry[field], counting samples in entry[field + "_samples"]"""
+    samples = entry.get(f"{field}_samples", 0) + 1
+    weight = max(LEARNING_RATE, 1 / samples)
+    previous = entry.get(field)
+    entry[field] = value if previous is None else previous + weight * (value - previous)
+    entry[f"{field}_samples"] = samples
+
+
+class Estimator:
+    """Estimates audio duration and generation time for a text"""
+
+    def __init__(self, calibration=None, learned=None, learned_path=None):
+        self.languages = (calibration or {}).get("languages", {})
+        # "language:<code>" / "voice:<id>" -> running averages
+        self.learned = (learned or {}).get("rates", {})
+        self.learned_path = learned_path
+
+    @classmethod
+    def load(cls, path=None, learned_path=None):
+        learned_path = learned_path or get_learned_path()
+        return cls(load_calibration(path), load_calibration(learned_path), learned_path)
+
+    @property
+    def is_calibrated(self):
+        return bool(self.languages or self.learned)
+
+    def _calibrated_rates(self, language):
+        measured = self.languages.get(language)
+        if measured is None and self.languages:
+            # Unmeasured language: average over the measured ones
+            values = list(self.languages.values())
+            measured = {
+                "chars_per_second": sum(v["chars_per_second"] for v in values) / len(values),
+                "rtf": sum(v["rtf"] for v in values) / len(values),
+            }
+        if measured is None:
+            return DEFAULT_CHARS_PER_SECOND, DEFAULT_RTF
+        return measured["chars_per_second"], measured["rtf"]
+
+    def _learned(self, key, field, min_samples=1):
+        entry = self.learned.get(key)
+        if entry and entry.get(f"{field}_samples", 0) >= min_samples:
+            return entry[field]
+        return None
+
+    def rates(self, language, voice=None):
+        """(chars per audio second, real-time factor) for a language and voice"""
+        rates = list(self._calibrated_rates(language))
+        for index, field in enumerate(("chars_per_second", "rtf")):
+            candidates = [self._learned(f"language:{language}", field)]
+            if voice:
+                candidates.insert(0, self._learned(f"voice:{voice}", field, MIN_VOICE_SAMPLES))
+            learned = next((value for value in candidates if value is not None), None)
+            if learned is not None:
+                rates[index] = learned
+        return tuple(rates)
+
+    def estimate(self, char_count, language, speed=1.0, voice=None):
+        """Return (audio seconds, generation seconds)"""
+        chars_per_second, rtf = self.rates(language, voice)
+        audio_seconds = char_count / chars_per_second / speed
+        return audio_seconds, audio_seconds * rtf
+
+    def record(self, char_count, language, voice, speed, audio_seconds, generation_seconds=None):
+        """Learn from a finished generation; returns False if it was too short to count.
+
+        generation_seconds is None when the audio came from the cache (its
+        duration still tells the speaking rate, but not the synthesis speed).
+        """
+        if not char_count or audio_seconds < MIN_AUDIO_SECONDS:
+            return False
+        # Rates are stored for speed 1.0
+        chars_per_second = char_count / (audio_seconds * speed)
+        for key in (f"language:{language}", f"voice:{voice}"):
+            entry = self.learned.setdefault(key, {})
+            _running_average(entry, "chars_per_second", chars_per_second)
+            if generation_seconds is not None:
+                _running_average(entry, "rtf", generation_seconds / audio_seconds)
+        if self.learned_path is not None:
+            try:
+                _write_json({"updated": int(time.time()), "rates": self.learned}, self.learned_path)
+            except OSError as e:
+                print(f"⚠️  Could not save learned rates: {e}")
+        return True
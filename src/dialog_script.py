@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Multi-voice dialog scripts
+
+A script is plain text with one speaker tag per line:
+
+    # Episode 12
+    @voice Host = af_bella
+    @voice Guest = George
+    @gap 0.4
+    @crossfade 0.05
+
+    Host: Welcome back to the show.
+    Guest: Thanks for having me.
+    A line without a tag continues the previous speaker.
+    @pause 1.5
+    Host: After a longer pause...
+
+Speaker tags are names mapped with @voice (to a voice id or a readable voice
+name like "George"), or voice ids used directly ("af_sky: Hi!"). Lines are
+grouped by voice and the groups are synthesized in parallel; the results are
+then assembled in script order with @gap seconds of silence between lines,
+or overlapped by @crossfade seconds when a crossfade is set. @pause adds
+extra silence before the next line (after the last line: at the end).
+
+Usage:
+    python run.py dialog podcast.txt -o output/podcast.wav
+    python run.py dialog podcast.txt -o output/podcast.mp3 --gap 0.3 --workers 3
+"""
+
+import argparse
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from tts_engine import KokoroEngine, EngineError, ModelNotFoundError, resolve_model_paths
+from voice_catalog import find_voice
+from voice_blends import register_blends
+from model_variants import VARIANT_POLICIES
+from engine_config import add_session_arguments, session_config_from_args
+from audio_encoder import add_output_arguments, output_settings_from_args, encode_file
+import pipeline_metrics
+import profiling
+
+DEFAULT_GAP = 0.35
+DEFAULT_CROSSFADE = 0.0
+
+_TAG_PATTERN = re.compile(r"^([^:\s][^:]{0,40}?)\s*:\s*(.*)$")
+_VOICE_PATTERN = re.compile(r"^(.+?)\s*=\s*(.+)$")
+
+
+class ScriptError(ValueError):
+    """A dialog script that cannot be parsed"""
+
+    def __init__(self, line_number, message):
+        # line_number None: the script as a whole
+        super().__init__(f"line {line_number}: {message}" if line_number else message)
+        self.line_number = line_number
+
+
+class DialogLine:
+    """One spoken line of a script"""
+
+    def __init__(self, index, speaker, voice, text, pause_before=0.0):
+        self.index = index
+        self.speaker = speaker
+        self.voice = voice
+        self.text = text
+        self.pause_before = pause_before
+
+
+class DialogScript:
+    """Parsed script: lines in order plus assembly settings"""
+
+    def __init__(self, lines, voices, gap=DEFAULT_GAP, crossfade=DEFAULT_CROSSFADE,
+                 pause_after=0.0):
+        self.lines = lines
+        self.voices = voices
+        self.gap = gap
+        self.crossfade = crossfade
+        # Silence after the last line (a trailing @pause)
+        self.pause_after = pause_after
+
+    @property
+    def speakers(self):
+        return list(dict.fromkeys(line.speaker for line in self.lines))
+
+    def groups(self):
+        """Lines grouped by voice, each group in script order"""
+        groups = {}
+        for line in self.lines:
+            groups.setdefault(line.voice, []).append(line)
+        return groups
+
+
+def _seconds(value, line_number, directive):
+    try:
+        seconds = float(value)
+    except ValueError:
+        raise ScriptError(line_number, f"@{directive} needs a number of seconds") from None
+    if seconds < 0:
+        raise ScriptError(line_number, f"@{directive} cannot be negative")
+    return seconds
+
+
+def parse_script(text, voices=None):
+    """Parse a dialog script; voices maps extra speaker names to voice ids"""
+    speaker_voices = dict(voices or {})
+    gap, crossfade = DEFAULT_GAP, DEFAULT_CROSSFADE
+    lines = []
+    pending_pause = 0.0
+
+    for line_number, raw in enumerate(text.splitlines(), 1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        if line.startswith("@"):
+            directive, _, value = line[1:].partition(" ")
+            directive, value = directive.lower(), value.strip()
+            if directive == "voice":
+                match = _VOICE_PATTERN.match(value)
+                if not match:
+                    raise ScriptError(line_number, "expected @voice Name = voice")
+                voice = find_voice(match.group(2))
+                if voice is None:
+                    raise ScriptError(line_number, f"unknown voice '{match.group(2)}'")
+                speaker_voices[match.group(1)] = voice
+            elif directive == "gap":
+                gap = _seconds(value, line_number, directive)
+            elif directive == "crossfade":
+                crossfade = _seconds(value, line_number, directive)
+            elif directive == "pause":
+                pending_pause += _seconds(value, line_number, directive)
+            else:
+                raise ScriptError(line_number, f"unknown directive @{directive}")
+            continue
+
+        match = _TAG_PATTERN.match(line)
+        speaker = match.group(1) if match else None
+        voice = None
+        if speaker is not None:
+            voice = speaker_voices.get(speaker) or find_voice(speaker)
+        if voice is not None:
+            lines.append(DialogLine(len(lines), speaker, voice, match.group(2), pending_pause))
+            pending_pause = 0.0
+            continue
+
+        # Untagged text (or a colon that is not a known speaker) continues the line
+        if not lines:
+            if speaker is not None:
+                raise ScriptError(line_number, f"unknown speaker '{speaker}'")
+            raise ScriptError(line_number, "text before the first speaker tag")
+        lines[-1].text = f"{lines[-1].text} {line}".strip()
+
+    # A tag with no text at all ("Host:" followed by a directive) says nothing;
+    # its pause moves on to the next line
+    trailing_pause, pending_pause = pending_pause, 0.0
+    spoken = []
+    for line in lines:
+        if not line.text:
+            pending_pause += line.pause_before
+            continue
+        line.pause_before, pending_pause = line.pause_before + pending_pause, 0.0
+        line.index = len(spoken)
+        spoken.append(line)
+    if not spoken:
+        raise ScriptError(None, "the script has no speaker lines")
+    return DialogScript(spoken, speaker_voices, gap, crossfade,
+                        pause_after=pending_pause + trailing_pause)
+
+
+def assemble(parts, lines, sample_rate, gap=DEFAULT_GAP, crossfade=DEFAULT_CROSSFADE,
+             pause_after=0.0):
+    """Join per-line audio in order with silence gaps or crossfades"""
+    gap_frames = int(round(gap * sample_rate))
+    fade_frames = int(round(crossfade * sample_rate))
+
+    # Where each line starts and how much it overlaps the previous one
+    placements = []
+    offset = 0
+    for position, (samples, line) in enumerate(zip(parts, lines)):
+        pause = int(round(line.pause_before * sample_rate))
+        overlap = 0
+        if position and not pause and fade_frames:
+            overlap = min(fade_frames, len(samples), len(parts[position - 1]))
+        elif position:
+            offset += gap_frames
+        offset += pause - overlap
+        placements.append((offset, overlap))
+        offset += len(samples)
+    offset += int(round(pause_after * sample_rate))
+
+    output = np.zeros(offset, dtype=np.float32)
+    for samples, (start, overlap) in zip(parts, placements):
+        samples = np.asarray(samples, dtype=np.float32)
+        if overlap:
+            # Linear crossfade: fade out the tail of the previous line that is
+            # already in the buffer while this line fades in
+            ramp = np.linspace(0.0, 1.0, overlap, dtype=np.float32)
+            output[start:start + overlap] *= 1.0 - ramp
+            output[start:start + overlap] += samples[:overlap] * ramp
+        output[start + overlap:start + len(samples)] = samples[overlap:]
+    return output
+
+
+class DialogRenderer:
+    """Synthesizes a script with one task per voice across a thread pool"""
+
+    def __init__(self, engine, script, speed=1.0, workers=None):
+        self.engine = engine
+        self.script = script
+        self.speed = speed
+        groups = len(script.groups())
+        self.workers = max(1, min(groups, workers or max(1, (os.cpu_count() or 2) // 2)))
+        self.info = None
+
+    def _render_group(self, lines, results, done, cancelled):
+        for line in lines:
+            if cancelled.is_set():
+                return
+            try:
+                results[line.index] = self.engine.synthesize(line.text, line.voice, self.speed)
+            except Exception as e:
+                done.put((line.index, e))
+                return
+            done.put((line.index, None))
+
+    def render_steps(self, progress=None):
+        """Yield after every finished line, returns (samples, sample_rate).
+
+        progress(lines_done, lines_total) is called as lines finish (in any
+        order). Closing the generator stops the remaining synthesis.
+        """
+        start_time = time.time()
+        lines = self.script.lines
+        results = [None] * len(lines)
+        done = queue.Queue()
+        cancelled = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="dialog-voice")
+        try:
+            # The voice threads work for the job that runs the dialog
+            render_group = pipeline_metrics.bind(self._render_group)
+            for group in self.script.groups().values():
+                pool.submit(render_group, group, results, done, cancelled)
+            for finished in range(1, len(lines) + 1):
+                index, error = done.get()
+                if error is not None:
+                    raise EngineError(f"Line {index + 1} ({lines[index].speaker}): {error}")
+                if progress is not None:
+                    progress(finished, len(lines))
+                yield
+        finally:
+            cancelled.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        sample_rate = results[0][1]
+        audio = assemble([samples for samples, _ in results], lines, sample_rate,
+                         self.script.gap, self.script.crossfade, self.script.pause_after)
+        self.info = {
+            "lines": len(lines),
+            "speakers": len(self.script.speakers),
+            "workers": self.workers,
+            "sample_rate": sample_rate,
+            "audio_seconds": len(audio) / sample_rate,
+            "generation_seconds": time.time() - start_time,
+        }
+        return audio, sample_rate
+
+    def render(self, progress=None):
+        """Render the whole script, returns (samples, sample_rate)"""
+        steps = self.render_steps(progress)
+        while True:
+            try:
+                next(steps)
+            except StopIteration as stop:
+                return stop.value
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="run.py dialog",
+                                     description="Render a multi-voice dialog script")
+    parser.add_argument("script", help="Script file (UTF-8), one 'Speaker: text' per line")
+    parser.add_argument("-o", "--output",
+                        help="Output file, format from the extension (default: next to the script)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed (0.5-2.0)")
+    parser.add_argument("--gap", type=float, help=f"Seconds of silence between lines "
+                                                  f"(overrides @gap, default: {DEFAULT_GAP})")
+    parser.add_argument("--crossfade", type=float,
+                        help="Seconds of overlap between lines (overrides @crossfade)")
+    parser.add_argument("-w", "--workers", type=int,
+                        help="Voices synthesized in parallel (default: half the CPU cores)")
+    parser.add_argument("--models-dir", help="Directory with kokoro-v1.0.onnx and voices-v1.0.bin")
+    parser.add_argument("--model-variant", choices=VARIANT_POLICIES,
+                        help="Model variant or selection policy (default: fp32)")
+    add_output_arguments(parser)
+    add_session_arguments(parser)
+    pipeline_metrics.add_metrics_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    pipeline_metrics.configure_from_args(args)
+    source = Path(args.script)
+    # Blend names can be used like voice ids in the script
+    register_blends(args.models_dir)
+    try:
+        script = parse_script(source.read_text(encoding="utf-8"))
+    except ScriptError as e:
+        print(f"❌ {source}: {e}")
+        return False
+    if args.gap is not None:
+        script.gap = args.gap
+    if args.crossfade is not None:
+        script.crossfade = args.crossfade
+    output_settings = output_settings_from_args(args)
+    output = Path(args.output) if args.output else source.with_suffix(output_settings.extension)
+
+    model_file, voices_file = resolve_model_paths(args.models_dir, args.model_variant)
+    try:
+        engine = KokoroEngine(model_file, voices_file, session_config_from_args(args)).load()
+    except (ModelNotFoundError, EngineError) as e:
+        print(f"❌ {e}")
+        return False
+
+    renderer = DialogRenderer(engine, script, args.speed, args.workers)
+    print(f"🎭 {len(script.lines)} lines, {len(script.speakers)} speakers "
+          f"on {renderer.workers} worker(s)")
+
+    def report(done, total):
+        print(f"\r  {done}/{total} lines", end="", flush=True)
+
+    trace = pipeline_metrics.start_job("dialog", source.name, lines=len(script.lines),
+                                       speakers=len(script.speakers))
+    try:
+        with pipeline_metrics.activate(trace), \
+                profiling.profile_run(args, "dialog", sum(len(line.text) for line in script.lines),
+                                      "+".join(script.groups()), args.speed):
+            audio, sample_rate = renderer.render(progress=report)
+            trace.add_audio(len(audio) / sample_rate)
+            output.parent.mkdir(parents=True, exist_ok=True)
+            encode_file(audio, sample_rate, output, output_settings)
+    except EngineError as e:
+        pipeline_metrics.finish_job(trace, "failed", error=str(e))
+        pipeline_metrics.write_metrics_file(args)
+        print(f"\n❌ {e}")
+        return False
+    record = pipeline_metrics.finish_job(trace)
+    pipeline_metrics.write_metrics_file(args)
+    info = renderer.info
+    print(f"\n✅ {output} ({info['audio_seconds']:.1f}s of audio "
+          f"in {info['generation_seconds']:.1f}s)")
+    breakdown = pipeline_metrics.describe_stages(record["stages"])
+    if breakdown:
+        print(f"⏱️  {breakdown}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
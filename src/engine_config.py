@@ -0,0 +1,203 @@
+"""
+ONNX Runtime session configuration for the Kokoro engine
+
+Settings are resolved in increasing priority from built-in defaults, the
+"onnx_runtime" section of kokoro_config.json, KOKORO_ORT_* environment
+variables and command-line flags.
+
+Example kokoro_config.json:
+    {
+        "onnx_runtime": {
+            "intra_op_threads": 4,
+            "inter_op_threads": 1,
+            "graph_optimization": "all",
+            "execution_mode": "sequential",
+            "enable_cpu_mem_arena": true,
+            "enable_mem_pattern": true,
+            "batch_size": 4,
+            "batch_length_spread": 0.25
+        }
+    }
+
+batch_size and batch_length_spread control how the engine feeds the session
+in synthesize_batch(): up to batch_size sentences whose phoneme lengths differ
+by at most batch_length_spread (0.25 = the longest is 25% longer than the
+shortest) run as concurrent session runs. Off by default (batch_size 1):
+every request is synthesized on its own.
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+CONFIG_FILENAME = "kokoro_config.json"
+CONFIG_SECTION = "onnx_runtime"
+ENV_PREFIX = "KOKORO_ORT_"
+
+GRAPH_OPTIMIZATION_LEVELS = ("disabled", "basic", "extended", "all")
+EXECUTION_MODES = ("sequential", "parallel")
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_config_path():
+    """Config file from KOKORO_CONFIG or kokoro_config.json in the project root"""
+    if os.environ.get("KOKORO_CONFIG"):
+        return Path(os.environ["KOKORO_CONFIG"])
+    return Path(__file__).parent.parent / CONFIG_FILENAME
+
+
+class SessionConfig:
+    """ONNX Runtime threading, optimization and memory settings"""
+
+    # name -> parser; 0 threads means "let ONNX Runtime decide"
+    FIELDS = {
+        "intra_op_threads": int,
+        "inter_op_threads": int,
+        "graph_optimization": str,
+        "execution_mode": str,
+        "enable_cpu_mem_arena": _parse_bool,
+        "enable_mem_pattern": _parse_bool,
+        "batch_size": int,
+        "batch_length_spread": float,
+    }
+
+    def __init__(self, intra_op_threads=0, inter_op_threads=0, graph_optimization="all",
+                 execution_mode="sequential", enable_cpu_mem_arena=True,
+                 enable_mem_pattern=True, batch_size=1, batch_length_spread=0.25):
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.graph_optimization = graph_optimization
+        self.execution_mode = execution_mode
+        self.enable_cpu_mem_arena = enable_cpu_mem_arena
+        self.enable_mem_pattern = enable_mem_pattern
+        self.batch_size = batch_size
+        self.batch_length_spread = batch_length_spread
+        self.validate()
+
+    def validate(self):
+        if self.graph_optimization not in GRAPH_OPTIMIZATION_LEVELS:
+            raise ValueError(f"graph_optimization must be one of {GRAPH_OPTIMIZATION_LEVELS}")
+        if self.execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"execution_mode must be one of {EXECUTION_MODES}")
+        if self.intra_op_threads < 0 or self.inter_op_threads < 0:
+            raise ValueError("Thread counts must be >= 0")
+        if self.batch_size < 1 or self.batch_length_spread < 0:
+            raise ValueError("batch_size must be >= 1 and batch_length_spread >= 0")
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, values):
+        parsed = {name: cls.FIELDS[name](value) for name, value in values.items()
+                  if name in cls.FIELDS and value is not None}
+        return cls(**parsed)
+
+    def updated(self, **overrides):
+        """Copy with the non-None overrides applied"""
+        values = self.to_dict()
+        values.update({name: value for name, value in overrides.items() if value is not None})
+        return SessionConfig.from_dict(values)
+
+    @classmethod
+    def load(cls, config_file=None, environ=None, overrides=None):
+        """Resolve defaults < config file < environment < overrides"""
+        values = cls().to_dict()
+
+        config_file = Path(config_file) if config_file else get_config_path()
+        if config_file.exists():
+            with open(config_file, encoding="utf-8") as f:
+                values.update(json.load(f).get(CONFIG_SECTION, {}))
+
+        environ = os.environ if environ is None else environ
+        for name in cls.FIELDS:
+            env_name = ENV_PREFIX + name.upper()
+            if environ.get(env_name):
+                values[name] = environ[env_name]
+
+        values.update({name: value for name, value in (overrides or {}).items()
+                       if value is not None})
+        return cls.from_dict(values)
+
+    def save(self, config_file=None):
+        """Write the settings into the config file, keeping other sections"""
+        config_file = Path(config_file) if config_file else get_config_path()
+        data = {}
+        if config_file.exists():
+            with open(config_file, encoding="utf-8") as f:
+                data = json.load(f)
+        data[CONFIG_SECTION] = self.to_dict()
+        with open(config_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        return config_file
+
+    def build_session_options(self):
+        """Create onnxruntime.SessionOptions from these settings"""
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if self.intra_op_threads:
+            options.intra_op_num_threads = self.intra_op_threads
+        if self.inter_op_threads:
+            options.inter_op_num_threads = self.inter_op_threads
+        options.graph_optimization_level = {
+            "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+        }[self.graph_optimization]
+        options.execution_mode = (ort.ExecutionMode.ORT_PARALLEL
+                                  if self.execution_mode == "parallel"
+                                  else ort.ExecutionMode.ORT_SEQUENTIAL)
+        options.enable_cpu_mem_arena = self.enable_cpu_mem_arena
+        options.enable_mem_pattern = self.enable_mem_pattern
+        return options
+
+    def describe(self):
+        return ", ".join(f"{name}={value}" for name, value in self.to_dict().items())
+
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1 (workers, runs)"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a whole number, got '{value}'") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def add_session_arguments(parser):
+    """Add ONNX Runtime flags to an argparse parser"""
+    group = parser.add_argument_group("ONNX Runtime")
+    group.add_argument("--config", help=f"Config file (default: {CONFIG_FILENAME} in project root)")
+    group.add_argument("--intra-op-threads", type=int,
+                       help="Threads used inside one operator (0 = ONNX Runtime default)")
+    group.add_argument("--inter-op-threads", type=int,
+                       help="Threads used across operators in parallel mode")
+    group.add_argument("--graph-optimization", choices=GRAPH_OPTIMIZATION_LEVELS,
+                       help="Graph optimization level")
+    group.add_argument("--execution-mode", choices=EXECUTION_MODES, help="Operator execution mode")
+    group.add_argument("--cpu-mem-arena", dest="enable_cpu_mem_arena",
+                       action=argparse.BooleanOptionalAction, help="Enable/disable the CPU memory arena")
+    group.add_argument("--mem-pattern", dest="enable_mem_pattern",
+                       action=argparse.BooleanOptionalAction, help="Enable/disable memory pattern planning")
+    group.add_argument("--batch-size", type=int,
+                       help="Sentences run concurrently in batched synthesis "
+                            "(default 1 = one request at a time)")
+    group.add_argument("--batch-length-spread", type=float,
+                       help="Allowed phoneme length spread within a bucket (0.25 = 25%%)")
+    return group
+
+
+def session_config_from_args(args):
+    """Resolve the session config including command-line overrides"""
+    overrides = {name: getattr(args, name, None) for name in SessionConfig.FIELDS}
+    return SessionConfig.load(getattr(args, "config", None), overrides=overrides)
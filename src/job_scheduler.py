@@ -0,0 +1,302 @@
+"""
+Prioritized, cancellable synthesis job scheduler
+
+A job is a generator function that performs one unit of work (usually one
+synthesized chunk) per step and yields between steps; a plain function is a
+job with a single step. A fixed pool of worker
+threads owns the model and always advances the highest-priority runnable job,
+so an interactive preview submitted while a long render is running gets the
+next free step instead of waiting for the whole render. Jobs can be paused,
+resumed and cancelled at any step boundary; the cancelled job's generator
+is closed (running its finally blocks) on a worker thread, never on the
+thread that called cancel().
+
+Every job carries a pipeline_metrics trace that is active while its steps
+run, so the stage timings of its work end up in job.trace.record.
+
+    def speak(job):
+        for samples, sample_rate in engine.synthesize_stream(text, voice):
+            chunks.append(samples)
+            yield                          # step boundary (may be pre-empted here)
+        return np.concatenate(chunks)      # becomes job.result
+
+    job = scheduler.submit("Speech", speak, PRIORITY_NORMAL, on_done=...)
+"""
+
+import inspect
+import itertools
+import threading
+import time
+
+import pipeline_metrics
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 10
+PRIORITY_BULK = 20
+# Work nobody is waiting for yet (speculative synthesis); runs only when idle
+PRIORITY_BACKGROUND = 30
+
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Passed to on_error when a job is cancelled"""
+
+
+class Job:
+    """A unit of scheduled work and its state"""
+
+    def __init__(self, job_id, name, work, priority, on_done=None, on_error=None, estimate=None,
+                 kind="job"):
+        self.id = job_id
+        self.name = name
+        self.work = work
+        self.priority = priority
+        self.on_done = on_done
+        self.on_error = on_error
+        self.state = QUEUED
+        self.steps = 0
+        # Optional (done, total) progress set by the work function
+        self.progress = None
+        # Expected seconds of work (for queue ETAs) and the seconds spent in steps
+        self.estimate = estimate
+        self.run_seconds = 0.0
+        self.trace = pipeline_metrics.start_job(kind, name)
+        # Summary of a profiled run (profiling.Profiler), set by the work function
+        self.profile = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._generator = None
+        self._active = False
+        self._cancel_requested = False
+
+    @property
+    def is_finished(self):
+        return self.state in FINISHED_STATES
+
+    def describe_progress(self):
+        if self.progress is None:
+            return f"{self.steps}" if self.steps else ""
+        done, total = self.progress
+        return f"{done}/{total}"
+
+    def remaining_seconds(self):
+        """Seconds of work left: the measured pace once steps are done, else the estimate"""
+        if self.progress is not None and self.progress[0] and self.run_seconds:
+            done, total = self.progress
+            return self.run_seconds / done * max(0, total - done)
+        if self.estimate is None:
+            return None
+        return max(0.0, self.estimate - self.run_seconds)
+
+
+class JobScheduler:
+    """Runs jobs by priority on a pool of worker threads"""
+
+    def __init__(self, workers=1, on_change=None, keep_finished=20):
+        self.on_change = on_change
+        self.keep_finished = keep_finished
+        self.workers = max(1, workers)
+        self._jobs = []
+        # Cancelled jobs whose generators a worker still has to close
+        self._closing = []
+        self._ids = itertools.count(1)
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._threads = [threading.Thread(target=self._worker_loop, name=f"synthesis-worker-{i}",
+                                          daemon=True)
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, name, work, priority=PRIORITY_NORMAL, on_done=None, on_error=None,
+               estimate=None, kind="job"):
+        """Queue work(job) and return the Job (estimate: expected seconds of work)"""
+        with self._condition:
+            job = Job(next(self._ids), name, work, priority, on_done, on_error, estimate, kind)
+            self._jobs.append(job)
+            self._condition.notify()
+        self._changed()
+        return job
+
+    def jobs(self):
+        """Snapshot of the current and recently finished jobs"""
+        with self._condition:
+            return list(self._jobs)
+
+    def pending(self):
+        with self._condition:
+            return [job for job in self._jobs if not job.is_finished]
+
+    def is_busy(self, min_priority=None):
+        """True if unfinished jobs exist (optionally only those at or above a priority)"""
+        with self._condition:
+            return any(not job.is_finished and job.state != PAUSED
+                       and (min_priority is None or job.priority <= min_priority)
+                       for job in self._jobs)
+
+    def pause(self, job):
+        with self._condition:
+            if job.state in (QUEUED, RUNNING):
+                job.state = PAUSED
+        self._changed()
+
+    def resume(self, job):
+        with self._condition:
+            if job.state == PAUSED:
+                job.state = RUNNING if job._generator is not None else QUEUED
+                self._condition.notify()
+        self._changed()
+
+    def cancel(self, job):
+        """Cancel a job; a job in the middle of a step stops at the next boundary"""
+        with self._condition:
+            if job.is_finished:
+                return
+            job._cancel_requested = True
+            if job._active:
+                return
+            self._finish_cancelled(job)
+            if job._generator is not None:
+                # A started job is closed by a worker (files, checkpoints, threads)
+                self._closing.append(job)
+                self._condition.notify()
+                return
+        self._notify_finished(job)
+
+    def cancel_all(self):
+        for job in self.pending():
+            self.cancel(job)
+
+    def shutdown(self, timeout=None):
+        """Cancel everything and stop the workers.
+
+        Waits up to timeout seconds for the workers to finish their current
+        step and close the cancelled jobs.
+        """
+        self.cancel_all()
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def _next_job(self):
+        """Highest priority runnable job; started jobs keep their queue position"""
+        runnable = [job for job in self._jobs
+                    if job.state in (QUEUED, RUNNING) and not job._active]
+        if not runnable:
+            return None
+        return min(runnable, key=lambda job: (job.priority, job.id))
+
+    def _worker_loop(self):
+        while True:
+            with self._condition:
+                closing = None
+                while True:
+                    # Cleanup of cancelled jobs first, also while stopping
+                    if self._closing:
+                        closing = self._closing.pop(0)
+                        break
+                    if self._stopping:
+                        return
+                    job = self._next_job()
+                    if job is not None:
+                        job._active = True
+                        if job.state == QUEUED:
+                            job.state = RUNNING
+                            job.started = time.time()
+                        break
+                    self._condition.wait()
+            if closing is not None:
+                self._close_cancelled(closing)
+                continue
+            self._changed()
+            self._step(job)
+
+    def _step(self, job):
+        """Advance a job by one step"""
+        finished = False
+        step_start = time.perf_counter()
+        try:
+            with pipeline_metrics.activate(job.trace):
+                if job._generator is None:
+                    outcome = job.work(job)
+                    if not inspect.isgenerator(outcome):
+                        # Plain function: a single step
+                        raise StopIteration(outcome)
+                    job._generator = outcome
+                next(job._generator)
+            job.steps += 1
+        except StopIteration as stop:
+            job.result = stop.value
+            finished = True
+        except Exception as e:
+            job.error = e
+            finished = True
+        job.run_seconds += time.perf_counter() - step_start
+
+        with self._condition:
+            job._active = False
+            if finished:
+                job.state = FAILED if job.error is not None else DONE
+                job.finished = time.time()
+                job._generator = None
+                self._trim_finished()
+            cancelled = not finished and job._cancel_requested
+            if cancelled:
+                self._finish_cancelled(job)
+            self._condition.notify_all()
+        if cancelled:
+            self._close_cancelled(job)
+        elif finished:
+            self._notify_finished(job)
+        else:
+            self._changed()
+
+    def _finish_cancelled(self, job):
+        """Mark cancelled (lock held)"""
+        job.state = CANCELLED
+        job.finished = time.time()
+        job.error = JobCancelled(f"{job.name} cancelled")
+        self._trim_finished()
+
+    def _close_cancelled(self, job):
+        """Let the work function clean up (worker thread, lock not held)"""
+        try:
+            # Runs the generator's finally blocks (closing files etc.)
+            with pipeline_metrics.activate(job.trace):
+                job._generator.close()
+        except Exception:
+            pass
+        job._generator = None
+        self._notify_finished(job)
+
+    def _trim_finished(self):
+        finished = [job for job in self._jobs if job.is_finished]
+        for job in finished[:-self.keep_finished or None]:
+            self._jobs.remove(job)
+
+    def _notify_finished(self, job):
+        pipeline_metrics.finish_job(job.trace, "ok" if job.state == DONE else job.state,
+                                    wall_seconds=job.run_seconds, steps=job.steps)
+        self._changed()
+        if job.state == DONE and job.on_done is not None:
+            job.on_done(job)
+        elif job.state in (FAILED, CANCELLED) and job.on_error is not None:
+            job.on_error(job)
@@ -1,103 +1,120 @@
+import time
+_IMPORT_START = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 import threading
 import os
-import sys
-import tempfile
 import pygame
 import soundfile as sf
-from pathlib import Path
-import time
+from collections import deque
+import numpy as np
 
-# Basic audio processing only
-import wave
+from tts_engine import KokoroEngine, EngineError, ModelNotFoundError, get_output_dir, to_pcm16
+from preview_store import PreviewStore
+from voice_catalog import VOICES, voice_language
+from voice_blends import register_blends
+from calibration import Estimator
+from long_form import LongFormRenderer
+from audio_encoder import OutputSettings, encode_file, transcode_file, format_for_path
+from text_splitter import split_text_into_chunks
+from dialog_script import parse_script, DialogRenderer, ScriptError
+import pipeline_metrics
+import profiling
+from job_scheduler import (JobScheduler, JobCancelled, PRIORITY_INTERACTIVE, PRIORITY_NORMAL,
+                           PRIORITY_BULK, PRIORITY_BACKGROUND, PAUSED)
+from speculative import SpeculativeStore, speculation_steps
 
-# Try to import kokoro_onnx, handle if not installed
-try:
-    from kokoro_onnx import Kokoro
-    KOKORO_AVAILABLE = True
-except ImportError:
-    KOKORO_AVAILABLE = False
+AUDIO_FILETYPES = [("WAV files", "*.wav"), ("FLAC files", "*.flac"),
+                   ("Ogg Opus files", "*.ogg"), ("MP3 files", "*.mp3")]
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_NORMAL: "normal",
+                  PRIORITY_BULK: "bulk", PRIORITY_BACKGROUND: "background"}
+# Typing pause after which the character count and estimates are refreshed
+TEXT_STATS_DELAY_MS = 150
+# Further pause before finished sentences are synthesized speculatively
+SPECULATION_DELAY_MS = 500
+# How long closing the window waits for running jobs to checkpoint
+SHUTDOWN_TIMEOUT = 10
+
+# Time spent importing the GUI dependencies (reported in the startup breakdown)
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
 
 class KokoroTTSApp:
-    def __init__(self, root):
+    def __init__(self, root, lazy_load=False, profile=None):
         self.root = root
         self.root.title("Kokoro TTS Generator")
         self.root.geometry("800x600")
         self.root.resizable(True, True)
         
-        # Initialize pygame mixer for audio playback
-        pygame.mixer.init()
+        # Startup time breakdown, filled in as the app comes up
+        self.startup_start = time.perf_counter()
+        self.startup_timings = {"imports": IMPORT_SECONDS}
+        
+        # Initialize pygame mixer for audio playback. Kokoro produces 24 kHz
+        # mono audio, so open the mixer in that format to stream chunks as-is.
+        step_start = time.perf_counter()
+        pygame.mixer.init(frequency=24000, size=-16, channels=1)
+        self.startup_timings["pygame_init"] = time.perf_counter() - step_start
         
         # Variables
-        self.kokoro = None
+        self.engine = KokoroEngine()
+        self.lazy_load = lazy_load
+        self.model_loading = False
+        self.model_load_failed = False
+        self.pending_actions = []
+        # Last generation kept in memory as 16-bit PCM; written to disk only on save
+        self.current_audio = None
+        self.current_sample_rate = None
+        self.current_sound = None
+        self.playback_channel = None
+        # Long-form results stay on disk and are streamed by pygame.mixer.music
         self.current_audio_file = None
+        # Default save format, sample rate and bitrate (kokoro_config.json "output")
+        self.output_settings = OutputSettings.load()
         self.is_generating = False
-        self.preview_samples = {}
-        
-        # Available voices for different languages with readable names
-        self.voices = {
-            'English (US) - Female': {
-                'af_alloy': 'Alloy (Нейтральний)',
-                'af_aoede': 'Aoede (М\'який)',
-                'af_bella': 'Bella (Теплий)',
-                'af_heart': 'Heart (Сердечний)',
-                'af_jessica': 'Jessica (Класичний)',
-                'af_kore': 'Kore (Енергійний)',
-                'af_nicole': 'Nicole (Професійний)',
-                'af_nova': 'Nova (Сучасний)',
-                'af_river': 'River (Спокійний)',
-                'af_sarah': 'Sarah (Дружелюбний)',
-                'af_sky': 'Sky (Легкий)'
-            },
-            'English (US) - Male': {
-                'am_adam': 'Adam (Впевнений)',
-                'am_echo': 'Echo (Резонансний)',
-                'am_eric': 'Eric (Дружній)',
-                'am_fenrir': 'Fenrir (Сильний)',
-                'am_liam': 'Liam (Теплий)',
-                'am_michael': 'Michael (Класичний)',
-                'am_onyx': 'Onyx (Глибокий)',
-                'am_puck': 'Puck (Жвавий)'
-            },
-            'English (GB)': {
-                'bf_alice': 'Alice (Британська)',
-                'bf_emma': 'Emma (Елегантна)',
-                'bf_isabella': 'Isabella (Витончена)',
-                'bf_lily': 'Lily (Ніжна)',
-                'bm_daniel': 'Daniel (Джентльмен)',
-                'bm_fable': 'Fable (Розповідач)',
-                'bm_george': 'George (Аристократ)',
-                'bm_lewis': 'Lewis (Формальний)'
-            },
-            'French': {
-                'ff_siwis': 'Siwis (Класична французька)'
-            },
-            'Italian': {
-                'if_sara': 'Sara (Італійська жінка)',
-                'im_nicola': 'Nicola (Італійський чоловік)'
-            },
-            'Japanese': {
-                'jf_alpha': 'Alpha (Аніме дівчина)',
-                'jf_gongitsune': 'Gongitsune (Казкова)',
-                'jf_nezumi': 'Nezumi (Миша)',
-                'jf_tebukuro': 'Tebukuro (Рукавичка)',
-                'jm_kumo': 'Kumo (Хмара)'
-            },
-            'Chinese': {
-                'zf_xiaobei': 'Xiaobei (Північна)',
-                'zf_xiaoni': 'Xiaoni (Мила)',
-                'zf_xiaoxiao': 'Xiaoxiao (Маленька)',
-                'zf_xiaoyi': 'Xiaoyi (Мала)',
-                'zm_yunjian': 'Yunjian (Хмарний меч)',
-                'zm_yunxi': 'Yunxi (Хмарний захід)',
-                'zm_yunxia': 'Yunxia (Хмарна зоря)',
-                'zm_yunyang': 'Yunyang (Хмарне сонце)'
-            }
-        }
-        
+        self.preview_store = None
+        # All synthesis runs as prioritized jobs on the scheduler's worker
+        # pool (KOKORO_GUI_WORKERS, default 1), which owns the model
+        self.scheduler = JobScheduler(
+            workers=int(os.environ.get("KOKORO_GUI_WORKERS", "1")),
+            on_change=lambda: self.root.after(0, self._refresh_job_queue))
+        self.speech_job = None
+        self.prerender_job = None
+        # Duration / generation time estimates (benchmark calibration if present),
+        # refined by every finished generation
+        self.estimator = Estimator.load()
+        self.char_count = None
+        self.text_stats_after_id = None
+        # Speculative synthesis of finished sentences while typing (opt-in)
+        self.speculative = SpeculativeStore()
+        self.speculation_job = None
+        self.speculation_after_id = None
+        # Profiling of generations (Tools menu, run.py --profile)
+        self.profile_var = tk.BooleanVar(value=bool(profile))
+        self.profile_mode_var = tk.StringVar(value=profile or profiling.DEFAULT_MODE)
+        
+        # Streaming playback state (chunks are played while generating)
+        self.stream_sounds = deque()
+        self.stream_channel = None
+        self.stream_active = False
+        self.first_audio_time = None
+        
+        # Available voices for different languages with readable names,
+        # plus the user's voice blends (only their index is read here)
+        register_blends()
+        self.voices = VOICES
+        
+        step_start = time.perf_counter()
         self.setup_ui()
-        self.initialize_kokoro()
+        self.startup_timings["ui_setup"] = time.perf_counter() - step_start
+        self.root.after_idle(self._record_window_ready)
+        
+        # The model is loaded off the UI thread; in lazy mode only when
+        # the first synthesis is requested
+        if lazy_load:
+            self.status_label.config(text="Ready (model loads on first use)")
+        else:
+            self.initialize_kokoro()
         
     def setup_ui(self):
         # Main frame
@@ -108,7 +125,8 @@ class KokoroTTSApp:
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
         main_frame.columnconfigure(1, weight=1)
-        main_frame.rowconfigure(2, weight=1)
+        main_frame.rowconfigure(2, weight=3)
+        main_frame.rowconfigure(6, weight=1)
         
         # Title
         title_label = ttk.Label(main_frame, text="Kokoro TTS Generator", 
@@ -134,6 +152,7 @@ class KokoroTTSApp:
         self.voice_var = tk.StringVar()
         self.voice_combo = ttk.Combobox(voice_frame, textvariable=self.voice_var, state="readonly")
         self.voice_combo.grid(row=0, column=3, sticky=(tk.W, tk.E), padx=(0, 5))
+        self.voice_combo.bind('<<ComboboxSelected>>', self.update_text_stats)
         
         # Voice preview button
         self.preview_btn = ttk.Button(voice_frame, text="🔊", width=3, 
@@ -152,6 +171,32 @@ class KokoroTTSApp:
         self.speed_label.grid(row=1, column=2, sticky=tk.W, padx=(0, 5), pady=(10, 0))
         speed_scale.configure(command=self.update_speed_label)
         
+        # Play chunks as soon as they are synthesized
+        self.stream_playback_var = tk.BooleanVar(value=True)
+        stream_check = ttk.Checkbutton(voice_frame, text="Play while generating",
+                                       variable=self.stream_playback_var)
+        stream_check.grid(row=1, column=3, sticky=tk.W, pady=(10, 0))
+        
+        # Long texts: append to a WAV on disk with checkpoints instead of memory
+        self.long_form_var = tk.BooleanVar(value=False)
+        long_form_check = ttk.Checkbutton(voice_frame, text="Write straight to file (long texts)",
+                                          variable=self.long_form_var)
+        long_form_check.grid(row=2, column=3, sticky=tk.W, pady=(5, 0))
+        
+        # Multi-voice scripts: "Speaker: text" lines, one voice per speaker
+        self.dialog_var = tk.BooleanVar(value=False)
+        dialog_check = ttk.Checkbutton(voice_frame, text="Dialog script (Speaker: text)",
+                                       variable=self.dialog_var)
+        dialog_check.grid(row=2, column=0, columnspan=3, sticky=tk.W, pady=(5, 0))
+        
+        # Synthesize finished sentences in the background while typing
+        self.speculative_var = tk.BooleanVar(
+            value=os.environ.get("KOKORO_SPECULATIVE", "").lower() in ("1", "true", "yes"))
+        speculative_check = ttk.Checkbutton(voice_frame, text="Prepare sentences while typing",
+                                            variable=self.speculative_var,
+                                            command=self.toggle_speculation)
+        speculative_check.grid(row=3, column=3, sticky=tk.W, pady=(5, 0))
+        
         # Text input
         text_frame = ttk.LabelFrame(main_frame, text="Text Input", padding="10")
         text_frame.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
@@ -176,13 +221,18 @@ class KokoroTTSApp:
         self.gen_time_label = ttk.Label(stats_frame, text="Час генерації: ~0 сек", foreground="blue")
         self.gen_time_label.grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=(2, 0))
         
-        # Bind text change event
-        self.text_area.bind('<KeyRelease>', self.update_text_stats)
-        self.text_area.bind('<ButtonRelease>', self.update_text_stats)
-        self.text_area.bind('<FocusIn>', self.update_text_stats)
+        # Sentences prepared by speculative synthesis
+        self.speculation_label = ttk.Label(stats_frame, text="", foreground="gray")
+        self.speculation_label.grid(row=1, column=1, sticky=tk.E, pady=(2, 0))
+        
+        # Bind text change event (debounced while typing)
+        self.text_area.bind('<KeyRelease>', self.schedule_text_stats)
+        self.text_area.bind('<ButtonRelease>', self.schedule_text_stats)
+        self.text_area.bind('<FocusIn>', self.schedule_text_stats)
         
         # Add context menu for copy/paste
         self.create_context_menu()
+        self.create_menu()
         
         # Buttons frame
         button_frame = ttk.Frame(main_frame)
@@ -216,56 +266,134 @@ class KokoroTTSApp:
         self.status_label = ttk.Label(main_frame, text="Ready")
         self.status_label.grid(row=5, column=0, columnspan=3, sticky=tk.W)
         
+        # Job queue
+        queue_frame = ttk.LabelFrame(main_frame, text="Jobs", padding="5")
+        queue_frame.grid(row=6, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(10, 0))
+        queue_frame.columnconfigure(0, weight=1)
+        queue_frame.rowconfigure(0, weight=1)
+        
+        columns = ("priority", "state", "progress", "eta")
+        self.job_tree = ttk.Treeview(queue_frame, columns=columns, height=4)
+        self.job_tree.heading("#0", text="Job")
+        self.job_tree.heading("priority", text="Priority")
+        self.job_tree.heading("state", text="State")
+        self.job_tree.heading("progress", text="Progress")
+        self.job_tree.heading("eta", text="ETA")
+        self.job_tree.column("#0", width=300)
+        for column in columns:
+            self.job_tree.column(column, width=90, anchor=tk.CENTER)
+        self.job_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        job_buttons = ttk.Frame(queue_frame)
+        job_buttons.grid(row=0, column=1, sticky=tk.N, padx=(5, 0))
+        ttk.Button(job_buttons, text="Pause / Resume",
+                   command=self.toggle_pause_job).pack(fill=tk.X, pady=(0, 5))
+        ttk.Button(job_buttons, text="Cancel",
+                   command=self.cancel_job).pack(fill=tk.X, pady=(0, 5))
+        ttk.Button(job_buttons, text="Cancel All",
+                   command=self.scheduler.cancel_all).pack(fill=tk.X)
+        self.job_items = {}
+        
         # Set default values
         if self.voices:
             self.language_combo.set(list(self.voices.keys())[0])
             self.on_language_change(None)
             
+    def _record_window_ready(self):
+        """Record when the window is first able to paint"""
+        self.startup_timings["window_ready"] = time.perf_counter() - self.startup_start
+        
     def initialize_kokoro(self):
-        """Initialize Kokoro TTS model"""
-        if not KOKORO_AVAILABLE:
-            messagebox.showerror("Error", 
-                               "Kokoro ONNX library not found. Please install it with:\n"
-                               "pip install kokoro-onnx")
-            return
-            
-        # Get model paths - handle both development and packaged versions
-        if hasattr(sys, '_MEIPASS'):
-            # Running as PyInstaller executable
-            models_dir = Path(sys._MEIPASS)
-            model_file = models_dir / "kokoro-v1.0.onnx"
-            voices_file = models_dir / "voices-v1.0.bin"
-        else:
-            # Running from source
-            current_dir = Path(__file__).parent
-            project_root = current_dir.parent
-            models_dir = project_root / "models"
-            model_file = models_dir / "kokoro-v1.0.onnx"
-            voices_file = models_dir / "voices-v1.0.bin"
-        
-        if not model_file.exists():
-            messagebox.showwarning("Model Not Found", 
-                                 f"Model file not found at: {model_file}\n"
-                                 "Please run: python scripts/download_model.py")
+        """Start loading the Kokoro TTS model in a background thread"""
+        if self.engine.is_loaded or self.model_loading:
             return
+        self.model_loading = True
+        self.model_load_failed = False
+        self.generate_btn.config(state=tk.DISABLED)
+        self.preview_btn.config(state=tk.DISABLED)
+        self.progress.start()
+        self.status_label.config(text="Loading model...")
+        threading.Thread(target=self._load_model_thread, daemon=True).start()
+        
+    def _load_model_thread(self):
+        """Load the model, cache and preview store off the UI thread"""
+        try:
+            self.engine.load()
+            self.engine.enable_cache()
+            self.preview_store = PreviewStore(get_output_dir("voice_previews"),
+                                              self.engine.model_version())
+            self.root.after(0, self._model_loaded)
+        except Exception as e:
+            self.root.after(0, self._model_load_error, e)
             
-        if not voices_file.exists():
-            messagebox.showwarning("Voices Not Found", 
-                                 f"Voices file not found at: {voices_file}\n"
-                                 "Please run: python scripts/download_model.py")
-            return
+    def _model_loaded(self):
+        """Handle successful model loading (main thread)"""
+        self.model_loading = False
+        self.progress.stop()
+        self.generate_btn.config(state=tk.NORMAL)
+        self.startup_timings.update(self.engine.load_timings)
+        self.startup_timings["model_ready"] = time.perf_counter() - self.startup_start
+        print("✅ Kokoro TTS initialized successfully")
+        print("⏱️  Startup: " + ", ".join(f"{name} {seconds:.2f}s"
+                                          for name, seconds in self.startup_timings.items()))
+        self.status_label.config(
+            text=f"Ready (model loaded in {sum(self.engine.load_timings.values()):.1f} сек)")
+        
+        # Enable preview button if English is selected
+        if self.language_var.get().startswith('English'):
+            self.preview_btn.config(state=tk.NORMAL)
+            self.root.after_idle(self.prerender_previews)
             
-        try:
-            self.kokoro = Kokoro(str(model_file), str(voices_file))
-            print("✅ Kokoro TTS initialized successfully")
+        # Run whatever was requested while the model was loading
+        actions, self.pending_actions = self.pending_actions, []
+        for action in actions:
+            action()
             
-            # Enable preview button if English is selected
-            if self.language_var.get().startswith('English'):
-                self.preview_btn.config(state=tk.NORMAL)
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to initialize Kokoro TTS: {str(e)}")
+    def _model_load_error(self, error):
+        """Handle model loading failure (main thread)"""
+        self.model_loading = False
+        self.model_load_failed = True
+        self.pending_actions = []
+        self.progress.stop()
+        self.generate_btn.config(state=tk.NORMAL)
+        self.status_label.config(text="Model loading failed")
+        if isinstance(error, ModelNotFoundError):
+            messagebox.showwarning(f"{error.kind} Not Found", 
+                                 f"{error.kind} file not found at: {error.path}\n"
+                                 "Please run: python scripts/download_model.py")
+        elif isinstance(error, EngineError):
+            messagebox.showerror("Error", str(error))
+        else:
+            messagebox.showerror("Error", f"Failed to initialize Kokoro TTS: {str(error)}")
             
+    def _ensure_model(self, action):
+        """Run action now if the model is loaded, otherwise once it has loaded.
+        
+        Returns True if the model is ready.
+        """
+        if self.engine.is_loaded:
+            return True
+        if self.model_load_failed and not self.lazy_load:
+            messagebox.showerror("Error", "Kokoro TTS not initialized")
+            return False
+        self.pending_actions.append(action)
+        self.initialize_kokoro()
+        self.status_label.config(text="Loading model, synthesis will start when it is ready...")
+        return False
+        
+    def create_menu(self):
+        """Menu bar with the Tools menu"""
+        menubar = tk.Menu(self.root)
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        tools_menu.add_checkbutton(label="Профілювати генерацію", variable=self.profile_var)
+        tools_menu.add_separator()
+        tools_menu.add_radiobutton(label="Семплювання (flamegraph)", value="sample",
+                                   variable=self.profile_mode_var)
+        tools_menu.add_radiobutton(label="cProfile (pstats)", value="cprofile",
+                                   variable=self.profile_mode_var)
+        menubar.add_cascade(label="Інструменти", menu=tools_menu)
+        self.root.config(menu=menubar)
+        
     def create_context_menu(self):
         """Create context menu for text area"""
         self.context_menu = tk.Menu(self.root, tearoff=0)
@@ -344,9 +472,13 @@ class KokoroTTSApp:
             self.voice_combo['values'] = readable_names
             if readable_names:
                 self.voice_combo.set(readable_names[0])
+            self.update_text_stats()
             
             # Enable preview button only for English languages
-            if language.startswith('English') and self.kokoro:
+            if language.startswith('English') and self.engine.is_loaded:
+                self.preview_btn.config(state=tk.NORMAL)
+                self.root.after_idle(self.prerender_previews)
+            elif language.startswith('English') and self.lazy_load and not self.model_loading:
                 self.preview_btn.config(state=tk.NORMAL)
             else:
                 self.preview_btn.config(state=tk.DISABLED)
@@ -357,10 +489,23 @@ class KokoroTTSApp:
         # Update time estimation when speed changes
         self.update_text_stats()
         
+    def schedule_text_stats(self, event=None):
+        """Refresh the stats once typing pauses instead of on every key"""
+        if self.text_stats_after_id is not None:
+            self.root.after_cancel(self.text_stats_after_id)
+        self.text_stats_after_id = self.root.after(TEXT_STATS_DELAY_MS, self.update_text_stats)
+        
     def update_text_stats(self, event=None):
         """Update character count and time estimation"""
-        text = self.text_area.get("1.0", tk.END).strip()
-        char_count = len(text)
+        self.text_stats_after_id = None
+        self.schedule_speculation()
+        # Recount only after an edit (speed/voice changes reuse the count);
+        # Tk counts the characters without copying the text into Python
+        if self.char_count is None or self.text_area.edit_modified():
+            counted = self.text_area.count("1.0", "end-1c", "chars")
+            self.char_count = counted[0] if counted else 0
+            self.text_area.edit_modified(False)
+        char_count = self.char_count
         
         # Update character count
         self.char_count_label.config(text=f"Символів: {char_count}")
@@ -374,19 +519,11 @@ class KokoroTTSApp:
         # Get current speed multiplier
         speed = self.speed_var.get()
         
-        # Calculate estimated time
-        # Based on real Kokoro TTS performance:
-        # 2900 characters = 2:25 (145 seconds) = ~1200 characters per minute
-        # We'll use 1200 characters per minute as base (realistic estimate)
-        
-        base_chars_per_minute = 1200
-        estimated_minutes = char_count / base_chars_per_minute
-        
-        # Adjust for speed setting
-        estimated_minutes = estimated_minutes / speed
-        
-        # Convert to seconds
-        estimated_seconds = estimated_minutes * 60
+        # Estimate with the rates learned for the selected voice or its
+        # language, the benchmark calibration, else built-in defaults
+        voice_id = self.get_voice_id(self.voice_var.get())
+        estimated_seconds, generation_seconds = self.estimator.estimate(
+            char_count, voice_language(voice_id), speed, voice_id)
         
         # Format time display
         if estimated_seconds < 60:
@@ -403,11 +540,6 @@ class KokoroTTSApp:
             
         self.time_estimate_label.config(text=time_text)
         
-        # Calculate generation time estimate
-        # Based on testing: roughly 0.15-0.25 seconds per second of audio
-        # We'll use 0.2 seconds per second of audio as estimate
-        generation_seconds = estimated_seconds * 0.2
-        
         if generation_seconds < 60:
             gen_time_text = f"Час генерації: ~{generation_seconds:.0f} сек"
         else:
@@ -418,10 +550,68 @@ class KokoroTTSApp:
         self.gen_time_label.config(text=gen_time_text)
         
 
+    def toggle_speculation(self):
+        """Start or stop speculative synthesis (checkbox)"""
+        if self.speculative_var.get():
+            self.schedule_speculation()
+        else:
+            self._stop_speculation()
+            
+    def schedule_speculation(self):
+        """Re-plan speculative synthesis once typing pauses"""
+        if self.speculation_after_id is not None:
+            self.root.after_cancel(self.speculation_after_id)
+            self.speculation_after_id = None
+        if self.speculative_var.get():
+            self.speculation_after_id = self.root.after(SPECULATION_DELAY_MS, self._speculate)
+            
+    def _stop_speculation(self):
+        self.engine.speculative = None
+        if self.speculation_job is not None:
+            self.scheduler.cancel(self.speculation_job)
+            self.speculation_job = None
+        self.speculative.clear()
+        self.speculation_label.config(text="")
+        
+    def _speculate(self):
+        """Point the background job at the finished sentences of the current text"""
+        self.speculation_after_id = None
+        # Dialog scripts are synthesized line by line per speaker; an unloaded
+        # model is not loaded just for speculation
+        if not self.speculative_var.get() or self.dialog_var.get() or not self.engine.is_loaded:
+            return
+        voice_id = self.get_voice_id(self.voice_var.get())
+        if not voice_id:
+            return
+        # "end-1c": Tk's trailing newline would make the sentence being typed look finished
+        text = self.text_area.get("1.0", "end-1c")
+        self.engine.speculative = self.speculative
+        # Sentences that changed (or a new voice/speed) drop their results here
+        pending = self.speculative.update(text, voice_id, self.speed_var.get())
+        self._speculation_progress(*self.speculative.progress())
+        if not pending or (self.speculation_job is not None
+                           and not self.speculation_job.is_finished):
+            return
+        def work(job):
+            def report(ready, total):
+                job.progress = (ready, total)
+                self.root.after(0, self._speculation_progress, ready, total)
+            return (yield from speculation_steps(self.engine, self.speculative, report))
+        
+        # Background priority: any queued generation or preview runs first
+        self.speculation_job = self.scheduler.submit(
+            "Speculative: finished sentences", work, PRIORITY_BACKGROUND,
+            on_error=lambda job: isinstance(job.error, JobCancelled) or print(
+                f"⚠️  Speculative synthesis stopped: {job.error}"),
+            kind="speculative")
+        
+    def _speculation_progress(self, ready, total):
+        text = f"Готово речень: {ready}/{total}" if total and self.speculative_var.get() else ""
+        self.speculation_label.config(text=text)
+        
     def preview_voice(self):
         """Preview selected voice with sample text"""
-        if not self.kokoro:
-            messagebox.showerror("Error", "Kokoro TTS not initialized")
+        if not self._ensure_model(self.preview_voice):
             return
             
         readable_voice = self.voice_var.get()
@@ -435,74 +625,133 @@ class KokoroTTSApp:
             messagebox.showerror("Error", "Invalid voice selection")
             return
             
-        # Check if we already have a preview for this voice
-        if voice_id in self.preview_samples:
-            try:
-                pygame.mixer.music.load(self.preview_samples[voice_id])
-                pygame.mixer.music.play()
-                self.status_label.config(text=f"Playing preview: {readable_voice}")
-                return
-            except:
-                # If file doesn't exist or can't be played, regenerate
-                pass
-        
-        # Generate preview sample
-        sample_text = "Hello! This is a voice preview sample. How do you like this voice?"
+        # Play the stored preview if this voice was already rendered
+        preview_file = self.preview_store.get(voice_id)
+        if preview_file:
+            self._play_preview(preview_file, readable_voice)
+            return
         
         # Disable preview button during generation
         self.preview_btn.config(state=tk.DISABLED)
         self.status_label.config(text="Generating voice preview...")
         
-        # Run generation in separate thread
-        threading.Thread(target=self._generate_preview_thread, 
-                        args=(sample_text, voice_id, readable_voice), daemon=True).start()
-        
-    def _generate_preview_thread(self, text, voice_id, readable_voice):
-        """Generate voice preview in background thread"""
-        try:
-            # Generate audio sample
-            samples, sample_rate = self.kokoro.create(text, voice=voice_id, speed=1.0)
-            
-            # Create previews directory if it doesn't exist
-            if hasattr(sys, '_MEIPASS'):
-                # Running as executable - use current working directory
-                previews_dir = Path.cwd() / "voice_previews"
-            else:
-                # Running from source - use project structure
-                current_dir = Path(__file__).parent
-                project_root = current_dir.parent
-                previews_dir = project_root / "output" / "voice_previews"
-            previews_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Save preview file
-            preview_file = previews_dir / f"preview_{voice_id}.wav"
-            sf.write(str(preview_file), samples, sample_rate)
+        # Interactive priority: runs at the next chunk boundary of any render
+        self.scheduler.submit(
+            f"Preview: {readable_voice}",
+            lambda job: self.preview_store.render(self.engine, voice_id),
+            PRIORITY_INTERACTIVE,
+            on_done=lambda job: self.root.after(0, self._preview_complete, job.result, readable_voice),
+            on_error=lambda job: self.root.after(0, self._preview_error, job.error),
+            kind="preview")
             
-            # Store in cache
-            self.preview_samples[voice_id] = str(preview_file)
-            
-            # Update UI in main thread
-            self.root.after(0, self._preview_complete, str(preview_file), readable_voice)
-            
-        except Exception as e:
-            self.root.after(0, self._preview_error, str(e))
+    def prerender_previews(self):
+        """Queue rendering of the missing previews of the current language as a bulk job"""
+        if self.preview_store is None:
+            return
+        if self.prerender_job is not None and not self.prerender_job.is_finished:
+            return
+        language = self.language_var.get()
+        voice_ids = list(self.voices.get(language, {}))
+        missing = self.preview_store.missing(voice_ids)
+        if not missing:
+            return
+        
+        def work(job):
+            for done, _ in enumerate(self.preview_store.prerender_steps(self.engine, missing), 1):
+                job.progress = (done, len(missing))
+                yield
+        
+        self.prerender_job = self.scheduler.submit(
+            f"Voice previews: {language}", work, PRIORITY_BULK,
+            on_error=lambda job: isinstance(job.error, JobCancelled) or print(
+                f"⚠️  Preview pre-rendering stopped: {job.error}"),
+            kind="prerender")
             
+    def _play_preview(self, preview_file, readable_voice):
+        """Play a preview file"""
+        pygame.mixer.music.load(preview_file)
+        pygame.mixer.music.play()
+        self.status_label.config(text=f"Playing preview: {readable_voice}")
+        
     def _preview_complete(self, preview_file, readable_voice):
         """Handle successful preview generation"""
         try:
-            pygame.mixer.music.load(preview_file)
-            pygame.mixer.music.play()
-            self.status_label.config(text=f"Playing preview: {readable_voice}")
+            self._play_preview(preview_file, readable_voice)
         except Exception as e:
             self.status_label.config(text=f"Preview generation failed: {str(e)}")
         finally:
             self.preview_btn.config(state=tk.NORMAL)
             
-    def _preview_error(self, error_msg):
+    def _preview_error(self, error):
         """Handle preview generation error"""
         self.preview_btn.config(state=tk.NORMAL)
+        if isinstance(error, JobCancelled):
+            self.status_label.config(text="Preview cancelled")
+            return
         self.status_label.config(text="Preview generation failed")
-        messagebox.showerror("Error", f"Failed to generate voice preview: {error_msg}")
+        messagebox.showerror("Error", f"Failed to generate voice preview: {error}")
+        
+    def _selected_jobs(self):
+        """Jobs selected in the queue, or the first unfinished one"""
+        jobs = {str(job.id): job for job in self.scheduler.pending()}
+        selected = [jobs[item] for item in self.job_tree.selection() if item in jobs]
+        if not selected and jobs:
+            selected = [next(iter(jobs.values()))]
+        return selected
+        
+    def toggle_pause_job(self):
+        for job in self._selected_jobs():
+            if job.state == PAUSED:
+                self.scheduler.resume(job)
+            else:
+                self.scheduler.pause(job)
+                
+    def cancel_job(self):
+        for job in self._selected_jobs():
+            self.scheduler.cancel(job)
+            
+    def _refresh_job_queue(self):
+        """Mirror the scheduler's jobs in the queue panel (main thread)"""
+        pending = self.scheduler.pending()
+        visible = set()
+        # A job finishes after the work of the jobs ahead of it in priority order
+        ahead = 0.0
+        etas = {}
+        for job in sorted(pending, key=lambda job: (job.priority, job.id)):
+            remaining = job.remaining_seconds()
+            if job.state == PAUSED or remaining is None:
+                etas[job.id] = ""
+                continue
+            ahead += remaining
+            minutes, seconds = divmod(int(round(ahead / self.scheduler.workers)), 60)
+            etas[job.id] = f"~{minutes}:{seconds:02d}"
+        for job in pending:
+            item = str(job.id)
+            visible.add(item)
+            values = (PRIORITY_NAMES.get(job.priority, job.priority), job.state,
+                      job.describe_progress(), etas[job.id])
+            if item in self.job_items:
+                self.job_tree.item(item, values=values)
+            else:
+                self.job_tree.insert("", tk.END, iid=item, text=job.name, values=values)
+                self.job_items[item] = job
+        for item in list(self.job_items):
+            if item not in visible:
+                self.job_tree.delete(item)
+                del self.job_items[item]
+        
+        if not self.model_loading:
+            if any(job.state != PAUSED for job in pending):
+                self.progress.start()
+            else:
+                self.progress.stop()
+        
+    def on_close(self):
+        """Stop background workers and close the window"""
+        # Cancelling closes long-form renders, which checkpoints them
+        self.scheduler.shutdown(SHUTDOWN_TIMEOUT)
+        self._stop_stream_playback()
+        self.root.destroy()
         
     def get_voice_id(self, readable_name):
         """Get technical voice ID from readable name"""
@@ -516,14 +765,17 @@ class KokoroTTSApp:
         
     def generate_speech(self):
         """Generate speech from text"""
-        if not self.kokoro:
-            messagebox.showerror("Error", "Kokoro TTS not initialized")
+        if not self._ensure_model(self.generate_speech):
             return
             
         text = self.text_area.get("1.0", tk.END).strip()
         if not text:
             messagebox.showwarning("Warning", "Please enter text to generate speech")
             return
+        
+        if self.dialog_var.get():
+            self._queue_dialog(text)
+            return
             
         readable_voice = self.voice_var.get()
         if not readable_voice:
@@ -536,54 +788,265 @@ class KokoroTTSApp:
             messagebox.showerror("Error", "Invalid voice selection")
             return
             
-        # Disable buttons during generation
-        self.generate_btn.config(state=tk.DISABLED)
-        self.progress.start()
-        self.status_label.config(text="Generating speech...")
-        
+        # Long-form output goes to a file chosen up front; choosing the file of
+        # an interrupted run resumes it
+        long_form_file = None
+        if self.long_form_var.get():
+            extension = self.output_settings.extension
+            long_form_file = filedialog.asksaveasfilename(
+                defaultextension=extension,
+                filetypes=AUDIO_FILETYPES,
+                initialfile=f"kokoro_longform_{time.strftime('%Y%m%d_%H%M%S')}{extension}"
+            )
+            if not long_form_file:
+                return
+            
+        # Generation is queued, so further clicks queue further jobs
+        # instead of being blocked; they can be paused or cancelled
+        speed = self.speed_var.get()
+        name = " ".join(text[:40].split()) + ("..." if len(text) > 40 else "")
+        # What the finished job teaches the estimator; the job fills in
+        # whether it actually ran the model
+        sample = {"chars": len(text), "language": voice_language(voice_id),
+                  "voice": voice_id, "speed": speed,
+                  "speculative_hits": self.speculative.hits}
+        _, estimate = self.estimator.estimate(len(text), sample["language"], speed, voice_id)
+        if long_form_file:
+            self.scheduler.submit(
+                f"File: {os.path.basename(long_form_file)}",
+                self._profiled(
+                    lambda job: self._long_form_job(job, text, voice_id, speed, long_form_file),
+                    "long_form", len(text), voice_id, speed),
+                PRIORITY_BULK,
+                on_done=lambda job: self.root.after(0, self._long_form_complete, job, sample),
+                on_error=lambda job: self.root.after(0, self._generation_error, job),
+                estimate=estimate, kind="long_form")
+        else:
+            # Streaming playback would queue the whole text in memory
+            stream_playback = self.stream_playback_var.get()
+            self.scheduler.submit(
+                f"Speech: {name}",
+                self._profiled(
+                    lambda job: self._speech_job(job, text, voice_id, speed, stream_playback, sample),
+                    "speech", len(text), voice_id, speed),
+                PRIORITY_NORMAL,
+                on_done=lambda job: self.root.after(0, self._speech_job_complete, job, sample),
+                on_error=lambda job: self.root.after(0, self._generation_error, job),
+                estimate=estimate, kind="speech")
+        self.status_label.config(text="Generation queued...")
+        
+    def _profiled(self, work, kind, chars, voice=None, speed=None):
+        """Wrap a job's work in a profiler when profiling is switched on (Tools menu)"""
+        if not self.profile_var.get():
+            return work
+        mode = self.profile_mode_var.get()
+        
+        def run(job):
+            profiler = profiling.Profiler(mode, kind, chars, voice, speed)
+            try:
+                return (yield from profiling.profile_steps(work(job), profiler))
+            finally:
+                job.profile = profiler.summary
+        return run
+        
+    def _report_profile(self, job):
+        """Point to the profile reports of a finished job (main thread)"""
+        if job.profile is None:
+            return
+        print(f"🔬 {profiling.describe(job.profile)}")
+        self.status_label.config(
+            text=f"{self.status_label.cget('text')} - профіль: {job.profile['files'][-1]}")
+        
+    def _start_speech_job(self, job, stream_playback):
+        """Reset streaming playback when a speech job starts (main thread)"""
+        self.speech_job = job
+        self._stop_stream_playback()
+        pygame.mixer.music.stop()
+        self.stream_active = stream_playback
+        self.is_generating = True
+        self.first_audio_time = None
         # Record start time for generation measurement
         self.generation_start_time = time.time()
+        self.status_label.config(text="Generating speech...")
         
-        # Run generation in separate thread
-        threading.Thread(target=self._generate_speech_thread, 
-                        args=(text, voice_id, self.speed_var.get()), daemon=True).start()
-        
-    def _generate_speech_thread(self, text, voice, speed):
-        """Generate speech in background thread"""
+    def _speech_job(self, job, text, voice, speed, stream_playback, sample=None):
+        """Synthesize one chunk per step, streaming chunks to playback"""
+        self.root.after(0, self._start_speech_job, job, stream_playback)
+        model_calls = self.engine.model_calls
+        total = len(split_text_into_chunks(text))
+        # Chunks are converted to PCM once and kept in memory; the same
+        # buffers feed streaming playback and the final audio
+        chunks = []
+        sample_rate = None
+        for samples, sample_rate in self.engine.synthesize_stream(text, voice, speed):
+            pcm = to_pcm16(samples)
+            chunks.append(pcm)
+            pipeline_metrics.add_audio(len(pcm) / sample_rate)
+            if stream_playback:
+                self.root.after(0, self._queue_stream_chunk, job, pcm, sample_rate)
+            job.progress = (len(chunks), max(total, len(chunks)))
+            yield
+        if not chunks:
+            raise EngineError("No text to synthesize")
+        if sample is not None:
+            # Audio served from the cache says nothing about synthesis speed
+            sample["synthesized"] = self.engine.model_calls > model_calls
+        audio = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+        return audio, sample_rate
+        
+    def _queue_dialog(self, text):
+        """Queue a multi-voice script; speakers are synthesized in parallel"""
         try:
-            # Generate audio
-            samples, sample_rate = self.kokoro.create(text, voice=voice, speed=speed)
-            
-            # Calculate actual generation time
-            generation_time = time.time() - self.generation_start_time
-            
-            # Create audio directory if it doesn't exist
-            if hasattr(sys, '_MEIPASS'):
-                # Running as executable - use current working directory
-                audio_dir = Path.cwd() / "audio_output"
-            else:
-                # Running from source - use project structure
-                current_dir = Path(__file__).parent
-                project_root = current_dir.parent
-                audio_dir = project_root / "output" / "audio_output"
-            audio_dir.mkdir(parents=True, exist_ok=True)
+            script = parse_script(text)
+        except ScriptError as e:
+            messagebox.showwarning("Dialog script", f"Invalid script, {e}")
+            return
+        speed = self.speed_var.get()
+        renderer = DialogRenderer(self.engine, script, speed)
+        estimate = sum(self.estimator.estimate(len(line.text), voice_language(line.voice),
+                                               speed, line.voice)[1]
+                       for line in script.lines)
+        self.scheduler.submit(
+            f"Dialog: {len(script.lines)} lines, {len(script.speakers)} speakers",
+            self._profiled(lambda job: self._dialog_job(job, renderer), "dialog",
+                           sum(len(line.text) for line in script.lines),
+                           "+".join(script.groups()), speed),
+            PRIORITY_NORMAL,
+            on_done=lambda job: self.root.after(0, self._speech_job_complete, job),
+            on_error=lambda job: self.root.after(0, self._generation_error, job),
+            estimate=estimate / renderer.workers, kind="dialog")
+        self.status_label.config(text="Dialog queued...")
+        
+    def _dialog_job(self, job, renderer):
+        """Render a dialog script, one step per finished line"""
+        def report(done, total):
+            job.progress = (done, total)
+        
+        audio, sample_rate = yield from renderer.render_steps(progress=report)
+        pipeline_metrics.add_audio(len(audio) / sample_rate)
+        return to_pcm16(audio), sample_rate
+        
+    def _speech_job_complete(self, job, sample=None):
+        audio, sample_rate = job.result
+        if sample is not None:
+            self._learn_rates(sample, len(audio) / sample_rate, job.run_seconds)
+        first_audio_time = None
+        if job is self.speech_job:
+            self.is_generating = False
+            first_audio_time = self.first_audio_time
+        self._generation_complete(audio, sample_rate, job.finished - job.started,
+                                  first_audio_time, job.trace.stage_seconds())
+        self._report_profile(job)
+        
+    def _long_form_job(self, job, text, voice, speed, path):
+        """Render a long text segment by segment into a file (bounded memory).
+        
+        Cancelling the job checkpoints it; queueing the same file again resumes.
+        """
+        renderer = LongFormRenderer(self.engine, text, path, voice, speed,
+                                    output_settings=self.output_settings)
+        checkpoint = renderer.load_checkpoint()
+        if checkpoint:
+            self.root.after(0, lambda: self.status_label.config(
+                text=f"Продовження з сегмента {checkpoint['segments_done'] + 1}..."))
+        
+        def report(done, total, audio_seconds):
+            job.progress = (done, total)
+            self.root.after(0, self._long_form_progress, done, total, audio_seconds)
+        
+        yield from renderer.render_steps(progress=report)
+        return renderer.info
             
-            # Save to file in audio directory
-            timestamp = int(time.time())
-            temp_file = audio_dir / f"kokoro_generated_{timestamp}.wav"
-            sf.write(str(temp_file), samples, sample_rate)
+    def _long_form_progress(self, done, total, audio_seconds):
+        minutes, seconds = divmod(int(audio_seconds), 60)
+        self.status_label.config(
+            text=f"Запис у файл: {done}/{total} сегментів ({minutes}:{seconds:02d} аудіо)")
+        
+    def _long_form_complete(self, job, sample=None):
+        """Long-form output is played from disk instead of memory"""
+        path = job.result["path"]
+        # A resumed render only synthesized part of the text
+        if sample is not None and not job.result["resumed_from"]:
+            sample["synthesized"] = True
+            self._learn_rates(sample, job.result["audio_seconds"], job.run_seconds)
+        self._generation_complete(None, None, job.finished - job.started,
+                                  stages=job.trace.stage_seconds())
+        self.current_audio_file = path
+        self.status_label.config(text=f"{self.status_label.cget('text')}: {os.path.basename(path)}")
+        self._report_profile(job)
+        
+    def _learn_rates(self, sample, audio_seconds, generation_seconds):
+        """Feed a finished generation to the estimator (main thread)"""
+        # Sentences prepared while typing make the generation look faster than it is
+        synthesized = (sample.get("synthesized")
+                       and self.speculative.hits == sample.get("speculative_hits", 0))
+        recorded = self.estimator.record(
+            sample["chars"], sample["language"], sample["voice"], sample["speed"], audio_seconds,
+            generation_seconds if synthesized else None)
+        if recorded:
+            self.update_text_stats()
             
-            # Update UI in main thread
-            self.root.after(0, self._generation_complete, str(temp_file), generation_time)
+    def _make_sound(self, pcm, sample_rate):
+        """Wrap 16-bit PCM in a pygame Sound matching the mixer format.
+
+        When the mixer already runs at the model's rate (24 kHz mono) the
+        array is handed over through the buffer protocol without conversion.
+        """
+        mixer_rate, mixer_size, mixer_channels = pygame.mixer.get_init()
+        if sample_rate != mixer_rate:
+            # Linear resampling is good enough for monitoring playback
+            target_len = int(round(len(pcm) * mixer_rate / sample_rate))
+            positions = np.linspace(0, len(pcm) - 1, target_len)
+            pcm = np.interp(positions, np.arange(len(pcm)), pcm).astype(np.int16)
+        if mixer_channels > 1:
+            pcm = np.repeat(pcm[:, None], mixer_channels, axis=1)
+        return pygame.mixer.Sound(buffer=pcm)
+        
+    def _queue_stream_chunk(self, job, pcm, sample_rate):
+        """Queue a freshly synthesized chunk for playback (main thread)"""
+        if not self.stream_active or job is not self.speech_job:
+            return
+        if self.first_audio_time is None:
+            self.first_audio_time = time.time() - self.generation_start_time
+            self.stop_btn.config(state=tk.NORMAL)
+            self.status_label.config(
+                text=f"Відтворення під час генерації (перший звук за {self.first_audio_time:.1f} сек)...")
+        self.stream_sounds.append(self._make_sound(pcm, sample_rate))
+        self._pump_stream_playback()
+        
+    def _pump_stream_playback(self):
+        """Keep the stream channel fed with queued chunks"""
+        if not self.stream_active:
+            return
+        if self.stream_sounds:
+            if self.stream_channel is None:
+                self.stream_channel = pygame.mixer.Channel(0)
+            if not self.stream_channel.get_busy():
+                self.stream_channel.play(self.stream_sounds.popleft())
+            elif self.stream_channel.get_queue() is None:
+                self.stream_channel.queue(self.stream_sounds.popleft())
+        
+        still_playing = self.stream_channel is not None and self.stream_channel.get_busy()
+        if self.stream_sounds or still_playing or self.is_generating:
+            self.root.after(50, self._pump_stream_playback)
+        else:
+            self.stream_active = False
+            self.stop_btn.config(state=tk.DISABLED)
             
-        except Exception as e:
-            self.root.after(0, self._generation_error, str(e))
+    def _stop_stream_playback(self):
+        """Drop queued chunks and silence the stream channel"""
+        self.stream_active = False
+        self.stream_sounds.clear()
+        if self.stream_channel is not None:
+            self.stream_channel.stop()
             
-    def _generation_complete(self, audio_file, generation_time):
+    def _generation_complete(self, audio, sample_rate, generation_time, first_audio_time=None,
+                             stages=None):
         """Handle successful generation"""
-        self.current_audio_file = audio_file
-        self.progress.stop()
-        self.generate_btn.config(state=tk.NORMAL)
+        self.current_audio = audio
+        self.current_sample_rate = sample_rate
+        self.current_sound = None
+        self.current_audio_file = None
         self.play_btn.config(state=tk.NORMAL)
         self.save_btn.config(state=tk.NORMAL)
 
@@ -596,24 +1059,45 @@ class KokoroTTSApp:
             seconds = generation_time % 60
             time_str = f"{minutes}:{seconds:04.1f}"
             
-        self.status_label.config(text=f"Генерація завершена за {time_str}")
-        
-    def _generation_error(self, error_msg):
-        """Handle generation error"""
-        self.progress.stop()
-        self.generate_btn.config(state=tk.NORMAL)
+        status = f"Генерація завершена за {time_str}"
+        if first_audio_time is not None:
+            status += f" (перший звук за {first_audio_time:.1f} сек)"
+        # Where the time went (G2P, model, encoding, disk)
+        breakdown = pipeline_metrics.describe_stages(stages or {})
+        if breakdown:
+            status += f" - {breakdown}"
+        self.status_label.config(text=status)
+        
+    def _generation_error(self, job):
+        """Handle a failed or cancelled generation job"""
+        error = job.error
+        if job is self.speech_job:
+            self.is_generating = False
+            self._stop_stream_playback()
+        if isinstance(error, JobCancelled):
+            self.status_label.config(text=f"Cancelled: {job.name}")
+            return
         self.status_label.config(text="Generation failed")
-        messagebox.showerror("Error", f"Failed to generate speech: {error_msg}")
+        messagebox.showerror("Error", f"Failed to generate speech: {error}")
         
     def play_audio(self):
         """Play generated audio"""
-        if not self.current_audio_file or not os.path.exists(self.current_audio_file):
-            messagebox.showwarning("Warning", "No audio file to play")
+        if self.current_audio is None and not self.current_audio_file:
+            messagebox.showwarning("Warning", "No audio to play")
             return
             
         try:
-            pygame.mixer.music.load(self.current_audio_file)
-            pygame.mixer.music.play()
+            self._stop_stream_playback()
+            pygame.mixer.music.stop()
+            if self.current_audio_file:
+                # Long-form file: streamed from disk, never loaded whole
+                pygame.mixer.music.load(self.current_audio_file)
+                pygame.mixer.music.play()
+            else:
+                if self.current_sound is None:
+                    self.current_sound = self._make_sound(self.current_audio,
+                                                          self.current_sample_rate)
+                self.playback_channel = self.current_sound.play()
             self.play_btn.config(state=tk.DISABLED)
             self.stop_btn.config(state=tk.NORMAL)
             self.status_label.config(text="Playing audio...")
@@ -626,7 +1110,8 @@ class KokoroTTSApp:
             
     def _check_audio_status(self):
         """Check if audio is still playing"""
-        if pygame.mixer.music.get_busy():
+        channel_busy = self.playback_channel is not None and self.playback_channel.get_busy()
+        if channel_busy or pygame.mixer.music.get_busy():
             self.root.after(100, self._check_audio_status)
         else:
             self.play_btn.config(state=tk.NORMAL)
@@ -635,15 +1120,18 @@ class KokoroTTSApp:
             
     def stop_audio(self):
         """Stop audio playback"""
+        self._stop_stream_playback()
         pygame.mixer.music.stop()
+        if self.playback_channel is not None:
+            self.playback_channel.stop()
         self.play_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
         self.status_label.config(text="Audio stopped")
         
     def save_audio(self):
-        """Save generated audio to WAV file"""
-        if not self.current_audio_file or not os.path.exists(self.current_audio_file):
-            messagebox.showwarning("Warning", "No audio file to save")
+        """Save generated audio (format from the file extension)"""
+        if self.current_audio is None and not self.current_audio_file:
+            messagebox.showwarning("Warning", "No audio to save")
             return
             
         # Generate default filename based on text and voice
@@ -662,29 +1150,72 @@ class KokoroTTSApp:
         
         # Create default filename
         timestamp = time.strftime("%Y%m%d_%H%M%S")
-        default_filename = f"{safe_text[:30]}_{voice_name}_{timestamp}.wav"
+        extension = self.output_settings.extension
+        default_filename = f"{safe_text[:30]}_{voice_name}_{timestamp}{extension}"
         
         file_path = filedialog.asksaveasfilename(
-            defaultextension=".wav",
-            filetypes=[("WAV files", "*.wav"), ("All files", "*.*")],
+            defaultextension=extension,
+            filetypes=AUDIO_FILETYPES,
             initialfile=default_filename
         )
         
         if file_path:
-            try:
-                # Copy WAV file directly
+            # Compressed formats take a moment to encode; keep the UI responsive
+            self.save_btn.config(state=tk.DISABLED)
+            self.status_label.config(text=f"Saving {os.path.basename(file_path)}...")
+            threading.Thread(target=self._save_audio_thread, args=(file_path,),
+                            daemon=True).start()
+            
+    def _save_audio_thread(self, file_path):
+        """Save on a worker thread, traced as a "save" job"""
+        trace = pipeline_metrics.start_job("save", os.path.basename(file_path))
+        try:
+            with pipeline_metrics.activate(trace):
+                self._save_audio(file_path)
+            pipeline_metrics.finish_job(trace)
+            self.root.after(0, self._save_complete, file_path, None)
+        except Exception as e:
+            pipeline_metrics.finish_job(trace, "failed", error=str(e))
+            self.root.after(0, self._save_complete, file_path, str(e))
+            
+    def _save_audio(self, file_path):
+        """Encode or copy the current audio to file_path"""
+        settings = self.output_settings.for_path(file_path)
+        if self.current_audio_file:
+            source_rate = sf.info(self.current_audio_file).samplerate
+            same_format = (format_for_path(self.current_audio_file) == settings.format
+                           and settings.sample_rate in (None, source_rate)
+                           and not settings.processing)
+            if same_format:
                 import shutil
-                shutil.copy2(self.current_audio_file, file_path)
-                self.status_label.config(text=f"Audio saved to: {os.path.basename(file_path)}")
-                messagebox.showinfo("Success", f"Audio saved to: {file_path}")
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save audio: {str(e)}")
-                self.status_label.config(text="Save failed")
+                with pipeline_metrics.stage("file_io"):
+                    shutil.copy2(self.current_audio_file, file_path)
+                pipeline_metrics.add_bytes(os.path.getsize(file_path))
+            else:
+                transcode_file(self.current_audio_file, file_path, settings)
+        else:
+            encode_file(self.current_audio, self.current_sample_rate, file_path, settings)
+            
+    def _save_complete(self, file_path, error):
+        self.save_btn.config(state=tk.NORMAL)
+        if error:
+            messagebox.showerror("Error", f"Failed to save audio: {error}")
+            self.status_label.config(text="Save failed")
+            return
+        self.status_label.config(text=f"Audio saved to: {os.path.basename(file_path)}")
+        messagebox.showinfo("Success", f"Audio saved to: {file_path}")
 
-def main():
+def main(lazy_load=None, profile=None):
+    if lazy_load is None:
+        lazy_load = os.environ.get("KOKORO_LAZY_LOAD", "").lower() in ("1", "true", "yes")
+    if profile is None:
+        profile = profiling.mode_from_env()
+    elif profile not in profiling.MODES:
+        print(f"⚠️  Unknown profiling mode '{profile}', using {profiling.DEFAULT_MODE}")
+        profile = profiling.DEFAULT_MODE
     root = tk.Tk()
-    app = KokoroTTSApp(root)
+    app = KokoroTTSApp(root, lazy_load=lazy_load, profile=profile)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Long-form (book-length) synthesis with bounded memory and checkpoint/resume
+
+The text is synthesized segment by segment and every segment is appended to
+the output WAV as soon as it is ready, so memory use does not grow with the
+length of the text. Every few seconds the file is flushed to disk and a
+small checkpoint (<output>.progress.json) records how far rendering got. If
+the process is interrupted, running the same text with the same voice, speed
+and model again resumes after the last checkpointed segment.
+
+The checkpointed audio is always 16-bit PCM (<output>.part.wav). For other
+formats or sample rates, or with post-processing (silence trimming, loudness
+normalization), an encoder stage turns the segments into the final file
+alongside synthesis; after a resume it first re-encodes the PCM that is
+already on disk.
+
+Usage:
+    python run.py longform book.txt -o output/book.wav --voice bf_emma
+    python run.py longform book.txt -o output/book.mp3 --bitrate 48
+    python run.py longform book.txt -o output/book.wav --restart   # ignore the checkpoint
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from tts_engine import (KokoroEngine, EngineError, ModelNotFoundError, resolve_model_paths,
+                        to_pcm16, wav_header, SAMPLE_RATE)
+from text_splitter import split_text_into_chunks, DEFAULT_MAX_CHARS
+from model_variants import VARIANT_POLICIES
+from engine_config import add_session_arguments, session_config_from_args
+from audio_encoder import (OutputSettings, EncoderStage, add_output_arguments,
+                           output_settings_from_args)
+import pipeline_metrics
+import profiling
+
+CHECKPOINT_SUFFIX = ".progress.json"
+# Seconds between checkpoints; a crash loses at most this much work
+CHECKPOINT_INTERVAL = 5.0
+HEADER_BYTES = len(wav_header(SAMPLE_RATE))
+BYTES_PER_FRAME = 2
+DEFAULT_VOICE = "af_bella"
+# PCM read back per block when re-encoding after a resume
+REENCODE_BLOCK_FRAMES = 1 << 20
+
+
+class LongFormRenderer:
+    """Renders a long text into an audio file segment by segment"""
+
+    def __init__(self, engine, text, output, voice, speed=1.0, max_chars=DEFAULT_MAX_CHARS,
+                 output_settings=None):
+        self.engine = engine
+        self.output = Path(output)
+        self.voice = voice
+        self.speed = speed
+        self.output_settings = (output_settings or OutputSettings()).for_path(self.output)
+        # The checkpointed PCM does not depend on the output settings, so
+        # changing the format of an interrupted job still resumes it
+        start = time.perf_counter()
+        self.segments = split_text_into_chunks(text, max_chars)
+        self.prep_seconds = time.perf_counter() - start
+        pipeline_metrics.record_stage("text_prep", self.prep_seconds)
+        self.chars = len(text)
+        key = json.dumps([text, engine.voice_key(voice), speed, max_chars, engine.model_version()],
+                         ensure_ascii=False)
+        self.digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        self.info = None
+
+    @property
+    def partial_path(self):
+        """Checkpointed 16-bit PCM"""
+        return self.output.with_name(self.output.stem + ".part.wav")
+
+    @property
+    def encoded_path(self):
+        """Final file while rendering (the PCM itself when no encoding is needed)"""
+        if not self.needs_encoding:
+            return self.partial_path
+        return self.output.with_name(self.output.stem + ".encoding" + self.output.suffix)
+
+    @property
+    def needs_encoding(self):
+        settings = self.output_settings
+        return (settings.format != "wav" or settings.sample_rate not in (None, SAMPLE_RATE)
+                or settings.processing)
+
+    @property
+    def checkpoint_path(self):
+        return self.output.with_name(self.output.name + CHECKPOINT_SUFFIX)
+
+    def load_checkpoint(self):
+        """Checkpoint of an interrupted run of this exact job, or None"""
+        try:
+            checkpoint = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if checkpoint.get("digest") != self.digest:
+            return None
+        # The checkpoint is written after the data is on disk, so the
+        # partial file can only be longer (an unfinished segment), never shorter
+        needed = HEADER_BYTES + checkpoint["frames"] * BYTES_PER_FRAME
+        if not self.partial_path.exists() or self.partial_path.stat().st_size < needed:
+            return None
+        return checkpoint
+
+    def discard_checkpoint(self):
+        for path in (self.checkpoint_path, self.partial_path, self.encoded_path):
+            if path.exists():
+                path.unlink()
+
+    def _start_encoder(self, sample_rate, frames):
+        """Encoder stage for the final file, fed with the PCM already on disk"""
+        encoder = EncoderStage(self.encoded_path, self.output_settings, sample_rate)
+        if frames:
+            with open(self.partial_path, "rb") as pcm_file:
+                pcm_file.seek(HEADER_BYTES)
+                remaining = frames
+                while remaining:
+                    count = min(remaining, REENCODE_BLOCK_FRAMES)
+                    encoder.put(np.frombuffer(pcm_file.read(count * BYTES_PER_FRAME), "<i2"))
+                    remaining -= count
+        return encoder
+
+    def _checkpoint(self, audio_file, segments_done, frames, sample_rate):
+        """Make the audio durable first, then record how far it goes"""
+        with pipeline_metrics.stage("file_io"):
+            self._write_checkpoint(audio_file, segments_done, frames, sample_rate)
+
+    def _write_checkpoint(self, audio_file, segments_done, frames, sample_rate):
+        audio_file.flush()
+        os.fsync(audio_file.fileno())
+        checkpoint = {
+            "digest": self.digest,
+            "segments_done": segments_done,
+            "segments": len(self.segments),
+            "frames": frames,
+            "sample_rate": sample_rate,
+            "updated": int(time.time()),
+        }
+        tmp_path = self.checkpoint_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(checkpoint), encoding="utf-8")
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def render(self, progress=None, stop_event=None):
+        """Render (or resume) the text, returns an info dict.
+
+        progress(segments_done, segments_total, audio_seconds) is called after
+        every segment. Setting stop_event stops after the current segment and
+        leaves the checkpoint in place, so the next render() continues from it.
+        """
+        steps = self.render_steps(progress)
+        for _ in steps:
+            if stop_event is not None and stop_event.is_set():
+                steps.close()
+                break
+        return self.info
+
+    def render_steps(self, progress=None):
+        """Generator version of render() that yields after every segment.
+
+        Closing the generator early checkpoints what was rendered so far; the
+        result is available as self.info either way.
+        """
+        start_time = time.time()
+        # Stage timings go to the caller's job (a GUI job), else to a job of our own
+        trace = pipeline_metrics.current_trace()
+        owned_trace = trace is None
+        if owned_trace:
+            trace = pipeline_metrics.start_job("long_form", self.output.name, voice=self.voice,
+                                               chars=self.chars)
+            trace.add_stage("text_prep", self.prep_seconds)
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        checkpoint = self.load_checkpoint()
+        if checkpoint is None:
+            self.discard_checkpoint()
+            first_segment, frames, sample_rate = 0, 0, None
+            audio_file = None
+        else:
+            first_segment = checkpoint["segments_done"]
+            frames = checkpoint["frames"]
+            sample_rate = checkpoint["sample_rate"]
+            # Drop whatever was written after the last checkpoint
+            audio_file = open(self.partial_path, "r+b")
+            audio_file.truncate(HEADER_BYTES + frames * BYTES_PER_FRAME)
+            audio_file.seek(0, os.SEEK_END)
+
+        def update_info(complete):
+            self.info = {
+                "path": str(self.output if complete else self.partial_path),
+                "format": self.output_settings.format,
+                "complete": complete,
+                "segments": len(self.segments),
+                "segments_done": segments_done,
+                "resumed_from": first_segment,
+                "sample_rate": self.output_settings.target_rate(sample_rate) if sample_rate else None,
+                "audio_seconds": frames / sample_rate if sample_rate else 0.0,
+                "generation_seconds": time.time() - start_time,
+                "bytes_written": trace.bytes_written,
+                "stages": trace.stage_seconds(),
+            }
+
+        encoder = None
+        if self.needs_encoding and sample_rate is not None:
+            with pipeline_metrics.activate(trace):
+                encoder = self._start_encoder(sample_rate, frames)
+
+        segments_done = first_segment
+        last_checkpoint = time.monotonic()
+        complete = False
+        update_info(complete)
+        try:
+            for segment in self.segments[first_segment:]:
+                with pipeline_metrics.activate(trace):
+                    samples, segment_rate = self.engine.synthesize(segment, self.voice, self.speed)
+                    if audio_file is None:
+                        sample_rate = segment_rate
+                        audio_file = open(self.partial_path, "wb")
+                        audio_file.write(wav_header(sample_rate))
+                        if self.needs_encoding:
+                            encoder = self._start_encoder(sample_rate, 0)
+                    pcm = to_pcm16(samples)
+                    with pipeline_metrics.stage("file_io"):
+                        audio_file.write(pcm.astype("<i2", copy=False).tobytes())
+                    if not self.needs_encoding:
+                        pipeline_metrics.add_bytes(pcm.nbytes)
+                    if encoder is not None:
+                        encoder.put(pcm)
+                    trace.add_audio(len(samples) / sample_rate)
+                    frames += len(samples)
+                    segments_done += 1
+                    if time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                        self._checkpoint(audio_file, segments_done, frames, sample_rate)
+                        last_checkpoint = time.monotonic()
+                if progress is not None:
+                    progress(segments_done, len(self.segments), frames / sample_rate)
+                update_info(complete)
+                yield
+
+            if audio_file is None:
+                raise EngineError("No text to synthesize")
+            # Final lengths replace the "unknown" placeholders
+            data_bytes = frames * BYTES_PER_FRAME
+            audio_file.seek(4)
+            audio_file.write(struct.pack("<I", min(0xFFFFFFFF, data_bytes + 36)))
+            audio_file.seek(HEADER_BYTES - 4)
+            audio_file.write(struct.pack("<I", data_bytes))
+            complete = True
+        finally:
+            with pipeline_metrics.activate(trace):
+                try:
+                    if audio_file is not None:
+                        if not complete:
+                            # Stopped early (or failed): keep what is on disk resumable
+                            self._checkpoint(audio_file, segments_done, frames, sample_rate)
+                        audio_file.close()
+                    if encoder is not None:
+                        encoder.close()
+                finally:
+                    if owned_trace and not complete:
+                        failure = sys.exc_info()[0]
+                        status = "stopped" if failure in (None, GeneratorExit) else "error"
+                        pipeline_metrics.finish_job(trace, status, segments_done=segments_done)
+
+        os.replace(self.encoded_path, self.output)
+        if self.needs_encoding:
+            self.partial_path.unlink()
+        self.checkpoint_path.unlink(missing_ok=True)
+        update_info(complete)
+        if owned_trace:
+            pipeline_metrics.finish_job(trace, segments=len(self.segments),
+                                        resumed_from=first_segment)
+        return self.info
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="run.py longform",
+                                     description="Render a long text to audio with resume support")
+    parser.add_argument("source", help="Text file (UTF-8)")
+    parser.add_argument("-o", "--output",
+                        help="Output file, format from the extension (default: next to the text file)")
+    parser.add_argument("--voice", default=DEFAULT_VOICE, help="Voice id")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed (0.5-2.0)")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore an existing checkpoint and start from the beginning")
+    parser.add_argument("--models-dir", help="Directory with kokoro-v1.0.onnx and voices-v1.0.bin")
+    parser.add_argument("--model-variant", choices=VARIANT_POLICIES,
+                        help="Model variant or selection policy (default: fp32)")
+    add_output_arguments(parser)
+    add_session_arguments(parser)
+    pipeline_metrics.add_metrics_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    pipeline_metrics.configure_from_args(args)
+    source = Path(args.source)
+    text = source.read_text(encoding="utf-8")
+    output_settings = output_settings_from_args(args)
+    output = Path(args.output) if args.output else source.with_suffix(output_settings.extension)
+
+    model_file, voices_file = resolve_model_paths(args.models_dir, args.model_variant)
+    try:
+        engine = KokoroEngine(model_file, voices_file, session_config_from_args(args)).load()
+        renderer = LongFormRenderer(engine, text, output, args.voice, args.speed,
+                                    output_settings=output_settings)
+    except (ModelNotFoundError, EngineError) as e:
+        print(f"❌ {e}")
+        return False
+
+    if args.restart:
+        renderer.discard_checkpoint()
+    checkpoint = renderer.load_checkpoint()
+    if checkpoint:
+        print(f"↩️  Resuming at segment {checkpoint['segments_done'] + 1}/{len(renderer.segments)}")
+    else:
+        print(f"📖 Rendering {len(renderer.segments)} segments to {output} "
+              f"({renderer.output_settings.describe()})")
+
+    def report(done, total, audio_seconds):
+        minutes, seconds = divmod(int(audio_seconds), 60)
+        print(f"\r  {done}/{total} segments, {minutes}:{seconds:02d} of audio", end="", flush=True)
+
+    try:
+        with profiling.profile_run(args, "long_form", renderer.chars, args.voice, args.speed):
+            info = renderer.render(progress=report)
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrupted. Run the same command again to resume.")
+        return False
+    except EngineError as e:
+        print(f"\n❌ {e}")
+        return False
+    finally:
+        pipeline_metrics.write_metrics_file(args)
+    print(f"\n✅ {info['path']} ({info['audio_seconds'] / 60:.1f} min of audio "
+          f"in {info['generation_seconds']:.1f}s)")
+    breakdown = pipeline_metrics.describe_stages(info["stages"])
+    if breakdown:
+        print(f"⏱️  {breakdown}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
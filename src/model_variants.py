@@ -0,0 +1,129 @@
+"""
+Reduced-precision and pre-optimized Kokoro model variants
+
+Variants are produced locally from the full-precision model and cached in
+models/ next to it:
+
+    kokoro-v1.0.onnx        fp32       original model
+    kokoro-v1.0.int8.onnx   int8       dynamic INT8 quantization (smaller, faster on CPU)
+    kokoro-v1.0.opt.onnx    optimized  offline-optimized graph (faster session start)
+
+The engine picks a variant by policy: an explicit variant name, "quality"
+(fp32), "fastest" (lowest measured real-time factor from the comparison
+report, or int8 if there is no report) or "smallest".
+"""
+
+import json
+import os
+from pathlib import Path
+
+from engine_config import get_config_path
+
+VARIANTS = {
+    "fp32": "kokoro-v1.0.onnx",
+    "int8": "kokoro-v1.0.int8.onnx",
+    "optimized": "kokoro-v1.0.opt.onnx",
+}
+VARIANT_POLICIES = tuple(VARIANTS) + ("quality", "fastest", "smallest")
+DEFAULT_POLICY = "fp32"
+REPORT_FILENAME = "variants_report.json"
+
+# Preference order when there is no measurement to go by
+FASTEST_FALLBACK_ORDER = ("int8", "optimized", "fp32")
+QUALITY_ORDER = ("fp32", "optimized", "int8")
+
+
+def variant_path(models_dir, variant):
+    return Path(models_dir) / VARIANTS[variant]
+
+
+def available_variants(models_dir):
+    """Variant names whose model file exists"""
+    return [name for name in VARIANTS if variant_path(models_dir, name).exists()]
+
+
+def load_report(models_dir):
+    """Comparison report written by scripts/optimize_model.py --compare, or None"""
+    report_file = Path(models_dir) / REPORT_FILENAME
+    if not report_file.exists():
+        return None
+    try:
+        return json.loads(report_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def resolve_policy(policy=None):
+    """Policy from the argument, KOKORO_MODEL_VARIANT or kokoro_config.json ("model.variant")"""
+    if policy:
+        return policy
+    if os.environ.get("KOKORO_MODEL_VARIANT"):
+        return os.environ["KOKORO_MODEL_VARIANT"]
+    config_file = get_config_path()
+    if config_file.exists():
+        try:
+            with open(config_file, encoding="utf-8") as f:
+                return json.load(f).get("model", {}).get("variant", DEFAULT_POLICY)
+        except (OSError, ValueError):
+            pass
+    return DEFAULT_POLICY
+
+
+def select_variant(models_dir, policy=None):
+    """Return (variant name, model path) for a policy, falling back to fp32"""
+    policy = resolve_policy(policy)
+    if policy not in VARIANT_POLICIES:
+        raise ValueError(f"Unknown model variant policy '{policy}', "
+                         f"expected one of {VARIANT_POLICIES}")
+    available = available_variants(models_dir)
+
+    if policy in VARIANTS:
+        candidates = [policy]
+    elif policy == "quality":
+        candidates = list(QUALITY_ORDER)
+    elif policy == "smallest":
+        candidates = sorted(available, key=lambda name: variant_path(models_dir, name).stat().st_size)
+    else:
+        report = load_report(models_dir)
+        measured = (report or {}).get("variants", {})
+        candidates = sorted((name for name in available if name in measured),
+                            key=lambda name: measured[name]["rtf"])
+        candidates += [name for name in FASTEST_FALLBACK_ORDER if name not in candidates]
+
+    for name in candidates:
+        if name in available:
+            return name, variant_path(models_dir, name)
+    # Nothing matched; the original model is always the final fallback
+    return "fp32", variant_path(models_dir, "fp32")
+
+
+def build_int8(models_dir, op_types=None):
+    """Write the dynamic INT8 quantized model, returns its path"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    source = variant_path(models_dir, "fp32")
+    target = variant_path(models_dir, "int8")
+    tmp_target = target.with_suffix(".tmp.onnx")
+    quantize_dynamic(str(source), str(tmp_target), weight_type=QuantType.QInt8,
+                     op_types_to_quantize=op_types)
+    os.replace(tmp_target, target)
+    return target
+
+
+def build_optimized(models_dir):
+    """Write the offline-optimized graph, returns its path.
+
+    Extended (not "all") optimizations are used because layout-specific
+    transformations tie the saved graph to the CPU it was produced on.
+    """
+    import onnxruntime as ort
+
+    source = variant_path(models_dir, "fp32")
+    target = variant_path(models_dir, "optimized")
+    tmp_target = target.with_suffix(".tmp.onnx")
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    options.optimized_model_filepath = str(tmp_target)
+    ort.InferenceSession(str(source), sess_options=options, providers=["CPUExecutionProvider"])
+    os.replace(tmp_target, target)
+    return target
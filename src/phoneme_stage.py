@@ -0,0 +1,149 @@
+"""
+Phonemization stage with an LRU cache and a prefetch thread
+
+kokoro.create() normally phonemizes (espeak-ng G2P) every call before
+running the model. The engine instead phonemizes as a separate stage:
+
+- results are cached per sentence in an LRU keyed by language and normalized
+  text, so repeated or lightly edited texts skip G2P for unchanged sentences;
+- PhonemePrefetch phonemizes the upcoming chunks on a background thread
+  while the model runs on the current one (espeak-ng and ONNX Runtime both
+  release the GIL), so inference never waits on G2P.
+
+espeak-ng keeps global state, so all G2P calls in the process are serialized.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import pipeline_metrics
+from synthesis_cache import normalize_text
+
+PHONEME_CACHE_ENTRIES = 8192
+# Chunks phonemized ahead of the one being synthesized
+PREFETCH_AHEAD = 8
+
+_G2P_LOCK = threading.Lock()
+
+
+class Phonemizer:
+    """Cached text -> phonemes for one kokoro tokenizer"""
+
+    def __init__(self, tokenizer, max_entries=PHONEME_CACHE_ENTRIES):
+        self.tokenizer = tokenizer
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.seconds = 0.0
+
+    def phonemize(self, text, lang):
+        key = (lang, normalize_text(text))
+        with self._lock:
+            phonemes = self._entries.get(key)
+            if phonemes is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return phonemes
+
+        start = time.perf_counter()
+        with _G2P_LOCK:
+            phonemes = self.tokenizer.phonemize(key[1], lang)
+        elapsed = time.perf_counter() - start
+        pipeline_metrics.record_stage("phonemize", elapsed)
+
+        with self._lock:
+            self.misses += 1
+            self.seconds += elapsed
+            self._entries[key] = phonemes
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return phonemes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def prefetch(self, texts, lang, ahead=PREFETCH_AHEAD):
+        return PhonemePrefetch(self, texts, lang, ahead)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "phonemize_seconds": round(self.seconds, 4),
+                "phoneme_cache_hits": self.hits,
+                "phoneme_cache_misses": self.misses,
+                "phoneme_cache_entries": len(self._entries),
+            }
+
+
+class PhonemePrefetch:
+    """Phonemizes texts in order on a background thread, at most `ahead` ahead.
+
+    get(index) returns the phonemes of texts[index], waiting if the thread
+    has not reached it yet. Use as a context manager so the thread stops
+    when the consumer does.
+    """
+
+    def __init__(self, phonemizer, texts, lang, ahead=PREFETCH_AHEAD):
+        self.phonemizer = phonemizer
+        self.texts = list(texts)
+        self.lang = lang
+        self.ahead = ahead
+        self._results = {}
+        self._consumed = 0
+        self._skipped = set()
+        self._closed = False
+        self._condition = threading.Condition()
+        # G2P time counts towards the job that started the prefetch
+        self._thread = threading.Thread(target=pipeline_metrics.bind(self._run),
+                                        name="phoneme-prefetch", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for index, text in enumerate(self.texts):
+            with self._condition:
+                while not self._closed and index >= self._consumed + self.ahead:
+                    self._condition.wait()
+                if self._closed:
+                    return
+            try:
+                result = self.phonemizer.phonemize(text, self.lang)
+            except Exception as e:
+                result = e
+            with self._condition:
+                if index not in self._skipped:
+                    self._results[index] = result
+                self._condition.notify_all()
+
+    def get(self, index):
+        with self._condition:
+            while index not in self._results:
+                self._condition.wait()
+            result = self._results.pop(index)
+            self._consumed = max(self._consumed, index + 1)
+            self._condition.notify_all()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def skip(self, index):
+        """The consumer does not need texts[index] (e.g. its audio was cached)"""
+        with self._condition:
+            self._skipped.add(index)
+            self._results.pop(index, None)
+            self._consumed = max(self._consumed, index + 1)
+            self._condition.notify_all()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
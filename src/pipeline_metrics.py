@@ -0,0 +1,289 @@
+"""
+Per-stage timings for the synthesis pipeline
+
+Every stage of a job reports the time it took:
+
+    text_prep     splitting and normalizing the text
+    phonemize     espeak-ng G2P (cache misses only)
+    inference     the ONNX model
+    postprocess   PCM conversion and resampling
+    encode        writing the output format (WAV/FLAC/Opus/MP3)
+    file_io       raw audio and checkpoint writes
+
+Timings always go into process-wide totals (METRICS), and into the trace of
+the job running on the current thread, if any. A job is opened with
+start_job() by whatever owns it (a GUI job, a server request, a batch item,
+a long-form render) and activated on the threads doing its work; background
+threads (phoneme prefetch, encoder) inherit it through bind(). finish_job()
+adds the job to the totals and, when tracing is on, appends one JSON line
+to the trace log:
+
+    {"ts": ..., "kind": "long_form", "name": "chapter1", "status": "ok",
+     "wall_seconds": 41.2, "audio_seconds": 305.0, "rtf": 0.135,
+     "bytes_written": 14640044, "stages": {"phonemize": 2.1, "inference": 36.8, ...}}
+
+Tracing is enabled with --trace FILE on the command-line tools or the
+KOKORO_TRACE_FILE environment variable. METRICS.render_prometheus() gives
+the totals in the Prometheus text format (the server's /metrics/prometheus,
+--metrics-file on the command-line tools).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+STAGES = ("text_prep", "phonemize", "inference", "postprocess", "encode", "file_io")
+TRACE_ENV = "KOKORO_TRACE_FILE"
+
+_local = threading.local()
+
+
+class JobTrace:
+    """Stage timings and output of one job"""
+
+    def __init__(self, kind, name=None, **fields):
+        self.kind = kind
+        self.name = name
+        self.fields = fields
+        self.stages = {}
+        self.audio_seconds = 0.0
+        self.bytes_written = 0
+        self.started = time.perf_counter()
+        self.record = None
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_audio(self, seconds):
+        with self._lock:
+            self.audio_seconds += seconds
+
+    def add_bytes(self, count):
+        with self._lock:
+            self.bytes_written += count
+
+    def stage_seconds(self):
+        with self._lock:
+            return {stage: round(seconds, 4) for stage, seconds in self.stages.items()}
+
+    def finish(self, status="ok", wall_seconds=None, **fields):
+        """Freeze the trace into a record"""
+        wall_seconds = time.perf_counter() - self.started if wall_seconds is None else wall_seconds
+        self.record = {
+            "ts": round(time.time(), 3),
+            "kind": self.kind,
+            "name": self.name,
+            "status": status,
+            "wall_seconds": round(wall_seconds, 4),
+            "audio_seconds": round(self.audio_seconds, 3),
+            "rtf": round(wall_seconds / self.audio_seconds, 4) if self.audio_seconds else None,
+            "bytes_written": self.bytes_written,
+            "stages": self.stage_seconds(),
+        }
+        self.record.update(self.fields)
+        self.record.update(fields)
+        return self.record
+
+
+class PipelineMetrics:
+    """Process-wide stage totals, job counters and the optional trace log"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_seconds = {stage: 0.0 for stage in STAGES}
+        self.stage_calls = {stage: 0 for stage in STAGES}
+        # (kind, status) -> count
+        self.jobs = {}
+        self.job_seconds = 0.0
+        self.audio_seconds = 0.0
+        self.bytes_written = 0
+        self.trace_path = None
+
+    def enable_trace(self, path):
+        self.trace_path = Path(path) if path else None
+        if self.trace_path is not None:
+            self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def record_stage(self, stage, seconds):
+        with self._lock:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+            self.stage_calls[stage] = self.stage_calls.get(stage, 0) + 1
+
+    def record_job(self, record, trace=True):
+        """Count a finished job (a JobTrace record, also from another process)"""
+        with self._lock:
+            key = (record["kind"], record["status"])
+            self.jobs[key] = self.jobs.get(key, 0) + 1
+            self.job_seconds += record.get("wall_seconds") or 0.0
+            self.audio_seconds += record.get("audio_seconds") or 0.0
+            self.bytes_written += record.get("bytes_written") or 0
+        if trace and self.trace_path is not None:
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            # One append per line, so worker processes can share the file
+            with open(self.trace_path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def absorb_stages(self, stages):
+        """Add stage timings measured in another process"""
+        with self._lock:
+            for stage, seconds in stages.items():
+                self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "stage_seconds": {stage: round(seconds, 4)
+                                  for stage, seconds in self.stage_seconds.items()},
+                "stage_calls": dict(self.stage_calls),
+                "jobs": {f"{kind}:{status}": count for (kind, status), count in self.jobs.items()},
+                "job_seconds": round(self.job_seconds, 3),
+                "audio_seconds": round(self.audio_seconds, 3),
+                "rtf": round(self.job_seconds / self.audio_seconds, 4) if self.audio_seconds else None,
+                "bytes_written": self.bytes_written,
+            }
+
+    def render_prometheus(self, extra=None):
+        """Totals in the Prometheus text exposition format.
+
+        extra is an optional list of (name, help, type, value) for metrics
+        owned by the caller (e.g. the server's queue depth).
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, help_text, kind, samples):
+            lines.append(f"# HELP kokoro_{name} {help_text}")
+            lines.append(f"# TYPE kokoro_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"kokoro_{name}{{{label_text}}} {value}" if label_text
+                             else f"kokoro_{name} {value}")
+
+        metric("stage_seconds_total", "Time spent per pipeline stage", "counter",
+               [({"stage": stage}, seconds) for stage, seconds in snapshot["stage_seconds"].items()])
+        metric("stage_calls_total", "Timed operations per pipeline stage", "counter",
+               [({"stage": stage}, calls) for stage, calls in snapshot["stage_calls"].items()])
+        with self._lock:
+            jobs = list(self.jobs.items())
+        metric("jobs_total", "Finished jobs by kind and status", "counter",
+               [({"kind": kind, "status": status}, count) for (kind, status), count in jobs])
+        metric("job_seconds_total", "Wall time of finished jobs", "counter",
+               [({}, snapshot["job_seconds"])])
+        metric("audio_seconds_total", "Seconds of audio produced by finished jobs", "counter",
+               [({}, snapshot["audio_seconds"])])
+        metric("bytes_written_total", "Bytes of audio written", "counter",
+               [({}, snapshot["bytes_written"])])
+        for name, help_text, kind, value in extra or []:
+            metric(name, help_text, kind, [({}, value)])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, extra=None):
+        """Write a snapshot file (e.g. for node_exporter's textfile collector)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(self.render_prometheus(extra), encoding="utf-8")
+        os.replace(tmp_path, path)
+        return path
+
+
+METRICS = PipelineMetrics()
+METRICS.enable_trace(os.environ.get(TRACE_ENV))
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def activate(trace):
+    """Attribute the stages run on this thread to trace"""
+    previous = current_trace()
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+def bind(function):
+    """Wrap function so it runs under the current thread's trace (for worker threads)"""
+    trace = current_trace()
+
+    def run(*args, **kwargs):
+        with activate(trace):
+            return function(*args, **kwargs)
+    return run
+
+
+def record_stage(stage, seconds):
+    METRICS.record_stage(stage, seconds)
+    trace = current_trace()
+    if trace is not None:
+        trace.add_stage(stage, seconds)
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as a pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def add_audio(seconds):
+    trace = current_trace()
+    if trace is not None:
+        trace.add_audio(seconds)
+
+
+def add_bytes(count):
+    trace = current_trace()
+    if trace is not None:
+        trace.add_bytes(count)
+
+
+def start_job(kind, name=None, **fields):
+    return JobTrace(kind, name, **fields)
+
+
+def finish_job(trace, status="ok", wall_seconds=None, **fields):
+    """Close a job: count it and append it to the trace log"""
+    record = trace.finish(status, wall_seconds, **fields)
+    METRICS.record_job(record)
+    return record
+
+
+def add_metrics_arguments(parser):
+    """Add --trace / --metrics-file to an argparse parser"""
+    group = parser.add_argument_group("Metrics")
+    group.add_argument("--trace", default=os.environ.get(TRACE_ENV),
+                       help=f"Append a JSON line per job to this file (env {TRACE_ENV})")
+    group.add_argument("--metrics-file",
+                       help="Write a Prometheus-format snapshot of the stage totals on exit")
+    return group
+
+
+def configure_from_args(args):
+    METRICS.enable_trace(getattr(args, "trace", None))
+
+
+def write_metrics_file(args, extra=None):
+    """Write the --metrics-file snapshot, if one was requested"""
+    path = getattr(args, "metrics_file", None)
+    if path:
+        METRICS.write_prometheus(path, extra)
+    return path
+
+
+def describe_stages(stages):
+    """"inference 12.10s, phonemize 0.80s, ..." for the stages that took time ("" if none)"""
+    parts = [f"{stage} {stages[stage]:.2f}s" for stage in STAGES if stages.get(stage, 0) >= 0.005]
+    return ", ".join(parts)
@@ -0,0 +1,102 @@
+"""
+Persistent voice preview store
+
+Preview samples are rendered once per voice and model version and kept on
+disk with a JSON index, so browsing voices is instant across sessions. The
+index is validated on startup: entries for another model version, another
+sample text or with missing files are dropped.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+PREVIEW_TEXT = "Hello! This is a voice preview sample. How do you like this voice?"
+INDEX_FILE = "index.json"
+
+
+class PreviewStore:
+    """Voice previews on disk, indexed by voice id and model version"""
+
+    def __init__(self, previews_dir, model_version, sample_text=PREVIEW_TEXT):
+        self.previews_dir = Path(previews_dir)
+        self.previews_dir.mkdir(parents=True, exist_ok=True)
+        self.model_version = model_version
+        self.sample_text = sample_text
+        self.text_digest = hashlib.sha256(sample_text.encode("utf-8")).hexdigest()[:16]
+        self.index = {}
+        self._lock = threading.Lock()
+        self.validate()
+
+    @property
+    def index_file(self):
+        return self.previews_dir / INDEX_FILE
+
+    def validate(self):
+        """Load the index and drop entries that are stale or missing on disk"""
+        try:
+            entries = json.loads(self.index_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            entries = {}
+
+        valid = {}
+        for voice_id, entry in entries.items():
+            path = self.previews_dir / entry.get("file", "")
+            is_current = (entry.get("model_version") == self.model_version
+                          and entry.get("text_digest") == self.text_digest)
+            if is_current and path.is_file():
+                valid[voice_id] = entry
+            elif path.is_file():
+                # Rendered with another model or sample text
+                path.unlink()
+
+        with self._lock:
+            self.index = valid
+            self._save()
+        return len(valid)
+
+    def _save(self):
+        tmp_file = self.index_file.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps(self.index, indent=2), encoding="utf-8")
+        os.replace(tmp_file, self.index_file)
+
+    def get(self, voice_id):
+        """Path of the stored preview for voice_id, or None"""
+        with self._lock:
+            entry = self.index.get(voice_id)
+        if entry is None:
+            return None
+        path = self.previews_dir / entry["file"]
+        return str(path) if path.is_file() else None
+
+    def missing(self, voice_ids):
+        return [voice_id for voice_id in voice_ids if self.get(voice_id) is None]
+
+    def render(self, engine, voice_id):
+        """Synthesize and store the preview for voice_id, returns its path"""
+        samples, sample_rate = engine.synthesize(self.sample_text, voice_id, speed=1.0)
+        filename = f"preview_{voice_id}.wav"
+        path = self.previews_dir / filename
+        tmp_path = self.previews_dir / f"preview_{voice_id}.{threading.get_ident()}.tmp.wav"
+        engine.write_audio(tmp_path, samples, sample_rate)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.index[voice_id] = {
+                "file": filename,
+                "model_version": self.model_version,
+                "text_digest": self.text_digest,
+                "created": int(time.time()),
+            }
+            self._save()
+        return str(path)
+
+    def prerender_steps(self, engine, voice_ids):
+        """Render missing previews one voice per step (for a job scheduler)"""
+        for voice_id in self.missing(voice_ids):
+            if self.get(voice_id) is None:
+                self.render(engine, voice_id)
+            yield voice_id
@@ -0,0 +1,384 @@
+"""
+Profiling mode for generation runs
+
+A generation wrapped in a Profiler is recorded with one of two profilers:
+
+    sample     a wall-clock stack sampler over all threads (low overhead);
+               writes folded stacks for flamegraph.pl, speedscope or inferno
+    cprofile   the deterministic cProfile, on the thread that runs the
+               generation and on threads started while it runs;
+               writes a .pstats file (snakeviz, python -m pstats)
+
+Both also record allocations with tracemalloc (Python and numpy buffers;
+onnxruntime's own arena is not visible to it). Everything lands in
+output/profiles/, named after the run:
+
+    20260118_141502_long_form_48210c_af_bella_1x_sample.folded
+    20260118_141502_long_form_48210c_af_bella_1x_sample.alloc.txt
+    20260118_141502_long_form_48210c_af_bella_1x_sample.json      summary
+
+Switched on with --profile (and --profile-mode sample|cprofile) on the
+command-line tools and run.py, the KOKORO_PROFILE environment variable, or
+the GUI's Tools menu.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from tts_engine import get_output_dir
+
+MODES = ("sample", "cprofile")
+DEFAULT_MODE = "sample"
+PROFILE_ENV = "KOKORO_PROFILE"
+SAMPLE_INTERVAL = 0.005
+TOP_ALLOCATIONS = 30
+TOP_FUNCTIONS = 40
+
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def _start_tracemalloc():
+    # Shared by overlapping profiled runs (GUI jobs); the peak is reset per run
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracemalloc_users += 1
+        tracemalloc.reset_peak()
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+
+def mode_from_env():
+    """Profiling mode requested through KOKORO_PROFILE, or None"""
+    value = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return None
+    return value if value in MODES else DEFAULT_MODE
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the stacks of all other threads at a fixed interval"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def write_folded(self, path):
+        """One "root;...;leaf count" line per distinct stack"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class _Snapshot:
+    """A cProfile profile's stats, taken without disabling it"""
+
+    def __init__(self, profile):
+        profile.snapshot_stats()
+        self.stats = profile.stats
+
+    def create_stats(self):
+        pass
+
+
+class ThreadProfiles:
+    """cProfile is per thread: one profile per thread, merged at the end"""
+
+    def __init__(self):
+        self.profiles = []
+        self._lock = threading.Lock()
+        self._main = None
+
+    def _new_profile(self):
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        return profile
+
+    def _thread_hook(self, frame, event, arg):
+        # Installed by threading.setprofile: the first event of a new thread
+        # replaces the hook with that thread's own profile
+        sys.setprofile(None)
+        self._new_profile().enable()
+
+    def start(self, this_thread=True):
+        threading.setprofile(self._thread_hook)
+        if this_thread:
+            self._main = self._new_profile()
+            self._main.enable()
+
+    def stop(self):
+        if self._main is not None:
+            self._main.disable()
+        threading.setprofile(None)
+
+    def on_this_thread(self):
+        """Profile for an already running thread (e.g. a scheduler worker step)"""
+        return self._new_profile()
+
+    def stats(self):
+        with self._lock:
+            snapshots = [_Snapshot(profile) for profile in self.profiles]
+        stats = pstats.Stats(snapshots[0])
+        for snapshot in snapshots[1:]:
+            stats.add(snapshot)
+        return stats
+
+
+def profile_name(mode, kind, chars=None, voice=None, speed=None):
+    """File stem for a run: time, kind, text length, voice, speed and profiler"""
+    parts = [time.strftime("%Y%m%d_%H%M%S"), kind]
+    if chars is not None:
+        parts.append(f"{chars}c")
+    if voice:
+        parts.append(str(voice))
+    if speed is not None:
+        parts.append(f"{float(speed):g}x")
+    parts.append(mode)
+    return re.sub(r"[^\w.+-]+", "-", "_".join(parts))
+
+
+class Profiler:
+    """Context manager that profiles the enclosed generation and writes the reports"""
+
+    def __init__(self, mode=DEFAULT_MODE, kind="run", chars=None, voice=None, speed=None,
+                 output_dir=None, allocations=True):
+        if mode not in MODES:
+            raise ValueError(f"unknown profiling mode '{mode}' (expected one of {', '.join(MODES)})")
+        self.mode = mode
+        self.tags = {"kind": kind, "chars": chars, "voice": voice, "speed": speed}
+        self.output_dir = Path(output_dir) if output_dir else None
+        self.allocations = allocations
+        self.files = []
+        self.summary = None
+        self._sampler = None
+        self._profiles = None
+        self._started = None
+
+    def start(self, this_thread=True):
+        """Start profiling; this_thread=False leaves the calling thread to step()"""
+        if self.allocations:
+            _start_tracemalloc()
+        if self.mode == "sample":
+            self._sampler = StackSampler()
+            self._sampler.start()
+        else:
+            self._profiles = ThreadProfiles()
+            self._profiles.start(this_thread)
+        self._started = time.perf_counter()
+        return self
+
+    def step(self):
+        """Profile to enable around work on a thread that existed before start() (cprofile only)"""
+        if self._profiles is None:
+            return _NoProfile()
+        return self._profiles.on_this_thread()
+
+    def stop(self):
+        """Stop profiling and write the reports; returns the summary"""
+        wall_seconds = time.perf_counter() - self._started
+        if self._sampler is not None:
+            self._sampler.stop()
+        if self._profiles is not None:
+            self._profiles.stop()
+        allocations = None
+        if self.allocations:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            _stop_tracemalloc()
+            allocations = (snapshot, current, peak)
+        return self._write(wall_seconds, allocations)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _write(self, wall_seconds, allocations):
+        output_dir = self.output_dir or get_output_dir("profiles")
+        output_dir.mkdir(parents=True, exist_ok=True)
+        stem = profile_name(self.mode, **self.tags)
+        name, copy = stem, 1
+        while (output_dir / f"{name}.json").exists():
+            copy += 1
+            name = f"{stem}-{copy}"
+
+        summary = dict(self.tags, mode=self.mode, wall_seconds=round(wall_seconds, 3))
+        if self._sampler is not None:
+            path = output_dir / f"{name}.folded"
+            self._sampler.write_folded(path)
+            summary["samples"] = self._sampler.samples
+            summary["sample_interval"] = self._sampler.interval
+            self.files.append(path)
+        if self._profiles is not None:
+            stats = self._profiles.stats()
+            path = output_dir / f"{name}.pstats"
+            stats.dump_stats(path)
+            self.files.append(path)
+            path = output_dir / f"{name}.txt"
+            with open(path, "w", encoding="utf-8") as f:
+                stats.stream = f
+                stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            self.files.append(path)
+            summary["threads"] = len(self._profiles.profiles)
+        if allocations is not None:
+            snapshot, current, peak = allocations
+            path = output_dir / f"{name}.alloc.txt"
+            self._write_allocations(path, snapshot, current, peak)
+            summary["traced_current_bytes"] = current
+            summary["traced_peak_bytes"] = peak
+            self.files.append(path)
+
+        path = output_dir / f"{name}.json"
+        self.files.append(path)
+        summary["files"] = [file.name for file in self.files]
+        path.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+        self.summary = summary
+        return summary
+
+    @staticmethod
+    def _write_allocations(path, snapshot, current, peak):
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        statistics = snapshot.statistics("lineno")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"Traced memory: {current / 1e6:.1f} MB at the end, "
+                    f"{peak / 1e6:.1f} MB peak\n")
+            f.write(f"Top {TOP_ALLOCATIONS} allocation sites still held:\n\n")
+            for stat in statistics[:TOP_ALLOCATIONS]:
+                frame = stat.traceback[0]
+                f.write(f"{stat.size / 1e6:10.2f} MB {stat.count:8d} blocks  "
+                        f"{frame.filename}:{frame.lineno}\n")
+
+
+class _NoProfile:
+    """Stand-in for step() when sampling (which already sees every thread)"""
+
+    def enable(self):
+        pass
+
+    def disable(self):
+        pass
+
+
+def profile_steps(steps, profiler):
+    """Run a step generator under profiler; a scheduler job may move between worker threads"""
+    profiler.start(this_thread=False)
+    try:
+        while True:
+            profile = profiler.step()
+            profile.enable()
+            try:
+                next(steps)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                profile.disable()
+            yield
+    finally:
+        steps.close()
+        profiler.stop()
+
+
+def add_profile_arguments(parser):
+    """Add --profile and --profile-mode to an argparse parser"""
+    # A plain switch: an optional value would swallow a positional that follows it
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Profile the run and write reports to output/profiles "
+                             f"(env {PROFILE_ENV})")
+    parser.add_argument("--profile-mode", choices=MODES,
+                        help=f"Profiler to use, implies --profile (default: {DEFAULT_MODE})")
+
+
+def mode_from_args(args):
+    """Profiling mode from --profile / --profile-mode / KOKORO_PROFILE, or None"""
+    mode = getattr(args, "profile_mode", None)
+    if mode:
+        return mode
+    if getattr(args, "profile", False):
+        return mode_from_env() or DEFAULT_MODE
+    return mode_from_env()
+
+
+def profiler_from_args(args, kind, chars=None, voice=None, speed=None):
+    """Profiler for --profile, or None when profiling is off"""
+    mode = mode_from_args(args)
+    if not mode:
+        return None
+    return Profiler(mode, kind, chars, voice, speed)
+
+
+@contextmanager
+def profile_run(args, kind, chars=None, voice=None, speed=None):
+    """Profile the enclosed block when --profile is set, and print where the reports went"""
+    profiler = profiler_from_args(args, kind, chars, voice, speed)
+    if profiler is None:
+        yield None
+        return
+    try:
+        with profiler:
+            yield profiler
+    finally:
+        if profiler.summary is not None:
+            print(f"\n🔬 {describe(profiler.summary)}")
+
+
+def describe(summary):
+    """One line for the console: where the reports went"""
+    peak = summary.get("traced_peak_bytes")
+    memory = f", {peak / 1e6:.1f} MB traced peak" if peak is not None else ""
+    return f"{summary['mode']} profile of {summary['wall_seconds']:.1f}s{memory}: {', '.join(summary['files'])}"
@@ -0,0 +1,136 @@
+"""
+Speculative synthesis while the text is still being edited
+
+While the user types, the sentences that look finished (every chunk but the
+one being typed) are synthesized in the background with the selected voice
+and speed and kept in memory. The engine looks chunks up here before the
+cache and the model, so pressing Generate only has to render what is left,
+usually the last sentence.
+
+Results are keyed by the exact chunk text, voice and speed: an edited
+sentence is a new key, and results whose key is no longer in the text are
+discarded at the next update.
+
+    store = SpeculativeStore()
+    engine.speculative = store
+    if store.update(text, voice, speed):
+        scheduler.submit("Speculative", lambda job: speculation_steps(engine, store),
+                         PRIORITY_BACKGROUND)
+"""
+
+import re
+import threading
+
+from text_splitter import split_text_into_chunks, DEFAULT_MAX_CHARS
+
+# Chunks kept at most (a few minutes of audio in memory)
+MAX_CHUNKS = 200
+
+# The last sentence counts as finished once terminal punctuation is followed
+# by whitespace (or a CJK full stop, which needs none)
+_FINISHED_END_RE = re.compile(r'(?:[.!?…]["\'»”’)\]]*\s+|[。！？]\s*)$')
+
+
+def finished_chunks(text, max_chars=DEFAULT_MAX_CHARS):
+    """Chunks of text that typing at the end will not change any more"""
+    chunks = split_text_into_chunks(text, max_chars)
+    if chunks and not _FINISHED_END_RE.search(text):
+        chunks.pop()
+    return chunks
+
+
+class SpeculativeStore:
+    """Pre-synthesized chunks of the text being edited"""
+
+    def __init__(self, max_chunks=MAX_CHUNKS):
+        self.max_chunks = max_chunks
+        self._lock = threading.Lock()
+        # (chunk, voice, speed) -> (samples, sample_rate)
+        self._results = {}
+        # Keys still to synthesize, in text order
+        self._wanted = []
+        self.hits = 0
+        self.synthesized = 0
+        self.discarded = 0
+
+    @staticmethod
+    def key(chunk, voice, speed):
+        return chunk, voice, round(float(speed), 3)
+
+    def update(self, text, voice, speed):
+        """Track the finished chunks of text; returns how many still need synthesis"""
+        wanted = [self.key(chunk, voice, speed) for chunk in finished_chunks(text)]
+        wanted = list(dict.fromkeys(wanted))[:self.max_chunks]
+        current = set(wanted)
+        with self._lock:
+            stale = [key for key in self._results if key not in current]
+            for key in stale:
+                del self._results[key]
+            self.discarded += len(stale)
+            self._wanted = [key for key in wanted if key not in self._results]
+            return len(self._wanted)
+
+    def clear(self):
+        with self._lock:
+            self.discarded += len(self._results)
+            self._results.clear()
+            self._wanted = []
+
+    def next_wanted(self):
+        """The next chunk to synthesize as (chunk, voice, speed), or None"""
+        with self._lock:
+            return self._wanted[0] if self._wanted else None
+
+    def put(self, key, result):
+        """Store a result, unless its chunk was edited away meanwhile (None: nothing to store)"""
+        with self._lock:
+            if key not in self._wanted:
+                if result is not None:
+                    self.discarded += 1
+                return
+            self._wanted.remove(key)
+            if result is not None:
+                self._results[key] = result
+                self.synthesized += 1
+
+    def get(self, chunk, voice, speed):
+        """Pre-synthesized (samples, sample_rate) for a chunk, or None"""
+        with self._lock:
+            result = self._results.get(self.key(chunk, voice, speed))
+            if result is not None:
+                self.hits += 1
+            return result
+
+    def has(self, chunk, voice, speed):
+        with self._lock:
+            return self.key(chunk, voice, speed) in self._results
+
+    def progress(self):
+        """(ready, ready + still wanted) chunks"""
+        with self._lock:
+            return len(self._results), len(self._results) + len(self._wanted)
+
+    def stats(self):
+        with self._lock:
+            return {"ready": len(self._results), "wanted": len(self._wanted),
+                    "hits": self.hits, "synthesized": self.synthesized,
+                    "discarded": self.discarded}
+
+
+def speculation_steps(engine, store, progress=None):
+    """Synthesize the wanted chunks one per step until none are left (a scheduler job).
+
+    The store is re-read before every step, so edits made while the job runs
+    take effect at the next chunk. progress(ready, total) is called after
+    each chunk.
+    """
+    while True:
+        key = store.next_wanted()
+        if key is None:
+            return store.stats()
+        chunk, voice, speed = key
+        # Chunks already in the audio cache need no speculation (None)
+        store.put(key, engine.presynthesize(chunk, voice, speed))
+        if progress is not None:
+            progress(*store.progress())
+        yield
@@ -0,0 +1,194 @@
+"""
+Content-addressed on-disk cache for synthesized audio
+
+Entries are keyed by a hash of the normalized text, voice id, speed and the
+digests of the model and voices files, so a model update never serves stale
+audio. The cache is bounded in size and evicts least recently used entries.
+It is used both for whole documents and for individual sentences, so editing
+one paragraph only re-synthesizes the sentences that changed.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from pathlib import Path
+
+import soundfile as sf
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB
+DIGESTS_FILE = "digests.json"
+
+
+def normalize_text(text):
+    """Normalize text so trivially different inputs share a cache entry"""
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def file_digest(path, memo_dir=None):
+    """SHA-256 of a file, memoized by path, size and mtime"""
+    path = Path(path)
+    stat = path.stat()
+    memo_key = f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+    memo_file = Path(memo_dir) / DIGESTS_FILE if memo_dir else None
+
+    memo = {}
+    if memo_file is not None and memo_file.exists():
+        try:
+            memo = json.loads(memo_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            memo = {}
+    if memo_key in memo:
+        return memo[memo_key]
+
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+    digest = sha256.hexdigest()
+
+    if memo_file is not None:
+        memo[memo_key] = digest
+        # Unique per thread: engines in one process may hash the same model at once
+        tmp_file = memo_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp_file.write_text(json.dumps(memo, indent=1), encoding="utf-8")
+            os.replace(tmp_file, memo_file)
+        except OSError:
+            # Only the memo is lost; the digest is still correct
+            tmp_file.unlink(missing_ok=True)
+    return digest
+
+
+class SynthesisCache:
+    """Size-bounded LRU cache of synthesized audio stored as float WAV files"""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, model_digest=""):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.model_digest = model_digest
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> [size, last_used]; rebuilt from the directory on startup
+        self._entries = {}
+        self._total_bytes = 0
+        self._scan()
+
+    @classmethod
+    def for_model(cls, cache_dir, model_file, voices_file, max_bytes=DEFAULT_MAX_BYTES):
+        """Cache bound to the digests of the given model and voices files"""
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        model_digest = ":".join(file_digest(path, cache_dir)
+                                for path in (model_file, voices_file))
+        return cls(cache_dir, max_bytes, model_digest)
+
+    def _path(self, key):
+        # Two-level fan-out keeps directories small
+        return self.cache_dir / key[:2] / f"{key}.wav"
+
+    def _scan(self):
+        for path in self.cache_dir.glob("??/*.wav"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            self._entries[path.stem] = [stat.st_size, stat.st_mtime]
+            self._total_bytes += stat.st_size
+
+    def key(self, text, voice, speed):
+        """Cache key for a synthesis request"""
+        payload = json.dumps([normalize_text(text), str(voice), round(float(speed), 3),
+                              self.model_digest], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def __contains__(self, key):
+        """Whether key is known to be cached (a hint: entries may be evicted any time)"""
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        """Return (samples, sample_rate) or None"""
+        path = self._path(key)
+        try:
+            samples, sample_rate = sf.read(str(path), dtype="float32")
+        except Exception:
+            with self._lock:
+                self.misses += 1
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._total_bytes -= entry[0]
+            return None
+
+        # Bump the entry so LRU eviction sees it as recently used
+        try:
+            os.utime(path)
+            mtime = path.stat().st_mtime
+        except OSError:
+            mtime = 0
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries[key][1] = mtime
+        return samples, sample_rate
+
+    def put(self, key, samples, sample_rate):
+        """Store samples under key, evicting old entries if over the size limit"""
+        path = self._path(key)
+        tmp_path = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(exist_ok=True)
+            sf.write(str(tmp_path), samples, sample_rate, format="WAV", subtype="FLOAT")
+            os.replace(tmp_path, path)
+            stat = path.stat()
+        except (OSError, sf.SoundFileError):
+            # The cache is an optimization; never fail synthesis because of it
+            # (libsndfile reports e.g. a full disk as its own error)
+            try:
+                tmp_path.unlink(missing_ok=True)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._total_bytes -= previous[0]
+            self._entries[key] = [stat.st_size, stat.st_mtime]
+            self._total_bytes += stat.st_size
+            self._evict()
+
+    def _evict(self):
+        """Remove least recently used entries until under the size limit"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            del self._entries[key]
+            self._total_bytes -= size
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                try:
+                    self._path(key).unlink()
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._total_bytes = 0
@@ -0,0 +1,93 @@
+"""
+Text splitting helpers for chunked Kokoro TTS synthesis
+"""
+
+import re
+
+# Default upper bound for a single chunk. Kokoro works on at most 510 phonemes
+# per inference, so chunks are kept comfortably below that.
+DEFAULT_MAX_CHARS = 300
+
+# Sentence end: terminal punctuation (optionally followed by closing quotes or
+# brackets) and whitespace. CJK full stops do not need trailing whitespace.
+SENTENCE_END_RE = re.compile(r'(?<=[.!?…])["\'»”’)\]]*\s+|(?<=[。！？])')
+
+# Common abbreviations whose trailing period does not end a sentence
+ABBREVIATIONS = {
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'vs', 'etc', 'e.g', 'i.e',
+    'no', 'fig', 'mt', 'inc', 'ltd', 'co',
+}
+
+# Clause boundaries used to break sentences that are too long on their own
+CLAUSE_END_RE = re.compile(r'(?<=[,;:—–])\s+|(?<=[，；：、])')
+
+
+def split_sentences(text):
+    """Split text into sentences, treating line breaks as hard boundaries"""
+    sentences = []
+    for paragraph in re.split(r'\s*\n\s*', text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        pending = ""
+        for sentence in SENTENCE_END_RE.split(paragraph):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            pending = f"{pending} {sentence}" if pending else sentence
+            last_word = pending.rsplit(None, 1)[-1].rstrip('.').lower()
+            if pending.endswith('.') and last_word in ABBREVIATIONS:
+                continue
+            sentences.append(pending)
+            pending = ""
+        if pending:
+            sentences.append(pending)
+    return sentences
+
+
+def _pack(parts, separator, max_chars):
+    """Greedily join parts into pieces no longer than max_chars"""
+    pieces = []
+    current = ""
+    for part in parts:
+        candidate = f"{current}{separator}{part}" if current else part
+        if current and len(candidate) > max_chars:
+            pieces.append(current)
+            current = part
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _split_long_sentence(sentence, max_chars):
+    """Break an overlong sentence at clause, then word, then character boundaries"""
+    clauses = [c.strip() for c in CLAUSE_END_RE.split(sentence) if c.strip()]
+    pieces = []
+    for piece in _pack(clauses, " ", max_chars):
+        if len(piece) <= max_chars:
+            pieces.append(piece)
+            continue
+        words = piece.split()
+        for word_piece in _pack(words, " ", max_chars):
+            # Scripts without spaces (e.g. Chinese) fall through to a hard cut
+            for start in range(0, len(word_piece), max_chars):
+                pieces.append(word_piece[start:start + max_chars])
+    return pieces
+
+
+def split_text_into_chunks(text, max_chars=DEFAULT_MAX_CHARS):
+    """Split text into synthesis chunks at sentence and clause boundaries.
+
+    Every sentence becomes its own chunk so the first chunk (and therefore the
+    first audio) is as short as possible. Sentences longer than max_chars are
+    broken at clause boundaries.
+    """
+    chunks = []
+    for sentence in split_sentences(text):
+        if len(sentence) <= max_chars:
+            chunks.append(sentence)
+        else:
+            chunks.extend(_split_long_sentence(sentence, max_chars))
+    return chunks
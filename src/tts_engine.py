@@ -0,0 +1,459 @@
+"""
+Headless Kokoro TTS synthesis engine
+
+Owns the ONNX model and exposes synchronous, batch and streaming synthesis
+without any GUI dependency, so it can run on machines without a display
+(workers, benchmarks, servers) as well as behind the Tkinter app.
+"""
+
+import hashlib
+import importlib.util
+import os
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from text_splitter import split_text_into_chunks, DEFAULT_MAX_CHARS
+from synthesis_cache import SynthesisCache, DEFAULT_MAX_BYTES, file_digest
+from engine_config import SessionConfig
+from model_variants import select_variant, VARIANTS
+from voice_catalog import voice_language
+from voice_store import load_voices
+from phoneme_stage import Phonemizer
+from audio_encoder import OutputSettings, EncoderStage
+import pipeline_metrics
+
+# kokoro_onnx (and onnxruntime behind it) is slow to import, so only check
+# that it is installed here and import it when the model is loaded
+KOKORO_AVAILABLE = importlib.util.find_spec("kokoro_onnx") is not None
+
+MODEL_FILENAME = "kokoro-v1.0.onnx"
+VOICES_FILENAME = "voices-v1.0.bin"
+SAMPLE_RATE = 24000
+
+
+class EngineError(Exception):
+    """Raised when the synthesis engine cannot be initialized or used"""
+
+
+class ModelNotFoundError(EngineError):
+    """Raised when the model or voices file is missing"""
+
+    def __init__(self, kind, path):
+        self.kind = kind
+        self.path = Path(path)
+        super().__init__(f"{kind} file not found at: {path}\n"
+                         f"Download it with: python scripts/download_model.py "
+                         f"--models-dir {self.path.parent}")
+
+
+def to_pcm16(samples):
+    """Float samples in [-1, 1] to 16-bit PCM"""
+    with pipeline_metrics.stage("postprocess"):
+        return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def wav_header(sample_rate, data_bytes=0xFFFFFFFF, channels=1):
+    """16-bit PCM WAV header; the default length means "unknown" (streaming)"""
+    block_align = channels * 2
+    riff_size = min(0xFFFFFFFF, data_bytes + 36)
+    return (b"RIFF" + struct.pack("<I", riff_size) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate,
+                                    sample_rate * block_align, block_align, 16)
+            + b"data" + struct.pack("<I", data_bytes))
+
+
+def get_project_root():
+    """Project root when running from source"""
+    return Path(__file__).parent.parent
+
+
+def get_models_dir():
+    """Directory holding the model files - handles both development and packaged versions"""
+    if hasattr(sys, '_MEIPASS'):
+        # Running as PyInstaller executable
+        return Path(sys._MEIPASS)
+    return get_project_root() / "models"
+
+
+def resolve_model_paths(models_dir=None, variant=None):
+    """Return (model_file, voices_file) paths.
+
+    variant is a model variant name or policy (see model_variants); by default
+    it comes from KOKORO_MODEL_VARIANT / kokoro_config.json, else fp32.
+    """
+    models_dir = Path(models_dir) if models_dir else get_models_dir()
+    _, model_file = select_variant(models_dir, variant)
+    return model_file, models_dir / VOICES_FILENAME
+
+
+def get_output_dir(kind="audio_output"):
+    """Output directory for generated files, created on demand"""
+    if hasattr(sys, '_MEIPASS'):
+        # Running as executable - use current working directory
+        output_dir = Path.cwd() / kind
+    else:
+        # Running from source - use project structure
+        output_dir = get_project_root() / "output" / kind
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return output_dir
+
+
+class KokoroEngine:
+    """Kokoro TTS model wrapper with sync, batch and streaming synthesis"""
+
+    def __init__(self, model_file=None, voices_file=None, session_config=None):
+        default_model, default_voices = resolve_model_paths()
+        self.model_file = Path(model_file) if model_file else default_model
+        self.voices_file = Path(voices_file) if voices_file else default_voices
+        # ONNX Runtime settings from kokoro_config.json / environment by default
+        self.session_config = session_config or SessionConfig.load()
+        self.model_variant = next((name for name, filename in VARIANTS.items()
+                                   if filename == self.model_file.name), "custom")
+        self.kokoro = None
+        self.phonemizer = None
+        self.cache = None
+        # Pre-synthesized chunks of text still being edited (speculative.SpeculativeStore)
+        self.speculative = None
+        self._model_version = None
+        # Cache identity of voices whose contents can change (blends)
+        self.voice_keys = {}
+        # Seconds spent in each loading step (imports, ONNX session, voices, tokenizer)
+        self.load_timings = {}
+        # Time spent in the model itself (phonemization is counted by the phonemizer)
+        self.inference_seconds = 0.0
+        self.model_calls = 0
+        # Length buckets run by synthesize_batch and how far their lengths spread
+        self.buckets = 0
+        self.bucket_segments = 0
+        self.length_spread = 0.0
+        self._stats_lock = threading.Lock()
+        self._bucket_pool = None
+
+    @property
+    def is_loaded(self):
+        return self.kokoro is not None
+
+    def load(self):
+        """Load the ONNX model and voices (no-op if already loaded)"""
+        if self.kokoro is not None:
+            return self
+        if not KOKORO_AVAILABLE:
+            raise EngineError("Kokoro ONNX library not found. Please install it with:\n"
+                              "pip install kokoro-onnx")
+        if not self.model_file.exists():
+            raise ModelNotFoundError("Model", self.model_file)
+        if not self.voices_file.exists():
+            raise ModelNotFoundError("Voices", self.voices_file)
+
+        timings = {}
+        step_start = time.perf_counter()
+        import onnxruntime as ort
+        from kokoro_onnx import Kokoro
+        timings["imports"] = time.perf_counter() - step_start
+
+        # Build the session ourselves (instead of Kokoro(...)) so each step
+        # can be timed separately
+        step_start = time.perf_counter()
+        providers = ["CPUExecutionProvider"]
+        if os.getenv("ONNX_PROVIDER"):
+            providers = [os.getenv("ONNX_PROVIDER")]
+        session = ort.InferenceSession(str(self.model_file),
+                                       sess_options=self.session_config.build_session_options(),
+                                       providers=providers)
+        timings["onnx_session"] = time.perf_counter() - step_start
+
+        # Map the voice store (converted from the archive on first use) so
+        # every process on the host shares one copy of the voices
+        step_start = time.perf_counter()
+        voices = load_voices(self.voices_file)
+        # Blends were computed when they were created; map them, don't mix them
+        from voice_blends import register_blends
+        blends = register_blends(self.voices_file.parent)
+        if blends is not None:
+            voices.update(blends.voices())
+            self.voice_keys = blends.cache_keys()
+        timings["voices_load"] = time.perf_counter() - step_start
+
+        step_start = time.perf_counter()
+        kokoro = Kokoro.from_session(session, str(self.voices_file))
+        kokoro.voices = voices
+        self.phonemizer = Phonemizer(kokoro.tokenizer)
+        timings["tokenizer_init"] = time.perf_counter() - step_start
+
+        self.load_timings = timings
+        self.kokoro = kokoro
+        return self
+
+    def enable_cache(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        """Cache synthesized audio on disk, keyed by text, voice, speed and model digest"""
+        cache_dir = Path(cache_dir) if cache_dir else get_output_dir("cache")
+        self.cache = SynthesisCache.for_model(cache_dir, self.model_file, self.voices_file,
+                                              max_bytes)
+        return self.cache
+
+    def model_version(self):
+        """Short digest identifying the model and voices files"""
+        if self._model_version is None:
+            memo_dir = get_output_dir("cache")
+            digests = ":".join(file_digest(path, memo_dir)
+                               for path in (self.model_file, self.voices_file))
+            self._model_version = hashlib.sha256(digests.encode("ascii")).hexdigest()[:16]
+        return self._model_version
+
+    def _require_model(self):
+        if self.kokoro is None:
+            self.load()
+        return self.kokoro
+
+    def has_voice(self, voice):
+        """Whether voice is a known stock or blended voice"""
+        return voice in self._require_model().voices
+
+    def voice_key(self, voice):
+        """Voice identity for cache keys and checkpoints"""
+        return self.voice_keys.get(voice, voice)
+
+    def phonemize(self, text, voice):
+        """Phonemes of text in the voice's language (cached per sentence)"""
+        self._require_model()
+        return self.phonemizer.phonemize(text, voice_language(voice))
+
+    def stage_stats(self):
+        """Time spent per pipeline stage since the model was loaded"""
+        stats = {"inference_seconds": round(self.inference_seconds, 4),
+                 "model_calls": self.model_calls}
+        if self.buckets:
+            stats.update(buckets=self.buckets,
+                         mean_bucket_size=round(self.bucket_segments / self.buckets, 2),
+                         length_spread=round(self.length_spread / self.buckets, 4))
+        if self.phonemizer is not None:
+            stats.update(self.phonemizer.stats())
+        return stats
+
+    def _model_call(self, text, voice, speed, phonemes=None):
+        """Run the model on phonemes (prefetched by the caller, or phonemized now)"""
+        kokoro = self._require_model()
+        phonemes = phonemes() if phonemes is not None else self.phonemize(text, voice)
+        start = time.perf_counter()
+        result = kokoro.create(phonemes, voice=voice, speed=speed, is_phonemes=True)
+        elapsed = time.perf_counter() - start
+        pipeline_metrics.record_stage("inference", elapsed)
+        with self._stats_lock:
+            self.inference_seconds += elapsed
+            self.model_calls += 1
+        return result
+
+    def _create(self, text, voice, speed, phonemes=None):
+        """Single model call, served from the cache when possible.
+
+        phonemes is an optional callable returning the prefetched phonemes;
+        it is only called when the audio is not cached.
+        """
+        if self.speculative is not None:
+            prepared = self.speculative.get(text, voice, speed)
+            if prepared is not None:
+                # Used audio is cached like any other synthesis
+                if self.cache is not None:
+                    self.cache.put(self.cache.key(text, self.voice_key(voice), speed), *prepared)
+                return prepared
+        if self.cache is None:
+            return self._model_call(text, voice, speed, phonemes)
+        key = self.cache.key(text, self.voice_key(voice), speed)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        samples, sample_rate = self._model_call(text, voice, speed, phonemes)
+        self.cache.put(key, samples, sample_rate)
+        return samples, sample_rate
+
+    def presynthesize(self, text, voice, speed=1.0):
+        """Audio for one chunk ahead of time, bypassing the cache (None if already cached)"""
+        if self.cache is not None and self.cache.key(text, self.voice_key(voice), speed) in self.cache:
+            return None
+        return self._model_call(text, voice, speed)
+
+    def synthesize(self, text, voice, speed=1.0):
+        """Synthesize the whole text, returns (samples, sample_rate)"""
+        if self.cache is None:
+            return self._model_call(text, voice, speed)
+
+        # Whole-document entry first, then per-sentence entries so an edited
+        # document only re-synthesizes the sentences that changed
+        key = self.cache.key(text, self.voice_key(voice), speed)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        parts = list(self.synthesize_stream(text, voice, speed))
+        if not parts:
+            raise EngineError("No text to synthesize")
+        samples = np.concatenate([part for part, _ in parts])
+        sample_rate = parts[0][1]
+        self.cache.put(key, samples, sample_rate)
+        return samples, sample_rate
+
+    def synthesize_stream(self, text, voice, speed=1.0, max_chars=DEFAULT_MAX_CHARS):
+        """Yield (samples, sample_rate) chunk by chunk at sentence/clause boundaries.
+
+        The chunks that are not in the audio cache (or pre-synthesized) are
+        phonemized on a background thread ahead of the one being synthesized.
+        """
+        with pipeline_metrics.stage("text_prep"):
+            chunks = split_text_into_chunks(text, max_chars)
+        if not chunks:
+            return
+        self._require_model()
+        pending = list(range(len(chunks)))
+        if self.cache is not None:
+            voice_key = self.voice_key(voice)
+            pending = [index for index in pending
+                       if self.cache.key(chunks[index], voice_key, speed) not in self.cache]
+        if self.speculative is not None:
+            pending = [index for index in pending
+                       if not self.speculative.has(chunks[index], voice, speed)]
+        positions = {index: position for position, index in enumerate(pending)}
+        with self.phonemizer.prefetch([chunks[index] for index in pending],
+                                      voice_language(voice)) as ahead:
+            for index, chunk in enumerate(chunks):
+                position = positions.get(index)
+                fetch = partial(ahead.get, position) if position is not None else None
+                result = self._create(chunk, voice, speed, fetch)
+                if position is not None:
+                    ahead.skip(position)
+                yield result
+
+    def synthesize_batch(self, requests):
+        """Synthesize several (text, voice, speed) requests, returns results in order.
+
+        The sentences of all requests that are not in the audio cache are
+        phonemized, sorted by phoneme length and grouped into buckets of up
+        to batch_size sentences of similar length (session config). The
+        Kokoro export has a fixed batch dimension of 1, so a bucket runs as
+        concurrent session runs sharing the intra-op thread pool, not as one
+        padded tensor; keeping the lengths close keeps those runs finishing
+        together. The audio is reassembled in request order.
+        """
+        batch_size = self.session_config.batch_size
+        if batch_size <= 1 or not requests:
+            return [self.synthesize(text, voice, speed) for text, voice, speed in requests]
+        self._require_model()
+
+        results = [None] * len(requests)
+        parts = {}
+        segments = []
+        for index, (text, voice, speed) in enumerate(requests):
+            if self.cache is not None:
+                results[index] = self.cache.get(self.cache.key(text, self.voice_key(voice), speed))
+                if results[index] is not None:
+                    continue
+            with pipeline_metrics.stage("text_prep"):
+                chunks = split_text_into_chunks(text)
+            if not chunks:
+                raise EngineError("No text to synthesize")
+            parts[index] = [None] * len(chunks)
+            for position, chunk in enumerate(chunks):
+                # Cached sentences need neither phonemes nor a bucket slot
+                if self.cache is not None:
+                    cached = self.cache.get(self.cache.key(chunk, self.voice_key(voice), speed))
+                    if cached is not None:
+                        parts[index][position] = cached
+                        continue
+                segments.append((index, position, chunk, voice, speed,
+                                 self.phonemize(chunk, voice)))
+
+        @pipeline_metrics.bind
+        def run(segment):
+            index, position, chunk, voice, speed, phonemes = segment
+            parts[index][position] = self._create(chunk, voice, speed, lambda: phonemes)
+
+        if self._bucket_pool is None:
+            self._bucket_pool = ThreadPoolExecutor(max_workers=batch_size,
+                                                   thread_name_prefix="synthesis-bucket")
+        for bucket in self._length_buckets(segments):
+            list(self._bucket_pool.map(run, bucket))
+
+        for index, chunk_results in parts.items():
+            samples = np.concatenate([samples for samples, _ in chunk_results])
+            results[index] = (samples, chunk_results[0][1])
+            if self.cache is not None:
+                text, voice, speed = requests[index]
+                self.cache.put(self.cache.key(text, self.voice_key(voice), speed), *results[index])
+        return results
+
+    def _length_buckets(self, segments):
+        """Split segments into buckets of similar phoneme length"""
+        batch_size = self.session_config.batch_size
+        max_length = 1.0 + self.session_config.batch_length_spread
+        bucket = []
+        for segment in sorted(segments, key=lambda segment: len(segment[-1])):
+            if bucket and (len(bucket) >= batch_size
+                           or len(segment[-1]) > len(bucket[0][-1]) * max_length):
+                self._record_bucket(bucket)
+                yield bucket
+                bucket = []
+            bucket.append(segment)
+        if bucket:
+            self._record_bucket(bucket)
+            yield bucket
+
+    def _record_bucket(self, bucket):
+        lengths = [max(1, len(segment[-1])) for segment in bucket]
+        with self._stats_lock:
+            self.buckets += 1
+            self.bucket_segments += len(bucket)
+            # How much longer the longest sentence is than the shortest
+            self.length_spread += max(lengths) / min(lengths) - 1.0
+
+    def synthesize_to_file(self, text, path, voice, speed=1.0, output_settings=None):
+        """Stream synthesis straight into an audio file.
+
+        The format follows the file extension (wav, flac, ogg, mp3); sample
+        rate and bitrate come from output_settings. Encoding runs on a separate
+        thread while the next chunk is synthesized. Returns a dict with the
+        output path, audio duration and wall time.
+        """
+        start_time = time.time()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        settings = (output_settings or OutputSettings()).for_path(path)
+        encoder = None
+        try:
+            for samples, sample_rate in self.synthesize_stream(text, voice, speed):
+                if encoder is None:
+                    encoder = EncoderStage(path, settings, sample_rate)
+                encoder.put(samples)
+        except BaseException:
+            # The synthesis error is the cause; an encoder failing on top of it must not hide it
+            if encoder is not None:
+                try:
+                    encoder.close()
+                except Exception:
+                    pass
+            raise
+        if encoder is None:
+            raise EngineError("No text to synthesize")
+        audio_seconds = encoder.close()
+        return {
+            "path": str(path),
+            "sample_rate": encoder.sample_rate,
+            "audio_seconds": audio_seconds,
+            "generation_seconds": time.time() - start_time,
+        }
+
+    @staticmethod
+    def write_audio(path, samples, sample_rate):
+        """Write samples to an audio file"""
+        sf.write(str(path), np.asarray(samples), sample_rate)
+        return str(path)
+
+    def new_output_path(self, prefix="kokoro_generated", extension=".wav"):
+        """Timestamped path in the audio output directory"""
+        timestamp = int(time.time())
+        return get_output_dir("audio_output") / f"{prefix}_{timestamp}{extension}"
@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+"""
+Local HTTP synthesis server for Kokoro TTS
+
+Keeps one or more engines warm and serves synthesis requests over HTTP.
+Requests go through a bounded queue: when it is full the server answers
+503 instead of piling up threads (backpressure). Short requests waiting in
+the queue are coalesced into micro-batches and handed to the engine together.
+
+Endpoints:
+    POST /synthesize   JSON {"text", "voice", "speed", "stream"} -> audio/wav
+                       ("stream": true returns a chunked WAV, sentence by sentence;
+                       optional "format" (wav, flac, ogg, mp3), "sample_rate" and
+                       "bitrate" select a compressed response when not streaming;
+                       "trim_silence", "max_pause" and "loudness" post-process it)
+    GET  /metrics      Queue depth, request counters, latency percentiles and
+                       per-stage pipeline time (JSON)
+    GET  /metrics/prometheus
+                       The same counters in the Prometheus text format
+    GET  /health       Liveness check
+
+Usage:
+    python run.py serve --port 8880 --engines 2
+"""
+
+import argparse
+import io
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import soundfile as sf
+
+from tts_engine import (KokoroEngine, EngineError, resolve_model_paths, to_pcm16,
+                        wav_header)
+from synthesis_cache import DEFAULT_MAX_BYTES
+from model_variants import VARIANT_POLICIES
+from engine_config import add_session_arguments, session_config_from_args
+from audio_encoder import OutputSettings, CONTENT_TYPES, encode_bytes
+import pipeline_metrics
+import profiling
+
+DEFAULT_VOICE = "af_bella"
+
+
+class QueueFullError(Exception):
+    """Raised when the request queue is full"""
+
+
+class SynthesisRequest:
+    """A queued synthesis request and its result"""
+
+    def __init__(self, text, voice=DEFAULT_VOICE, speed=1.0, stream=False):
+        self.text = text
+        self.voice = voice
+        self.speed = speed
+        self.stream = stream
+        # Streaming requests receive (samples, sample_rate) chunks, then None
+        self.chunks = queue.Queue() if stream else None
+        self.done = threading.Event()
+        self.samples = None
+        self.sample_rate = None
+        self.error = None
+        self.enqueued_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+        # Synthesis (worker thread) and encoding/sending (handler thread)
+        self.trace = pipeline_metrics.start_job("stream" if stream else "request",
+                                                voice=voice, chars=len(text))
+
+    def finish(self, samples=None, sample_rate=None, error=None):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.error = error
+        self.finished_at = time.perf_counter()
+        if self.chunks is not None:
+            self.chunks.put(error)
+            self.chunks.put(None)
+        self.done.set()
+
+    @property
+    def queue_seconds(self):
+        return (self.started_at or self.enqueued_at) - self.enqueued_at
+
+    @property
+    def latency_seconds(self):
+        return (self.finished_at or time.perf_counter()) - self.enqueued_at
+
+
+class ServiceMetrics:
+    """Thread-safe counters and recent latencies"""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.audio_seconds = 0.0
+        self.latencies = deque(maxlen=window)
+        self.queue_waits = deque(maxlen=window)
+
+    def record(self, request, audio_seconds=0.0):
+        with self._lock:
+            if request.error is None:
+                self.completed += 1
+                self.audio_seconds += audio_seconds
+            else:
+                self.failed += 1
+            self.latencies.append(request.latency_seconds)
+            self.queue_waits.append(request.queue_seconds)
+
+    def record_batch(self, size):
+        with self._lock:
+            self.batches += 1
+            self.batched_requests += size
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @staticmethod
+    def _percentiles(values):
+        if not values:
+            return {"p50_ms": None, "p95_ms": None, "max_ms": None}
+        data = np.asarray(values) * 1000
+        return {
+            "p50_ms": round(float(np.percentile(data, 50)), 1),
+            "p95_ms": round(float(np.percentile(data, 95)), 1),
+            "max_ms": round(float(data.max()), 1),
+        }
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "failed": self.failed,
+                "batches": self.batches,
+                "mean_batch_size": (round(self.batched_requests / self.batches, 2)
+                                    if self.batches else None),
+                "audio_seconds": round(self.audio_seconds, 2),
+                "latency": self._percentiles(list(self.latencies)),
+                "queue_wait": self._percentiles(list(self.queue_waits)),
+            }
+
+
+class SynthesisService:
+    """Bounded request queue served by warm engines with micro-batching"""
+
+    def __init__(self, model_file=None, voices_file=None, engines=1, queue_size=64,
+                 max_batch=8, batch_window=0.02, short_chars=200, cache_dir=None,
+                 cache_bytes=DEFAULT_MAX_BYTES, session_config=None):
+        self.model_file = model_file
+        self.voices_file = voices_file
+        self.num_engines = engines
+        self.requests = queue.Queue(maxsize=queue_size)
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.short_chars = short_chars
+        self.cache_dir = cache_dir
+        self.cache_bytes = cache_bytes
+        self.session_config = session_config
+        self.metrics = ServiceMetrics()
+        self._stopping = threading.Event()
+        self._workers = []
+        self._engines = []
+
+    def start(self):
+        """Load the engines and start one worker thread per engine"""
+        for index in range(self.num_engines):
+            engine = KokoroEngine(self.model_file, self.voices_file, self.session_config).load()
+            if self.cache_dir:
+                engine.enable_cache(self.cache_dir, self.cache_bytes)
+            self._engines.append(engine)
+            worker = threading.Thread(target=self._worker_loop, args=(engine,),
+                                      name=f"synthesis-worker-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        for worker in self._workers:
+            worker.join(timeout=5)
+
+    def has_voice(self, voice):
+        """Whether the engines can synthesize with voice (stock or blended)"""
+        return bool(self._engines) and self._engines[0].has_voice(voice)
+
+    @property
+    def queue_depth(self):
+        return self.requests.qsize()
+
+    def submit(self, request):
+        """Queue a request, raises QueueFullError when there is no capacity"""
+        try:
+            self.requests.put_nowait(request)
+        except queue.Full:
+            self.metrics.count("rejected")
+            raise QueueFullError(f"Queue is full ({self.requests.maxsize} requests)")
+        self.metrics.count("accepted")
+        return request
+
+    def _is_batchable(self, request):
+        return not request.stream and len(request.text) <= self.short_chars
+
+    def _collect_batch(self, first):
+        """Coalesce short requests that arrive within the batch window"""
+        batch, deferred = [first], []
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if self._is_batchable(request):
+                batch.append(request)
+            else:
+                deferred.append(request)
+        return batch, deferred
+
+    def _worker_loop(self, engine):
+        while not self._stopping.is_set():
+            try:
+                request = self.requests.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            if self._is_batchable(request):
+                batch, deferred = self._collect_batch(request)
+                self._run_batch(engine, batch)
+            else:
+                deferred = [request]
+            for request in deferred:
+                self._run_single(engine, request)
+
+    def _run_batch(self, engine, batch):
+        started = time.perf_counter()
+        for request in batch:
+            request.started_at = started
+        self.metrics.record_batch(len(batch))
+        # Batched requests share their stages, so the batch is traced as one job
+        trace = pipeline_metrics.start_job("batch", requests=len(batch))
+        try:
+            with pipeline_metrics.activate(trace):
+                results = engine.synthesize_batch([(r.text, r.voice, r.speed) for r in batch])
+        except Exception as e:
+            pipeline_metrics.finish_job(trace, "failed", error=str(e))
+            # Isolate the failing request instead of failing the whole batch
+            for request in batch:
+                self._run_single(engine, request)
+            return
+        for request, (samples, sample_rate) in zip(batch, results):
+            # Audio is counted once, by the requests
+            request.trace.add_audio(len(samples) / sample_rate)
+            request.trace.fields["batched"] = True
+            request.finish(samples, sample_rate)
+            self.metrics.record(request, len(samples) / sample_rate)
+        pipeline_metrics.finish_job(trace)
+
+    def _run_single(self, engine, request):
+        request.started_at = request.started_at or time.perf_counter()
+        audio_seconds = 0.0
+        try:
+            with pipeline_metrics.activate(request.trace):
+                if request.stream:
+                    for samples, sample_rate in engine.synthesize_stream(
+                            request.text, request.voice, request.speed):
+                        request.chunks.put((samples, sample_rate))
+                        audio_seconds += len(samples) / sample_rate
+                    request.finish()
+                else:
+                    samples, sample_rate = engine.synthesize(request.text, request.voice,
+                                                             request.speed)
+                    audio_seconds = len(samples) / sample_rate
+                    request.finish(samples, sample_rate)
+        except Exception as e:
+            request.finish(error=e)
+        request.trace.add_audio(audio_seconds)
+        self.metrics.record(request, audio_seconds)
+
+    def metrics_snapshot(self):
+        snapshot = self.metrics.snapshot()
+        snapshot["queue_depth"] = self.queue_depth
+        snapshot["queue_capacity"] = self.requests.maxsize
+        snapshot["engines"] = self.num_engines
+        # Phonemization and inference time summed over the engines
+        stages = {}
+        for engine in self._engines:
+            for name, value in engine.stage_stats().items():
+                stages[name] = stages.get(name, 0) + value
+        snapshot["stages"] = {name: round(value, 4) for name, value in stages.items()}
+        snapshot["pipeline"] = pipeline_metrics.METRICS.snapshot()
+        return snapshot
+
+    def prometheus_metrics(self):
+        """Pipeline totals plus the service counters in the Prometheus text format"""
+        snapshot = self.metrics.snapshot()
+        extra = [(f"requests_{name}_total", f"Requests {name}", "counter", snapshot[name])
+                 for name in ("accepted", "rejected", "completed", "failed")]
+        extra += [
+            ("queue_depth", "Requests waiting in the queue", "gauge", self.queue_depth),
+            ("queue_capacity", "Maximum queued requests", "gauge", self.requests.maxsize),
+            ("engines", "Warm model instances", "gauge", self.num_engines),
+        ]
+        return pipeline_metrics.METRICS.render_prometheus(extra)
+
+
+def wav_bytes(samples, sample_rate):
+    """Encode samples as a complete 16-bit WAV file"""
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, sample_rate, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def streaming_wav_header(sample_rate, channels=1):
+    """WAV header with unknown (maximum) length for chunked streaming"""
+    return wav_header(sample_rate, channels=channels)
+
+
+def pcm16_bytes(samples):
+    return to_pcm16(samples).astype("<i2", copy=False).tobytes()
+
+
+class SynthesisHandler(BaseHTTPRequestHandler):
+    """HTTP front end of a SynthesisService"""
+
+    # HTTP/1.1 is required for chunked transfer encoding
+    protocol_version = "HTTP/1.1"
+    service = None
+    request_timeout = 300
+
+    def log_message(self, format, *args):
+        # Keep stdout for startup/errors only
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._send_json(200, self.service.metrics_snapshot())
+        elif self.path == "/metrics/prometheus":
+            body = self.service.prometheus_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/synthesize":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            text = str(payload["text"]).strip()
+            speed = float(payload.get("speed", 1.0))
+            output_settings = OutputSettings.from_dict(
+                {name: payload.get(name) for name in OutputSettings.FIELDS})
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"Invalid request: {e}"})
+            return
+        if not text:
+            self._send_json(400, {"error": "Empty text"})
+            return
+        if not 0.5 <= speed <= 2.0:
+            self._send_json(400, {"error": "Speed should be between 0.5 and 2.0"})
+            return
+        if payload.get("stream") and output_settings.to_dict() != OutputSettings().to_dict():
+            self._send_json(400, {"error": "Streaming responses are 24 kHz WAV only"})
+            return
+
+        voice = str(payload.get("voice", DEFAULT_VOICE))
+        if not self.service.has_voice(voice):
+            self._send_json(400, {"error": f"Unknown voice: {voice}"})
+            return
+
+        request = SynthesisRequest(text, voice, speed, stream=bool(payload.get("stream", False)))
+        try:
+            self.service.submit(request)
+        except QueueFullError as e:
+            self._send_json(503, {"error": str(e)}, {"Retry-After": "1"})
+            return
+
+        # Encoding and sending count towards the request's trace
+        with pipeline_metrics.activate(request.trace):
+            if request.stream:
+                status = self._send_stream(request)
+            else:
+                status = self._send_full(request, output_settings)
+        pipeline_metrics.finish_job(request.trace, status,
+                                    wall_seconds=time.perf_counter() - request.enqueued_at)
+
+    def _send_full(self, request, output_settings):
+        """Send the finished audio, returns the trace status"""
+        if not request.done.wait(self.request_timeout):
+            self._send_json(504, {"error": "Synthesis timed out"})
+            return "timeout"
+        if request.error is not None:
+            self._send_json(500, {"error": str(request.error)})
+            return "failed"
+        with pipeline_metrics.stage("encode"):
+            if (output_settings.format == "wav" and not output_settings.sample_rate
+                    and not output_settings.processing):
+                body = wav_bytes(request.samples, request.sample_rate)
+            else:
+                body = encode_bytes(request.samples, request.sample_rate, output_settings)
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[output_settings.format])
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Queue-Wait-Ms", f"{request.queue_seconds * 1000:.1f}")
+        self.send_header("X-Latency-Ms", f"{request.latency_seconds * 1000:.1f}")
+        self.end_headers()
+        self._write_body(body)
+        return "ok"
+
+    def _write_body(self, data):
+        with pipeline_metrics.stage("file_io"):
+            self.wfile.write(data)
+        pipeline_metrics.add_bytes(len(data))
+
+    def _write_chunk(self, data):
+        self._write_body(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_stream(self, request):
+        """Send chunks as they are synthesized, returns the trace status"""
+        try:
+            first = request.chunks.get(timeout=self.request_timeout)
+        except queue.Empty:
+            self._send_json(504, {"error": "Synthesis timed out"})
+            return "timeout"
+        if isinstance(first, Exception) or first is None:
+            self._send_json(500, {"error": str(first or "No audio produced")})
+            return "failed"
+
+        samples, sample_rate = first
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("X-Queue-Wait-Ms", f"{request.queue_seconds * 1000:.1f}")
+        self.end_headers()
+        self._write_chunk(streaming_wav_header(sample_rate) + pcm16_bytes(samples))
+        while True:
+            try:
+                item = request.chunks.get(timeout=self.request_timeout)
+            except queue.Empty:
+                # Headers are already sent; end the stream early
+                self.wfile.write(b"0\r\n\r\n")
+                return "timeout"
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                # Headers are already sent; end the stream early
+                self.wfile.write(b"0\r\n\r\n")
+                return "failed"
+            self._write_chunk(pcm16_bytes(item[0]))
+        self.wfile.write(b"0\r\n\r\n")
+        return "ok"
+
+
+def create_server(service, host="127.0.0.1", port=8880):
+    """HTTP server bound to a running service (port 0 picks a free port)"""
+    handler = type("BoundSynthesisHandler", (SynthesisHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="run.py serve",
+                                     description="Serve Kokoro TTS over HTTP")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8880, help="Port to listen on")
+    parser.add_argument("--engines", type=int, default=1,
+                        help="Number of warm model instances (worker threads)")
+    parser.add_argument("--queue-size", type=int, default=64,
+                        help="Maximum queued requests before answering 503")
+    parser.add_argument("--max-batch", type=int, default=8,
+                        help="Maximum short requests coalesced into one batch")
+    parser.add_argument("--batch-window-ms", type=float, default=20,
+                        help="How long to wait for more short requests to batch")
+    parser.add_argument("--cache-dir", help="Enable the on-disk synthesis cache in this directory")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Synthesis cache size limit in MB")
+    parser.add_argument("--models-dir", help="Directory with kokoro-v1.0.onnx and voices-v1.0.bin")
+    parser.add_argument("--model-variant", choices=VARIANT_POLICIES,
+                        help="Model variant or selection policy (default: fp32)")
+    add_session_arguments(parser)
+    pipeline_metrics.add_metrics_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    pipeline_metrics.configure_from_args(args)
+    model_file, voices_file = resolve_model_paths(args.models_dir, args.model_variant)
+
+    print(f"🔄 Loading {args.engines} engine(s)...")
+    service = SynthesisService(model_file, voices_file, engines=args.engines,
+                               queue_size=args.queue_size, max_batch=args.max_batch,
+                               batch_window=args.batch_window_ms / 1000,
+                               cache_dir=args.cache_dir,
+                               cache_bytes=args.cache_size_mb * 1024 * 1024,
+                               session_config=session_config_from_args(args))
+    # Started before the engine threads so cprofile sees them; covers the
+    # whole serving session (requests mix voices and speeds)
+    with profiling.profile_run(args, "serve"):
+        try:
+            service.start()
+        except EngineError as e:
+            print(f"❌ {e}")
+            return False
+
+        server = create_server(service, args.host, args.port)
+        print(f"✅ Kokoro TTS server listening on http://{args.host}:{server.server_port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n🛑 Shutting down...")
+        finally:
+            server.server_close()
+            service.stop()
+            pipeline_metrics.write_metrics_file(args)
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Voice blends: weighted mixes of the stock voices
+
+A blend such as 60% af_bella + 40% af_sky is computed once when it is
+created and stored next to the stock voices:
+
+    models/voice_blends.<digest>.npy   style vectors of every blend, one row each
+    models/voice_blends.json           the current .npy file; name -> row,
+                                       components, language
+
+The engine memory-maps the .npy file when it loads, so blends cost no vector
+math per request and no extra memory until a row is used. Every change writes
+a new .npy file and then switches the index over, because a mapped file can't
+be replaced on Windows while an engine (the GUI, a server) still uses it;
+files nobody maps any more are removed on a later change. Blend names work
+anywhere a voice id is accepted (GUI, batch, server, dialog scripts).
+
+Usage:
+    python run.py blend create brand_voice af_bella:60 af_sky:40
+    python run.py blend list
+    python run.py blend remove brand_voice
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from tts_engine import get_models_dir, VOICES_FILENAME
+from voice_catalog import BLENDS_GROUP, register_voices, voice_language
+
+# Vectors are stored as voice_blends.<digest>.npy (voice_blends.npy before that)
+BLENDS_FILENAME = "voice_blends.npy"
+BLENDS_INDEX_FILENAME = "voice_blends.json"
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_\-]{0,63}$")
+
+
+class BlendError(ValueError):
+    """Invalid blend definition"""
+
+
+def parse_components(specs):
+    """["af_bella:60", "af_sky:40"] -> {"af_bella": 0.6, "af_sky": 0.4} (weights normalized)"""
+    components = {}
+    for spec in specs:
+        for part in str(spec).replace("+", ",").split(","):
+            if not part.strip():
+                continue
+            voice, _, weight = part.strip().partition(":")
+            try:
+                weight = float(weight) if weight else 1.0
+            except ValueError:
+                raise BlendError(f"invalid weight in '{part.strip()}'") from None
+            if weight <= 0:
+                raise BlendError(f"weight of {voice} must be positive")
+            components[voice] = components.get(voice, 0.0) + weight
+    if not components:
+        raise BlendError("a blend needs at least one voice")
+    total = sum(components.values())
+    return {voice: weight / total for voice, weight in components.items()}
+
+
+def describe_components(components):
+    return " + ".join(f"{round(weight * 100)}% {voice}" for voice, weight in components.items())
+
+
+class BlendIndex:
+    """The blend vectors and their JSON index in a models directory"""
+
+    def __init__(self, models_dir=None):
+        self.models_dir = Path(models_dir) if models_dir else get_models_dir()
+        self.index_path = self.models_dir / BLENDS_INDEX_FILENAME
+        self.vectors_path = self.models_dir / BLENDS_FILENAME
+        self._vectors = None
+        self.blends = {}
+        if self.index_path.exists():
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.blends = data.get("blends", {})
+            self.vectors_path = self.models_dir / data.get("vectors", BLENDS_FILENAME)
+
+    def names(self):
+        return list(self.blends)
+
+    def vectors(self):
+        """All blend vectors, memory-mapped read-only"""
+        if self._vectors is None and self.blends:
+            self._vectors = np.load(self.vectors_path, mmap_mode="r")
+        return self._vectors
+
+    def vector(self, name):
+        return self.vectors()[self.blends[name]["row"]]
+
+    def voices(self):
+        """name -> memory-mapped style vector, for the model's voice table"""
+        return {name: self.vector(name) for name in self.blends}
+
+    def cache_keys(self):
+        """name -> identity of the blend's contents (cache keys must change with the mix)"""
+        return {name: f"{name}@{blend['digest']}" for name, blend in self.blends.items()}
+
+    def register(self):
+        """Make the blends selectable in the voice catalog"""
+        register_voices(BLENDS_GROUP,
+                        {name: f"{name} ({describe_components(blend['components'])})"
+                         for name, blend in self.blends.items()},
+                        {name: blend["language"] for name, blend in self.blends.items()})
+        return self
+
+    def _write(self, vectors, blends):
+        """Write the vectors to a new file first, then the index that points to it"""
+        data = {"blends": blends}
+        vectors_path = self.models_dir / BLENDS_FILENAME
+        if vectors is not None:
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            digest = hashlib.sha256(vectors.tobytes()).hexdigest()[:16]
+            vectors_path = self.models_dir / f"voice_blends.{digest}.npy"
+            # Same contents may already be there (and mapped): never overwrite it
+            if not vectors_path.exists():
+                tmp_path = vectors_path.with_name(f"{vectors_path.stem}.{os.getpid()}.tmp.npy")
+                np.save(tmp_path, vectors)
+                os.replace(tmp_path, vectors_path)
+            data["vectors"] = vectors_path.name
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.index_path)
+        self._vectors = None
+        self.blends = blends
+        self.vectors_path = vectors_path
+        self._remove_unused(keep=vectors_path.name if vectors is not None else None)
+
+    def _remove_unused(self, keep):
+        """Delete earlier vector files; one still mapped (Windows) goes next time"""
+        for path in self.models_dir.glob("voice_blends*.npy"):
+            if path.name == keep or path.name.endswith(".tmp.npy"):
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _rows(self):
+        """Current vectors loaded into memory (for rewriting the file)"""
+        vectors = self.vectors()
+        return [] if vectors is None else [np.array(row) for row in vectors]
+
+    def add(self, name, components, voices_file=None, language=None):
+        """Compute and store a blend (replacing one with the same name)"""
+        if not _NAME_PATTERN.match(name):
+            raise BlendError("blend names use letters, digits, '_' and '-'")
+        voices_file = Path(voices_file) if voices_file else self.models_dir / VOICES_FILENAME
+        with np.load(str(voices_file)) as archive:
+            if name in archive.files:
+                raise BlendError(f"'{name}' is a stock voice")
+            missing = [voice for voice in components if voice not in archive.files]
+            if missing:
+                raise BlendError(f"unknown voice(s): {', '.join(missing)}")
+            stack = np.stack([archive[voice] for voice in components]).astype(np.float32)
+        weights = np.array(list(components.values()), dtype=np.float32)
+        vector = np.tensordot(weights, stack, axes=1).astype(np.float32)
+
+        rows = self._rows()
+        blends = dict(self.blends)
+        if name in blends:
+            rows[blends[name]["row"]] = vector
+        else:
+            rows.append(vector)
+        main_voice = max(components, key=components.get)
+        digest = hashlib.sha256(json.dumps(components, sort_keys=True).encode("utf-8"))
+        blends[name] = {
+            "row": blends[name]["row"] if name in blends else len(rows) - 1,
+            "components": components,
+            "language": language or voice_language(main_voice),
+            "digest": digest.hexdigest()[:16],
+        }
+        self._write(np.stack(rows), blends)
+        return blends[name]
+
+    def remove(self, name):
+        if name not in self.blends:
+            raise BlendError(f"no blend named '{name}'")
+        removed_row = self.blends[name]["row"]
+        rows = [row for index, row in enumerate(self._rows()) if index != removed_row]
+        blends = {}
+        for other, blend in self.blends.items():
+            if other == name:
+                continue
+            blend = dict(blend)
+            if blend["row"] > removed_row:
+                blend["row"] -= 1
+            blends[other] = blend
+        self._write(np.stack(rows) if rows else None, blends)
+
+
+def register_blends(models_dir=None):
+    """Add the blends of a models directory to the voice catalog (reads only the index)"""
+    try:
+        return BlendIndex(models_dir).register()
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Voice blends not loaded: {e}")
+        return None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="run.py blend",
+                                     description="Create and manage blended voices")
+    parser.add_argument("--models-dir", help="Directory with voices-v1.0.bin")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="Create or replace a blend")
+    create.add_argument("name", help="Blend name, used like a voice id")
+    create.add_argument("components", nargs="+",
+                        help="voice:weight pairs, e.g. af_bella:60 af_sky:40")
+    create.add_argument("--language", help="espeak-ng language (default: the main voice's)")
+    commands.add_parser("list", help="List blends")
+    remove = commands.add_parser("remove", help="Remove a blend")
+    remove.add_argument("name")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    index = BlendIndex(args.models_dir)
+    try:
+        if args.command == "create":
+            blend = index.add(args.name, parse_components(args.components),
+                              language=args.language)
+            print(f"✅ {args.name}: {describe_components(blend['components'])} "
+                  f"({blend['language']})")
+        elif args.command == "remove":
+            index.remove(args.name)
+            print(f"🗑️  Removed {args.name}")
+        else:
+            if not index.blends:
+                print("No voice blends yet (python run.py blend create NAME voice:weight ...)")
+            for name, blend in index.blends.items():
+                print(f"{name:20} {describe_components(blend['components'])} ({blend['language']})")
+    except (BlendError, OSError) as e:
+        print(f"❌ {e}")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,116 @@
+"""
+Kokoro voice catalog shared by the GUI, the engine and the tools
+"""
+
+# Available voices for different languages with readable names
+VOICES = {
+    'English (US) - Female': {
+        'af_alloy': 'Alloy (Нейтральний)',
+        'af_aoede': 'Aoede (М\'який)',
+        'af_bella': 'Bella (Теплий)',
+        'af_heart': 'Heart (Сердечний)',
+        'af_jessica': 'Jessica (Класичний)',
+        'af_kore': 'Kore (Енергійний)',
+        'af_nicole': 'Nicole (Професійний)',
+        'af_nova': 'Nova (Сучасний)',
+        'af_river': 'River (Спокійний)',
+        'af_sarah': 'Sarah (Дружелюбний)',
+        'af_sky': 'Sky (Легкий)'
+    },
+    'English (US) - Male': {
+        'am_adam': 'Adam (Впевнений)',
+        'am_echo': 'Echo (Резонансний)',
+        'am_eric': 'Eric (Дружній)',
+        'am_fenrir': 'Fenrir (Сильний)',
+        'am_liam': 'Liam (Теплий)',
+        'am_michael': 'Michael (Класичний)',
+        'am_onyx': 'Onyx (Глибокий)',
+        'am_puck': 'Puck (Жвавий)'
+    },
+    'English (GB)': {
+        'bf_alice': 'Alice (Британська)',
+        'bf_emma': 'Emma (Елегантна)',
+        'bf_isabella': 'Isabella (Витончена)',
+        'bf_lily': 'Lily (Ніжна)',
+        'bm_daniel': 'Daniel (Джентльмен)',
+        'bm_fable': 'Fable (Розповідач)',
+        'bm_george': 'George (Аристократ)',
+        'bm_lewis': 'Lewis (Формальний)'
+    },
+    'French': {
+        'ff_siwis': 'Siwis (Класична французька)'
+    },
+    'Italian': {
+        'if_sara': 'Sara (Італійська жінка)',
+        'im_nicola': 'Nicola (Італійський чоловік)'
+    },
+    'Japanese': {
+        'jf_alpha': 'Alpha (Аніме дівчина)',
+        'jf_gongitsune': 'Gongitsune (Казкова)',
+        'jf_nezumi': 'Nezumi (Миша)',
+        'jf_tebukuro': 'Tebukuro (Рукавичка)',
+        'jm_kumo': 'Kumo (Хмара)'
+    },
+    'Chinese': {
+        'zf_xiaobei': 'Xiaobei (Північна)',
+        'zf_xiaoni': 'Xiaoni (Мила)',
+        'zf_xiaoxiao': 'Xiaoxiao (Маленька)',
+        'zf_xiaoyi': 'Xiaoyi (Мала)',
+        'zm_yunjian': 'Yunjian (Хмарний меч)',
+        'zm_yunxi': 'Yunxi (Хмарний захід)',
+        'zm_yunxia': 'Yunxia (Хмарна зоря)',
+        'zm_yunyang': 'Yunyang (Хмарне сонце)'
+    }
+}
+
+# espeak-ng language used for phonemization, by the first letter of the voice id
+LANGUAGE_CODES = {
+    'a': 'en-us',
+    'b': 'en-gb',
+    'f': 'fr-fr',
+    'i': 'it',
+    'j': 'ja',
+    'z': 'cmn',
+}
+DEFAULT_LANGUAGE = 'en-us'
+
+# Group of the registered voice blends (see voice_blends)
+BLENDS_GROUP = 'Blends'
+# Languages of registered voices whose id does not start with a language letter
+VOICE_LANGUAGES = {}
+
+
+def voice_language(voice_id):
+    """espeak-ng language code for a voice id"""
+    if voice_id in VOICE_LANGUAGES:
+        return VOICE_LANGUAGES[voice_id]
+    return LANGUAGE_CODES.get(str(voice_id)[:1], DEFAULT_LANGUAGE)
+
+
+def register_voices(group, voices, languages=None):
+    """Add voices (e.g. blends) to the catalog, replacing the group's previous entries"""
+    for voice_id in VOICES.get(group, {}):
+        VOICE_LANGUAGES.pop(voice_id, None)
+    if voices:
+        VOICES[group] = dict(voices)
+    else:
+        VOICES.pop(group, None)
+    VOICE_LANGUAGES.update(languages or {})
+
+
+def all_voice_ids():
+    return [voice_id for voices in VOICES.values() for voice_id in voices]
+
+
+def find_voice(name):
+    """Voice id from a voice id or a readable name such as "Bella", or None"""
+    name = str(name).strip()
+    voice_ids = all_voice_ids()
+    if name in voice_ids:
+        return name
+    wanted = name.casefold()
+    for voices in VOICES.values():
+        for voice_id, readable in voices.items():
+            if readable.split(" (")[0].casefold() == wanted:
+                return voice_id
+    return None
@@ -0,0 +1,118 @@
+"""
+Memory-mapped voice store
+
+voices-v1.0.bin is a zipped archive that every engine has to decompress into
+its own memory. The first engine to load converts it once into
+
+    models/voices-v1.0.<stamp>.npy  all style vectors stacked in one array
+    models/voices-v1.0.index.json   the .npy file, voice id -> row, plus the
+                                    source file's size/mtime
+
+and from then on every engine maps the .npy file read-only. The pages live in
+the OS page cache and are shared by all processes on the host (batch workers,
+server engines), and startup no longer parses the archive. The array data
+starts on a 64-byte boundary (the .npy header is padded), so rows are aligned.
+
+A changed archive is converted into a new .npy file named after its
+size/mtime: on Windows a mapped file can't be replaced while other engines
+still use it. Earlier files are removed once nothing maps them.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+STORE_VERSION = 2
+
+
+class VoiceStore:
+    """The memory-mapped copy of a voices archive"""
+
+    def __init__(self, voices_file):
+        self.voices_file = Path(voices_file)
+        self.index_path = self.voices_file.with_suffix(".index.json")
+
+    def _source_stamp(self):
+        stat = self.voices_file.stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _load_index(self):
+        try:
+            index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if index.get("version") != STORE_VERSION or index.get("source") != self._source_stamp():
+            return None
+        if not (self.voices_file.parent / index["array"]).exists():
+            return None
+        return index
+
+    def _array_path(self, stamp):
+        digest = hashlib.sha256(json.dumps(stamp, sort_keys=True).encode("ascii")).hexdigest()
+        return self.voices_file.with_name(f"{self.voices_file.stem}.{digest[:12]}.npy")
+
+    def build(self):
+        """Convert the archive (array first, then the index that points into it)"""
+        stamp = self._source_stamp()
+        array_path = self._array_path(stamp)
+        with np.load(str(self.voices_file)) as archive:
+            names = list(archive.files)
+            first = archive[names[0]]
+            # Written through a memmap so the whole table is never held twice
+            tmp_array = array_path.with_name(f"{array_path.stem}.{os.getpid()}.tmp.npy")
+            table = np.lib.format.open_memmap(tmp_array, mode="w+", dtype=np.float32,
+                                              shape=(len(names),) + first.shape)
+            for row, name in enumerate(names):
+                vector = archive[name]
+                if vector.shape != first.shape:
+                    raise ValueError(f"voice {name} has shape {vector.shape}, expected {first.shape}")
+                table[row] = vector
+            table.flush()
+            del table
+        if array_path.exists():
+            # Another process converted the same archive first (and may map it)
+            os.remove(tmp_array)
+        else:
+            os.replace(tmp_array, array_path)
+
+        index = {
+            "version": STORE_VERSION,
+            "source": stamp,
+            "array": array_path.name,
+            "voices": {name: row for row, name in enumerate(names)},
+        }
+        tmp_index = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+        tmp_index.write_text(json.dumps(index), encoding="utf-8")
+        os.replace(tmp_index, self.index_path)
+        self._remove_unused(keep=array_path.name)
+        return index
+
+    def _remove_unused(self, keep):
+        """Delete arrays of earlier archives; one still mapped (Windows) goes next time"""
+        stem = self.voices_file.stem
+        for path in self.voices_file.parent.glob(f"{stem}*.npy"):
+            if path.name == keep or path.name.endswith(".tmp.npy"):
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def open(self):
+        """voice id -> read-only memory-mapped style vector (building the store if needed)"""
+        index = self._load_index() or self.build()
+        table = np.load(self.voices_file.parent / index["array"], mmap_mode="r")
+        return {name: table[row] for name, row in index["voices"].items()}
+
+
+def load_voices(voices_file):
+    """Voice table for an engine: memory-mapped, or decompressed if the store can't be written"""
+    try:
+        return VoiceStore(voices_file).open()
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Voice store unavailable ({e}), loading voices into memory")
+        with np.load(str(voices_file)) as archive:
+            return {name: archive[name] for name in archive.files}
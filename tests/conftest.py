@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+# The modules live flat in src/ and scripts/ and import each other by name;
+# run.py sits at the root
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "scripts"))
+sys.path.insert(0, str(ROOT))
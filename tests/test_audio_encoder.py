@@ -0,0 +1,102 @@
+import threading
+
+import numpy as np
+import pytest
+
+import audio_encoder
+from audio_encoder import EncoderStage, OutputSettings, encode_bytes
+from tts_engine import KokoroEngine
+
+
+def run_with_timeout(function, timeout=10):
+    """Run function on a thread; fails the test instead of hanging"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = function()
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "encoder did not return"
+    return outcome
+
+
+def tone(seconds=0.5, rate=24000):
+    t = np.arange(int(seconds * rate)) / rate
+    return (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def test_encode_bytes_wav_roundtrip():
+    data = encode_bytes(tone(), 24000, OutputSettings("wav"))
+    assert data[:4] == b"RIFF"
+
+
+def test_error_after_end_marker_does_not_hang(monkeypatch):
+    def fail(self):
+        raise OSError("disk gone")
+    monkeypatch.setattr(EncoderStage, "_output_bytes", fail)
+
+    outcome = run_with_timeout(lambda: encode_bytes(tone(), 24000, OutputSettings("wav")))
+    assert isinstance(outcome.get("error"), OSError)
+
+
+def test_error_while_encoding_still_drains_producers(monkeypatch, tmp_path):
+    def fail(self, writer, samples):
+        raise OSError("write failed")
+    monkeypatch.setattr(EncoderStage, "_write", fail)
+
+    def produce():
+        stage = EncoderStage(tmp_path / "out.wav", OutputSettings("wav"), 24000, queue_size=1)
+        # More chunks than the queue holds: put() must not block on the dead encoder
+        for _ in range(5):
+            try:
+                stage.put(tone(0.05))
+            except OSError:
+                pass
+        stage.close()
+
+    outcome = run_with_timeout(produce)
+    assert isinstance(outcome.get("error"), OSError)
+
+
+def test_failing_postprocessing_flush_does_not_hang(monkeypatch):
+    def fail(self):
+        raise RuntimeError("flush failed")
+    monkeypatch.setattr(audio_encoder.ProcessingChain, "flush", fail)
+    settings = OutputSettings("wav", trim_silence=True, loudness=-18)
+
+    outcome = run_with_timeout(lambda: encode_bytes(tone(), 24000, settings))
+    assert isinstance(outcome.get("error"), RuntimeError)
+
+
+def test_synthesis_error_is_not_hidden_by_the_encoder(tmp_path, monkeypatch):
+    def stream(text, voice, speed=1.0):
+        yield tone(), 24000
+        raise RuntimeError("model failed")
+
+    def fail(self):
+        raise OSError("encoder failed too")
+
+    monkeypatch.setattr(EncoderStage, "_output_bytes", fail)
+    engine = KokoroEngine()
+    engine.synthesize_stream = stream
+    with pytest.raises(RuntimeError, match="model failed"):
+        engine.synthesize_to_file("Hello.", tmp_path / "out.wav", "af_bella")
+
+
+def test_postprocessing_does_not_depend_on_chunking():
+    settings = OutputSettings("wav", sample_rate=16000, trim_silence=True, max_pause=0.2)
+    audio = np.concatenate([np.zeros(6000, np.float32), tone(0.3),
+                            np.zeros(24000, np.float32), tone(0.3), np.zeros(6000, np.float32)])
+    whole = settings.processor(24000)
+    expected = np.concatenate([whole.process(audio), whole.flush()])
+    chunked = settings.processor(24000)
+    parts = [chunked.process(part) for part in np.array_split(audio, 7)]
+    result = np.concatenate(parts + [chunked.flush()])
+    np.testing.assert_allclose(result, expected, atol=1e-6)
+    # Leading/trailing silence trimmed, the 1 s pause compressed to 0.2 s
+    assert len(result) < len(audio) * 16000 / 24000 - 16000 * 0.8
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import batch_cli
+import tts_engine
+from batch_cli import BatchJob, build_parser, run_batch
+
+
+@pytest.fixture
+def models(tmp_path, monkeypatch):
+    # Digests are memoized under output/cache; keep them out of the project
+    monkeypatch.setattr(tts_engine, "get_output_dir", lambda kind="audio_output": tmp_path / kind)
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    model_file, voices_file = models_dir / "kokoro-v1.0.onnx", models_dir / "voices-v1.0.bin"
+    model_file.write_bytes(b"model v1")
+    voices_file.write_bytes(b"voices v1")
+    return model_file, voices_file
+
+
+def finished_job(tmp_path, model_file, voices_file, voice="af_bella"):
+    """A job rendered earlier: its output exists and the manifest says ok"""
+    output_dir = tmp_path / "batch"
+    output_dir.mkdir(exist_ok=True)
+    job = BatchJob("one", "Hello there.", output_dir / "one.wav", voice, 1.0)
+    job.output.write_bytes(b"RIFF")
+    job.model_version, voice_keys = batch_cli.model_identity(model_file, voices_file)
+    job.voice_key = voice_keys.get(voice, voice)
+    record = {"id": job.job_id, "output": str(job.output), "digest": job.digest, "status": "ok"}
+    (output_dir / batch_cli.RESULTS_MANIFEST).write_text(json.dumps(record) + "\n")
+    return job, output_dir
+
+
+def test_finished_job_is_skipped(tmp_path, models):
+    job, output_dir = finished_job(tmp_path, *models)
+    assert run_batch([job], output_dir, 1, *models) == (0, 1, 0)
+
+
+def test_digest_changes_with_the_model_files(tmp_path, models):
+    model_file, voices_file = models
+    job, _ = finished_job(tmp_path, model_file, voices_file)
+    before = job.digest
+    model_file.write_bytes(b"model v2, another variant")
+    job.model_version, _ = batch_cli.model_identity(model_file, voices_file)
+    assert job.digest != before
+
+
+def test_digest_changes_with_a_blend(tmp_path, models):
+    model_file, voices_file = models
+    index = voices_file.parent / "voice_blends.json"
+
+    def blend_key(digest):
+        index.write_text(json.dumps({"blends": {"brand_voice": {"row": 0, "digest": digest}}}))
+        return batch_cli.model_identity(model_file, voices_file)[1]["brand_voice"]
+
+    assert blend_key("aaa") != blend_key("bbb")
+
+
+@pytest.mark.parametrize("workers", ["0", "-2", "many"])
+def test_workers_must_be_positive(workers):
+    with pytest.raises(SystemExit) as error:
+        build_parser().parse_args(["texts/", "--workers", workers])
+    assert error.value.code == 2
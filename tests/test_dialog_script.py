@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from dialog_script import ScriptError, assemble, parse_script
+
+RATE = 1000
+
+
+def test_parse_tags_voices_and_continuations():
+    script = parse_script("""
+        # Episode 12
+        @voice Host = af_bella
+        @gap 0.4
+        Host: Welcome back.
+        af_sky: Thanks for having me.
+        A line without a tag continues.
+        @pause 1.5
+        Host: After a pause.
+    """)
+    assert [(line.speaker, line.voice) for line in script.lines] == [
+        ("Host", "af_bella"), ("af_sky", "af_sky"), ("Host", "af_bella")]
+    assert script.lines[1].text == "Thanks for having me. A line without a tag continues."
+    assert [line.pause_before for line in script.lines] == [0.0, 0.0, 1.5]
+    assert script.gap == 0.4 and script.pause_after == 0.0
+    assert list(script.groups()) == ["af_bella", "af_sky"]
+
+
+def test_trailing_pause_is_kept():
+    script = parse_script("af_bella: Goodbye.\n@pause 2\n")
+    assert script.pause_after == 2.0
+
+
+def test_pause_of_an_empty_line_moves_to_the_next_line():
+    script = parse_script("af_bella: One.\n@pause 1\naf_sky:\n@pause 0.5\naf_bella: Two.")
+    assert [line.text for line in script.lines] == ["One.", "Two."]
+    assert script.lines[1].pause_before == 1.5
+    assert [line.index for line in script.lines] == [0, 1]
+
+
+def test_errors_name_the_line():
+    with pytest.raises(ScriptError, match="^line 2: unknown directive @echo"):
+        parse_script("af_bella: Hi.\n@echo 1")
+    with pytest.raises(ScriptError, match="^line 1: unknown speaker 'Nobody'"):
+        parse_script("Nobody: Hi.")
+    with pytest.raises(ScriptError, match="^line 1: @pause cannot be negative"):
+        parse_script("@pause -1\naf_bella: Hi.")
+
+
+def test_empty_script_has_no_line_number():
+    with pytest.raises(ScriptError) as error:
+        parse_script("# only a comment\n@gap 0.2\n")
+    assert str(error.value) == "the script has no speaker lines"
+    assert error.value.line_number is None
+
+
+def lines_for(text):
+    return parse_script(text).lines
+
+
+def test_assemble_gap_then_pause_then_trailing_pause():
+    lines = lines_for("af_bella: One.\n@pause 0.5\naf_sky: Two.\naf_bella: Three.")
+    parts = [np.ones(100, np.float32), np.full(200, 2, np.float32), np.full(50, 3, np.float32)]
+    audio = assemble(parts, lines, RATE, gap=0.1, crossfade=0.0, pause_after=0.25)
+    # A pause comes on top of the gap
+    second = 100 + 100 + 500
+    third = second + 200 + 100
+    assert len(audio) == third + 50 + 250
+    assert np.all(audio[:100] == 1) and np.all(audio[100:second] == 0)
+    assert np.all(audio[second:second + 200] == 2)
+    assert np.all(audio[third:third + 50] == 3) and np.all(audio[third + 50:] == 0)
+
+
+def test_assemble_crossfade_overlaps_lines_except_after_a_pause():
+    lines = lines_for("af_bella: One.\naf_sky: Two.\n@pause 0.1\naf_bella: Three.")
+    parts = [np.ones(100, np.float32)] * 3
+    audio = assemble(parts, lines, RATE, gap=0.2, crossfade=0.04)
+    # 40 frames of overlap replace the gap; after the pause: gap + pause, no overlap
+    assert len(audio) == 100 + 100 - 40 + 200 + 100 + 100
+    # Equal signals under a linear crossfade keep their level
+    np.testing.assert_allclose(audio[:160], 1.0, atol=1e-6)
+    assert np.all(audio[160:460] == 0) and np.all(audio[460:] == 1)
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import download_model
+from download_model import DownloadError, ModelFetcher, published_digests
+
+FILENAME = "kokoro-v1.0.onnx"
+
+
+class RangedFileServer:
+    """Local stand-in for the release server: HEAD, ranged GET, optional breakage"""
+
+    def __init__(self, files):
+        self.files = files
+        self.ranges = []
+        # Bytes sent per response before the connection is dropped (None: all)
+        self.cut_after = None
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _file(self):
+                data = server.files.get(self.path.rsplit("/", 1)[-1])
+                if data is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                return data
+
+            def do_HEAD(self):
+                data = self._file()
+                if data is None:
+                    return
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+
+            def do_GET(self):
+                data = self._file()
+                if data is None:
+                    return
+                match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+                start, end = (int(match[1]), int(match[2])) if match else (0, len(data) - 1)
+                server.ranges.append((start, end))
+                body = data[start:end + 1]
+                self.send_response(206 if match else 200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if server.cut_after is not None:
+                    self.wfile.write(body[:server.cut_after])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/release"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def payload():
+    return os.urandom(256 * 1024)
+
+
+@pytest.fixture
+def server(payload, monkeypatch):
+    # Small segments and blocks so a 256 KB file splits into four segments
+    monkeypatch.setattr(download_model, "MIN_SEGMENT_BYTES", 32 * 1024)
+    monkeypatch.setattr(download_model, "BUFFER_BYTES", 4 * 1024)
+    monkeypatch.setattr(download_model.time, "sleep", lambda seconds: None)
+    server = RangedFileServer({FILENAME: payload})
+    yield server
+    server.close()
+
+
+def fetcher(models_dir, server, **options):
+    return ModelFetcher(models_dir, server.url, segments=4, show_progress=False, **options)
+
+
+def test_download_verifies_and_installs(tmp_path, server, payload):
+    digest = hashlib.sha256(payload).hexdigest()
+    results = fetcher(tmp_path, server, expected={FILENAME: digest}).fetch_all(
+        [{"filename": FILENAME, "sha256": None}])
+    assert results == {FILENAME: "downloaded"}
+    assert (tmp_path / FILENAME).read_bytes() == payload
+    assert not (tmp_path / (FILENAME + ".part")).exists()
+    assert json.loads((tmp_path / "checksums.json").read_text())[FILENAME] == digest
+
+
+def test_interrupted_segments_resume(tmp_path, server, payload):
+    files = [{"filename": FILENAME, "sha256": hashlib.sha256(payload).hexdigest()}]
+    server.cut_after = 10 * 1024
+    results = fetcher(tmp_path, server).fetch_all(files)
+    assert isinstance(results[FILENAME], DownloadError)
+    state = json.loads((tmp_path / (FILENAME + ".part.json")).read_text())
+    done = [segment["done"] for segment in state["segments"]]
+    assert len(done) == 4 and all(done)
+
+    server.cut_after = None
+    server.ranges.clear()
+    results = fetcher(tmp_path, server).fetch_all(files)
+    assert results == {FILENAME: "downloaded"}
+    assert (tmp_path / FILENAME).read_bytes() == payload
+    # Every segment continued where it stopped instead of starting over
+    starts = sorted(start for start, _ in server.ranges)
+    expected = sorted(segment["start"] + segment["done"] for segment in state["segments"])
+    assert starts == expected
+    assert not (tmp_path / (FILENAME + ".part.json")).exists()
+
+
+def test_digest_mismatch_discards_the_download(tmp_path, server):
+    results = fetcher(tmp_path, server, expected={FILENAME: "0" * 64}).fetch_all(
+        [{"filename": FILENAME, "sha256": None}])
+    assert isinstance(results[FILENAME], DownloadError)
+    assert not (tmp_path / FILENAME).exists()
+    # A corrupt result must not be resumed
+    assert not (tmp_path / (FILENAME + ".part")).exists()
+    assert not (tmp_path / (FILENAME + ".part.json")).exists()
+
+
+class StubResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class StubSession:
+    def __init__(self, payload):
+        self.payload = payload
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        return StubResponse(self.payload)
+
+
+def test_published_digests_from_github_release():
+    session = StubSession({"assets": [
+        {"name": "voices-v1.0.bin", "digest": "sha256:" + "AB" * 32},
+        {"name": "notes.txt", "digest": None},
+    ]})
+    digests = published_digests(download_model.RELEASE_URL, session)
+    assert digests == {"voices-v1.0.bin": "ab" * 32}
+    assert session.urls == ["https://api.github.com/repos/nazdridoy/kokoro-tts/releases/tags/v1.0.0"]
+    assert published_digests("http://10.0.0.5:8000/kokoro", session) == {}
+
+
+def test_malformed_expect_is_a_usage_error():
+    args = download_model.build_parser().parse_args(["--expect", f"{FILENAME}={'AB' * 32}"])
+    assert args.expect == [(FILENAME, "ab" * 32)]
+    for value in (FILENAME, f"{FILENAME}=1234", f"={'ab' * 32}"):
+        with pytest.raises(SystemExit) as error:
+            download_model.build_parser().parse_args(["--expect", value])
+        assert error.value.code == 2
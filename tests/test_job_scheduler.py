@@ -0,0 +1,96 @@
+import threading
+
+from job_scheduler import (JobScheduler, JobCancelled, PRIORITY_BULK, PRIORITY_INTERACTIVE,
+                           CANCELLED, DONE)
+
+
+def wait_for(event, timeout=5):
+    assert event.wait(timeout), "timed out"
+
+
+def test_higher_priority_job_runs_at_next_step():
+    scheduler = JobScheduler()
+    order = []
+    started = threading.Event()
+    release = threading.Event()
+    done = threading.Event()
+
+    def bulk(job):
+        for index in range(3):
+            order.append(f"bulk {index}")
+            started.set()
+            release.wait(5)
+            yield
+
+    scheduler.submit("bulk", bulk, PRIORITY_BULK)
+    wait_for(started)
+    scheduler.submit("preview", lambda job: order.append("preview"), PRIORITY_INTERACTIVE,
+                     on_done=lambda job: done.set())
+    release.set()
+    wait_for(done)
+    scheduler.shutdown(5)
+    assert order[:2] == ["bulk 0", "preview"]
+
+
+def test_cancel_closes_generator_on_a_worker_without_the_lock():
+    scheduler = JobScheduler()
+    stepped = threading.Event()
+    closed = threading.Event()
+    cancelled = threading.Event()
+    closing_thread = []
+    lock_free = []
+
+    def work(job):
+        try:
+            while True:
+                stepped.set()
+                yield
+        finally:
+            closing_thread.append(threading.current_thread())
+            # Other scheduler calls must not block while the job cleans up
+            lock_free.append(scheduler._condition.acquire(timeout=1))
+            scheduler._condition.release()
+            closed.set()
+
+    job = scheduler.submit("long form", work, on_error=lambda job: cancelled.set())
+    wait_for(stepped)
+    # Paused between steps: cancel() itself has to hand the generator over
+    scheduler.pause(job)
+    while job._active:
+        pass
+    scheduler.cancel(job)
+    assert job.state == CANCELLED
+    wait_for(closed)
+    wait_for(cancelled)
+    assert closing_thread[0] is not threading.current_thread()
+    assert lock_free == [True]
+    assert isinstance(job.error, JobCancelled)
+    scheduler.shutdown(5)
+
+
+def test_shutdown_waits_for_cancelled_jobs_to_clean_up():
+    scheduler = JobScheduler()
+    stepped = threading.Event()
+    closed = []
+
+    def work(job):
+        try:
+            while True:
+                stepped.set()
+                yield
+        finally:
+            closed.append(job.name)
+
+    scheduler.submit("render", work)
+    wait_for(stepped)
+    scheduler.shutdown(5)
+    assert closed == ["render"]
+
+
+def test_plain_function_is_a_single_step():
+    scheduler = JobScheduler()
+    done = threading.Event()
+    job = scheduler.submit("sum", lambda job: 1 + 2, on_done=lambda job: done.set())
+    wait_for(done)
+    assert job.state == DONE and job.result == 3
+    scheduler.shutdown(5)
@@ -0,0 +1,26 @@
+import pipeline_metrics
+from pipeline_metrics import PipelineMetrics, describe_stages
+
+
+def test_describe_stages_lists_stages_in_pipeline_order():
+    stages = {"inference": 12.1, "phonemize": 0.8, "encode": 0.001}
+    assert describe_stages(stages) == "phonemize 0.80s, inference 12.10s"
+
+
+def test_describe_stages_is_empty_without_stage_time():
+    assert describe_stages({}) == ""
+    assert describe_stages({"inference": 0.001}) == ""
+
+
+def test_job_trace_record_and_prometheus():
+    metrics = PipelineMetrics()
+    trace = pipeline_metrics.start_job("request", voice="af_bella")
+    with pipeline_metrics.activate(trace):
+        pipeline_metrics.record_stage("inference", 1.5)
+        pipeline_metrics.add_audio(3.0)
+    record = trace.finish(wall_seconds=2.0)
+    metrics.record_job(record)
+    assert record["stages"] == {"inference": 1.5}
+    assert record["rtf"] == round(2.0 / 3.0, 4) and record["voice"] == "af_bella"
+    text = metrics.render_prometheus()
+    assert 'kokoro_jobs_total{kind="request",status="ok"} 1' in text
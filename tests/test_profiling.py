@@ -0,0 +1,36 @@
+import pytest
+
+import batch_cli
+import long_form
+import profiling
+import run
+
+
+@pytest.fixture(autouse=True)
+def no_profile_env(monkeypatch):
+    monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+
+
+def test_profile_does_not_swallow_a_following_positional():
+    args = batch_cli.build_parser().parse_args(["--profile", "texts/"])
+    assert args.source == "texts/"
+    assert profiling.mode_from_args(args) == "sample"
+    args = long_form.build_parser().parse_args(["--profile-mode", "cprofile", "book.txt"])
+    assert args.source == "book.txt"
+    assert profiling.mode_from_args(args) == "cprofile"
+
+
+def test_profiling_is_off_unless_asked(monkeypatch):
+    args = long_form.build_parser().parse_args(["book.txt"])
+    assert profiling.mode_from_args(args) is None
+    monkeypatch.setenv(profiling.PROFILE_ENV, "cprofile")
+    assert profiling.mode_from_args(args) == "cprofile"
+
+
+def test_gui_arguments_parse_the_same_way():
+    assert run.gui_profile_mode([]) is None
+    assert run.gui_profile_mode(["--lazy-load", "--profile"]) == "sample"
+    assert run.gui_profile_mode(["--profile", "--profile-mode", "cprofile"]) == "cprofile"
+    with pytest.raises(SystemExit) as error:
+        run.gui_profile_mode(["--profile-mode=bogus"])
+    assert error.value.code == 2
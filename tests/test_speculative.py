@@ -0,0 +1,42 @@
+from speculative import SpeculativeStore, finished_chunks, speculation_steps
+
+
+def test_sentence_being_typed_is_not_finished():
+    assert finished_chunks("First sentence. Still typing") == ["First sentence."]
+    assert finished_chunks("First sentence. Second one.") == ["First sentence."]
+    assert finished_chunks("First sentence. Second one. ") == ["First sentence.", "Second one."]
+    assert finished_chunks("First sentence. Second one.\n") == ["First sentence.", "Second one."]
+
+
+class StubEngine:
+    def __init__(self):
+        self.calls = []
+
+    def presynthesize(self, text, voice, speed):
+        self.calls.append(text)
+        return [len(text)], 24000
+
+
+def test_edited_sentences_are_discarded_and_redone():
+    engine, store = StubEngine(), SpeculativeStore()
+    assert store.update("One. Two. Thr", "af_bella", 1.0) == 2
+    for _ in speculation_steps(engine, store):
+        pass
+    assert store.progress() == (2, 2)
+
+    assert store.update("One. Deux. Thr", "af_bella", 1.0) == 1
+    for _ in speculation_steps(engine, store):
+        pass
+    assert engine.calls == ["One.", "Two.", "Deux."]
+    assert store.get("Deux.", "af_bella", 1.0) is not None
+    assert store.get("Two.", "af_bella", 1.0) is None
+    assert store.stats()["discarded"] == 1 and store.hits == 1
+
+
+def test_other_voice_or_speed_is_a_different_result():
+    engine, store = StubEngine(), SpeculativeStore()
+    store.update("One. Two", "af_bella", 1.0)
+    for _ in speculation_steps(engine, store):
+        pass
+    assert not store.has("One.", "af_sky", 1.0)
+    assert store.update("One. Two", "af_bella", 1.2) == 1
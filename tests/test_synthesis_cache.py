@@ -0,0 +1,58 @@
+import threading
+
+import numpy as np
+import soundfile as sf
+
+import synthesis_cache
+from synthesis_cache import SynthesisCache, file_digest
+
+
+def audio():
+    return np.linspace(-0.5, 0.5, 2400, dtype=np.float32), 24000
+
+
+def test_put_get_roundtrip(tmp_path):
+    cache = SynthesisCache(tmp_path)
+    key = cache.key("Hello  there.", "af_bella", 1.0)
+    assert cache.key("Hello there.", "af_bella", 1.0) == key
+    cache.put(key, *audio())
+    samples, sample_rate = cache.get(key)
+    np.testing.assert_array_equal(samples, audio()[0])
+    assert sample_rate == 24000 and key in cache
+
+
+def test_libsndfile_error_does_not_fail_synthesis(tmp_path, monkeypatch):
+    cache = SynthesisCache(tmp_path)
+
+    def disk_full(path, *args, **kwargs):
+        open(path, "wb").close()
+        raise sf.LibsndfileError(0, "Error writing file (disk full)")
+    monkeypatch.setattr(synthesis_cache.sf, "write", disk_full)
+
+    key = cache.key("Hello.", "af_bella", 1.0)
+    cache.put(key, *audio())
+    assert key not in cache
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_file_digest_from_concurrent_threads(tmp_path):
+    model = tmp_path / "model.onnx"
+    model.write_bytes(np.random.default_rng(0).bytes(1 << 20))
+    memo_dir = tmp_path / "memo"
+    memo_dir.mkdir()
+    digests, errors = [], []
+
+    def run():
+        try:
+            digests.append(file_digest(model, memo_dir))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(set(digests)) == 1 and len(digests) == 8
+    assert not list(memo_dir.glob("*.tmp"))
@@ -0,0 +1,158 @@
+import http.client
+import json
+import threading
+
+import numpy as np
+import pytest
+
+import tts_server
+from tts_server import SynthesisRequest, SynthesisService, create_server
+
+RATE = 24000
+
+
+class StubEngine:
+    """Stands in for KokoroEngine: 0.1 s of audio per request or chunk"""
+
+    voices = {"af_bella", "am_adam"}
+
+    def __init__(self, model_file=None, voices_file=None, session_config=None):
+        self.batches = []
+        self.singles = []
+        self.stream_chunks = 3
+        self.release = threading.Event()
+        self.release.set()
+
+    def load(self):
+        return self
+
+    def enable_cache(self, cache_dir=None, max_bytes=None):
+        pass
+
+    def has_voice(self, voice):
+        return voice in self.voices
+
+    def stage_stats(self):
+        return {}
+
+    @staticmethod
+    def _audio(text):
+        return np.full(RATE // 10, 0.1, dtype=np.float32), RATE
+
+    def synthesize(self, text, voice, speed=1.0):
+        self.release.wait()
+        self.singles.append(text)
+        return self._audio(text)
+
+    def synthesize_batch(self, requests):
+        self.release.wait()
+        self.batches.append([text for text, _, _ in requests])
+        return [self._audio(text) for text, _, _ in requests]
+
+    def synthesize_stream(self, text, voice, speed=1.0):
+        self.release.wait()
+        for _ in range(self.stream_chunks):
+            yield self._audio(text)
+
+
+@pytest.fixture
+def stub_engine(monkeypatch):
+    monkeypatch.setattr(tts_server, "KokoroEngine", StubEngine)
+
+
+@pytest.fixture
+def make_server(stub_engine):
+    running = []
+
+    def make(start=True, timeout=5, **options):
+        service = SynthesisService(**options)
+        if start:
+            service.start()
+        else:
+            # Engines without workers: requests stay queued
+            service._engines.append(StubEngine())
+        server = create_server(service, port=0)
+        server.RequestHandlerClass.request_timeout = timeout
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        running.append((server, service))
+        return server, service
+
+    yield make
+    for server, service in running:
+        for engine in service._engines:
+            engine.release.set()
+        server.shutdown()
+        server.server_close()
+        service.stop()
+
+
+def post(server, payload):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+    connection.request("POST", "/synthesize", json.dumps(payload),
+                       {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def test_full_request_returns_wav(make_server):
+    server, service = make_server()
+    response, body = post(server, {"text": "Hello there.", "voice": "af_bella"})
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "audio/wav"
+    assert body[:4] == b"RIFF"
+    assert service.metrics.snapshot()["completed"] == 1
+
+
+def test_queue_full_answers_503(make_server):
+    server, service = make_server(start=False, queue_size=1)
+    service.submit(SynthesisRequest("Already waiting."))
+    response, body = post(server, {"text": "Hello."})
+    assert response.status == 503
+    assert response.getheader("Retry-After") == "1"
+    assert service.metrics.snapshot()["rejected"] == 1
+
+
+def test_unknown_voice_answers_400(make_server):
+    server, service = make_server()
+    response, body = post(server, {"text": "Hello.", "voice": "xx_nobody"})
+    assert response.status == 400
+    assert "xx_nobody" in json.loads(body)["error"]
+    assert service.metrics.snapshot()["accepted"] == 0
+
+
+def test_short_requests_are_batched(stub_engine):
+    service = SynthesisService(max_batch=8, batch_window=0.2, short_chars=20)
+    queued = [service.submit(SynthesisRequest(f"Short {index}.")) for index in range(3)]
+    queued.append(service.submit(SynthesisRequest("A request too long to be batched.")))
+    queued.append(service.submit(SynthesisRequest("Streamed.", stream=True)))
+    service.start()
+    try:
+        for request in queued:
+            assert request.done.wait(5)
+    finally:
+        service.stop()
+    engine = service._engines[0]
+    assert engine.batches == [["Short 0.", "Short 1.", "Short 2."]]
+    assert engine.singles == ["A request too long to be batched."]
+    assert all(request.error is None for request in queued)
+    assert service.metrics.snapshot()["mean_batch_size"] == 3
+
+
+def test_stream_is_chunked_wav(make_server):
+    server, service = make_server()
+    response, body = post(server, {"text": "One. Two. Three.", "stream": True})
+    assert response.status == 200
+    assert response.getheader("Transfer-Encoding") == "chunked"
+    assert body[:4] == b"RIFF"
+    # Header plus three 0.1 s chunks of 16-bit PCM
+    assert len(body) == 44 + 3 * (RATE // 10) * 2
+
+
+def test_stream_without_audio_in_time_answers_504(make_server):
+    server, service = make_server(timeout=0.2)
+    service._engines[0].release.clear()
+    response, body = post(server, {"text": "Too slow.", "stream": True})
+    assert response.status == 504
@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+import pytest
+
+from voice_blends import BlendError, BlendIndex, parse_components
+
+
+@pytest.fixture
+def models_dir(tmp_path):
+    rng = np.random.default_rng(0)
+    voices = {name: rng.standard_normal((8, 1, 4)).astype(np.float32)
+              for name in ("af_bella", "af_sky", "am_adam")}
+    with open(tmp_path / "voices-v1.0.bin", "wb") as f:
+        np.savez(f, **voices)
+    return tmp_path
+
+
+def test_parse_components_normalizes_weights():
+    assert parse_components(["af_bella:60", "af_sky:40"]) == {"af_bella": 0.6, "af_sky": 0.4}
+    with pytest.raises(BlendError):
+        parse_components(["af_bella:0"])
+
+
+def test_changing_blends_never_replaces_a_mapped_file(models_dir):
+    index = BlendIndex(models_dir)
+    index.add("mix", {"af_bella": 0.5, "af_sky": 0.5})
+    # An engine maps the current vectors and keeps using them
+    engine_voices = BlendIndex(models_dir).voices()
+    first_file = BlendIndex(models_dir).vectors_path
+    mapped = np.array(engine_voices["mix"])
+
+    index.add("deep", {"am_adam": 1.0})
+    current = BlendIndex(models_dir)
+    assert current.vectors_path != first_file
+    assert sorted(current.names()) == ["deep", "mix"]
+    np.testing.assert_array_equal(current.vector("mix"), mapped)
+    np.testing.assert_array_equal(engine_voices["mix"], mapped)
+
+    index.remove("mix")
+    index.remove("deep")
+    assert BlendIndex(models_dir).names() == []
+    assert not list(models_dir.glob("voice_blends*.npy"))
+
+
+def test_index_without_vectors_name_uses_the_legacy_file(models_dir):
+    vectors = np.ones((1, 8, 1, 4), dtype=np.float32)
+    np.save(models_dir / "voice_blends.npy", vectors)
+    (models_dir / "voice_blends.json").write_text(json.dumps({"blends": {
+        "old": {"row": 0, "components": {"af_bella": 1.0}, "language": "en-us",
+                "digest": "0"}}}))
+    np.testing.assert_array_equal(BlendIndex(models_dir).vector("old"), vectors[0])
@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+
+from voice_store import VoiceStore
+
+
+def write_archive(path, scale):
+    voices = {name: np.full((8, 1, 4), scale * (row + 1), dtype=np.float32)
+              for row, name in enumerate(("af_bella", "am_adam"))}
+    with open(path, "wb") as f:
+        np.savez(f, **voices)
+
+
+def test_open_maps_the_archive(tmp_path):
+    voices_file = tmp_path / "voices-v1.0.bin"
+    write_archive(voices_file, 1.0)
+    voices = VoiceStore(voices_file).open()
+    assert isinstance(voices["am_adam"], np.memmap)
+    np.testing.assert_array_equal(voices["am_adam"], np.full((8, 1, 4), 2.0, np.float32))
+
+
+def test_changed_archive_is_converted_to_a_new_file(tmp_path):
+    voices_file = tmp_path / "voices-v1.0.bin"
+    write_archive(voices_file, 1.0)
+    mapped = VoiceStore(voices_file).open()
+    first = {path.name for path in tmp_path.glob("voices-v1.0*.npy")}
+
+    write_archive(voices_file, 3.0)
+    stat = voices_file.stat()
+    os.utime(voices_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    voices = VoiceStore(voices_file).open()
+    second = {path.name for path in tmp_path.glob("voices-v1.0*.npy")}
+
+    assert second and second.isdisjoint(first)
+    np.testing.assert_array_equal(voices["af_bella"], np.full((8, 1, 4), 3.0, np.float32))
+    # The engine that mapped the old conversion keeps its voices
+    np.testing.assert_array_equal(mapped["af_bella"], np.full((8, 1, 4), 1.0, np.float32))